@@ -0,0 +1,112 @@
+"""
+准入控制（负载保护）
+
+根据在途任务数和最近任务耗时判断服务是否饱和：饱和时 /api/process 返回 429 并带 Retry-After，
+/api/ready 返回 503，负载均衡器可以在延迟失控之前把流量转走。
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from .config import settings
+
+
+@dataclass
+class AdmissionDecision:
+    """一次准入判断的结果"""
+    admitted: bool
+    reason: Optional[str]       # 拒绝原因：queue_depth / latency
+    retry_after: int            # 建议的重试等待秒数
+    queue_depth: int
+    recent_latency: Optional[float]
+    saturation: float           # 各项指标相对阈值的最大比例，>= 1 表示饱和
+
+
+class AdmissionController:
+    """
+    准入控制器
+
+    - 在途任务数（等待 + 处理中）达到 max_queue_depth 时拒绝
+    - 最近任务耗时（时间窗口内的 p90，从提交到结束）超过 max_latency 且仍有在途任务时拒绝
+
+    阈值为 0 表示关闭该项检查。耗时样本超过 window_seconds 后过期，
+    因此拒绝一段时间后会自动重新放行。耗时样本来自共享的任务存储，
+    多个 API 进程看到的是所有工作进程的结果。
+    """
+
+    def __init__(self, latency_source: Callable[[float], List[float]],
+                 max_queue_depth: int = 50, max_latency: float = 300.0,
+                 window_seconds: float = 300.0, retry_after: int = 10):
+        """
+        Args:
+            latency_source: 返回最近 window_seconds 秒内结束的任务耗时的函数
+            max_queue_depth: 在途任务数上限
+            max_latency: 最近任务耗时（p90，秒）上限
+            window_seconds: 耗时样本的有效时间
+            retry_after: 建议重试等待秒数的下限
+        """
+        self.latency_source = latency_source
+        self.max_queue_depth = max_queue_depth
+        self.max_latency = max_latency
+        self.window_seconds = window_seconds
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_settings(cls, latency_source: Callable[[float], List[float]]) -> "AdmissionController":
+        """按全局配置创建"""
+        return cls(
+            latency_source,
+            max_queue_depth=settings.admission_max_queue,
+            max_latency=settings.admission_max_latency,
+            window_seconds=settings.admission_window,
+            retry_after=settings.admission_retry_after
+        )
+
+    def recent_latency(self) -> Optional[float]:
+        """
+        时间窗口内任务耗时的 p90
+
+        Returns:
+            秒数，没有样本时返回 None
+        """
+        values = sorted(self.latency_source(self.window_seconds))
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(math.ceil(0.9 * len(values))) - 1)]
+
+    def evaluate(self, queue_depth: int, incoming: int = 1) -> AdmissionDecision:
+        """
+        判断是否接收新任务
+
+        Args:
+            queue_depth: 当前在途任务数（等待 + 处理中）
+            incoming: 本次提交的任务数（批量提交时为订单数）
+
+        Returns:
+            准入判断结果
+        """
+        latency = self.recent_latency()
+        queue_ratio = queue_depth / self.max_queue_depth if self.max_queue_depth > 0 else 0.0
+        latency_ratio = latency / self.max_latency if self.max_latency > 0 and latency is not None else 0.0
+        saturation = max(queue_ratio, latency_ratio)
+
+        reason = None
+        if self.max_queue_depth > 0 and queue_depth + incoming > self.max_queue_depth:
+            reason = "queue_depth"
+        elif latency_ratio > 1 and queue_depth > 0:
+            reason = "latency"
+
+        # 建议等待时间：按最近耗时估算一个任务的完成时间，不低于配置的下限
+        retry_after = self.retry_after
+        if latency is not None:
+            retry_after = max(retry_after, int(math.ceil(latency)))
+
+        return AdmissionDecision(
+            admitted=reason is None,
+            reason=reason,
+            retry_after=retry_after,
+            queue_depth=queue_depth,
+            recent_latency=latency,
+            saturation=saturation
+        )
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -18,21 +18,89 @@ class Settings:
         self.deepseek_api_key: Optional[str] = os.getenv('DEEPSEEK_API_KEY')
         self.deepseek_base_url: str = os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
 
-        # 文件存储路径
-        self.upload_dir = self.base_dir / "uploads"
-        self.output_dir = self.base_dir / "outputs"
+        # AI 请求重试与超时（429/5xx 会按 Retry-After 自动重试）
+        self.llm_max_retries: int = int(os.getenv('LLM_MAX_RETRIES', '2'))
+        llm_timeout = os.getenv('LLM_TIMEOUT')
+        self.llm_timeout: Optional[float] = float(llm_timeout) if llm_timeout else None
+
+        # 商品映射模式：llm（调用 Deepseek）或 local（本地相似度匹配，离线可用）
+        self.mapping_mode: str = os.getenv('MAPPING_MODE', 'llm').lower()
+
+        # AI 请求录制/回放：record（录制到磁盘）、replay（离线回放），留空表示关闭
+        self.llm_cassette_mode: Optional[str] = os.getenv('LLM_CASSETTE_MODE') or None
+        self.llm_cassette_dir = Path(os.getenv('LLM_CASSETTE_DIR', str(self.base_dir / "cassettes")))
+        # 回放延迟：none（不等待）、recorded（按录制耗时）或固定秒数
+        self.llm_replay_latency: str = os.getenv('LLM_REPLAY_LATENCY', 'none')
+
+        # 文件存储路径（多节点部署时指向共享存储卷，各节点挂载路径需一致）
+        self.upload_dir = Path(os.getenv('UPLOAD_DIR', str(self.base_dir / "uploads")))
+        self.output_dir = Path(os.getenv('OUTPUT_DIR', str(self.base_dir / "outputs")))
         self.log_dir = self.base_dir / "logs"
+        # 阶段检查点（重试任务时跳过已完成的阶段）
+        self.checkpoint_dir = Path(os.getenv('CHECKPOINT_DIR', str(self.base_dir / "checkpoints")))
 
         # 确保目录存在
-        self.upload_dir.mkdir(exist_ok=True)
-        self.output_dir.mkdir(exist_ok=True)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
         self.log_dir.mkdir(exist_ok=True)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+        # 日志：级别、是否写入 JSON Lines 文件（logs/app.jsonl，按大小轮转）
+        self.log_level: str = os.getenv('LOG_LEVEL', 'INFO').upper()
+        self.log_json: bool = os.getenv('LOG_JSON', 'false').lower() == 'true'
+        self.log_max_bytes: int = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+        self.log_backup_count: int = int(os.getenv('LOG_BACKUP_COUNT', '5'))
 
         # 文件大小限制（50MB）
         self.max_file_size = 50 * 1024 * 1024
 
-        # 任务超时时间（秒）
-        self.task_timeout = 600  # 10分钟
+        # 任务超时时间（秒），超时的任务会被中止并清理临时文件
+        self.task_timeout: float = float(os.getenv('TASK_TIMEOUT', '600'))  # 默认10分钟
+        # 任务最多处理的次数（含重试）；工作进程失联（崩溃、OOM）达到该次数的任务不再被接管，标记为失败
+        self.task_max_attempts: int = int(os.getenv('TASK_MAX_ATTEMPTS', '3'))
+
+        # 任务调度：API 进程内嵌的工作线程数（0 表示只接收任务，由 python -m backend.worker 处理）；
+        # 优先级权重（interactive 交互单个订单，batch 批量任务）
+        self.max_workers: int = int(os.getenv('MAX_WORKERS', '4'))
+        self.priority_weights: str = os.getenv('PRIORITY_WEIGHTS', 'interactive:8,batch:1')
+        # 客户端可以显式请求的优先级（逗号分隔）；每个接口总是可以使用自己的默认优先级
+        # （/api/process 为 interactive，/api/process/batch 为 batch），请求其他不在列表中的优先级时降为默认值
+        self.allowed_priorities: List[str] = [
+            priority.strip().lower() for priority in os.getenv('ALLOWED_PRIORITIES', 'batch').split(',')
+            if priority.strip()
+        ]
+
+        # 任务队列数据库（SQLite），所有 API 进程和工作进程共享；
+        # 跨节点共享网络存储卷时 JOB_DB_JOURNAL_MODE 需设为 DELETE（WAL 只支持同一台机器）
+        self.job_db_path = Path(os.getenv('JOB_DB_PATH', str(self.base_dir / "data" / "jobs.db")))
+        self.job_db_journal_mode: str = os.getenv('JOB_DB_JOURNAL_MODE', 'WAL').upper()
+        # 任务租约时长（秒），工作进程失联超过该时间后任务被其他工作进程接管；空闲时的轮询间隔
+        self.worker_lease_seconds: float = float(os.getenv('WORKER_LEASE_SECONDS', '30'))
+        self.worker_poll_interval: float = float(os.getenv('WORKER_POLL_INTERVAL', '0.5'))
+        # 处理期间检查任务是否已被其他进程取消的间隔（秒）；本进程内的取消立即生效
+        self.worker_cancel_poll_interval: float = float(os.getenv('WORKER_CANCEL_POLL_INTERVAL', '1'))
+
+        # 订单文件超过该大小（MB）时流式处理（逐个店铺读取、标准化，只持有当前店铺的订单行），0 表示总是流式
+        self.order_stream_threshold_mb: float = float(os.getenv('ORDER_STREAM_THRESHOLD_MB', '5'))
+
+        # 店铺匹配：别名文件（JSON，{"表头店铺名": ["别名", ...]}）、关键词（逗号分隔）、
+        # 错别字近似匹配允许不同的最多字数（默认 0，不做近似匹配）
+        self.shop_aliases_file: str = os.getenv('SHOP_ALIASES_FILE', '')
+        self.shop_keywords: str = os.getenv('SHOP_KEYWORDS', '五江,金海,洋湖,砂之船,邵阳,岳阳')
+        self.shop_match_max_distance: int = int(os.getenv('SHOP_MATCH_MAX_DISTANCE', '1'))
+
+        # 商品行解析缓存的条目数上限（每个工作进程一份，所有任务共享）
+        self.parse_memo_size: int = int(os.getenv('PARSE_MEMO_SIZE', '65536'))
+
+        # 批量处理：单次请求的订单数上限
+        self.batch_max_items: int = int(os.getenv('BATCH_MAX_ITEMS', '200'))
+
+        # 准入控制：在途任务数或最近任务耗时（p90，秒）超过阈值时拒绝新任务（429），0 表示不限制
+        self.admission_max_queue: int = int(os.getenv('ADMISSION_MAX_QUEUE', '50'))
+        self.admission_max_latency: float = float(os.getenv('ADMISSION_MAX_LATENCY', '300'))
+        # 耗时样本的有效时间（秒）与建议重试等待秒数的下限
+        self.admission_window: float = float(os.getenv('ADMISSION_WINDOW', '300'))
+        self.admission_retry_after: int = int(os.getenv('ADMISSION_RETRY_AFTER', '10'))
 
         # 标准商品列表
         self.standard_products = [
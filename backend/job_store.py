@@ -0,0 +1,583 @@
+"""
+基于 SQLite 的持久化任务队列
+
+任务状态、日志和排队信息都保存在同一个数据库文件中，任意 API 进程都能查询任务状态；
+一个或多个工作进程（可以在共享同一存储卷的其他节点上）通过租约领取任务：
+领取时写入 lease_owner 和 lease_expires，处理期间定期续约，进程崩溃导致租约过期后任务会被重新领取，
+并借助阶段检查点从最后完成的阶段继续。
+
+排队顺序沿用加权公平队列：入队时计算虚拟完成时间 vfinish（见 scheduler.compute_vfinish），
+领取时总是取 vfinish 最小的任务。
+
+批量处理时先入队一个共享映射任务（kind = batch_mapping），各订单任务处于 waiting 状态，
+不会被领取；映射任务完成时在同一个事务中把它们转为 pending，失败或中止时一并结束。
+"""
+
+import json
+import time
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .config import settings
+from .scheduler import compute_vfinish, parse_priority_weights
+
+logger = logging.getLogger(__name__)
+
+# 已结束的任务状态（取消和超时的任务不再被工作进程改写）
+FINISHED_STATUSES = ("completed", "failed", "cancelled", "timeout")
+ABORTED_STATUSES = ("cancelled", "timeout")
+# 可以重试的任务状态
+RETRYABLE_STATUSES = ("failed", "cancelled", "timeout")
+
+# 任务类型
+KIND_ORDER = "order"                  # 处理单个订单
+KIND_BATCH_MAPPING = "batch_mapping"  # 批量处理的共享商品映射
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL DEFAULT 'order',
+    batch_id TEXT,
+    name TEXT,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    created_at TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    created_ts REAL,
+    finished_ts REAL,
+    order_file TEXT,
+    excel_file TEXT,
+    output_file TEXT,
+    mapping_mode TEXT,
+    profile_memory INTEGER NOT NULL DEFAULT 0,
+    detail_logs INTEGER NOT NULL DEFAULT 1,
+    client_id TEXT,
+    priority TEXT,
+    fingerprint TEXT,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    temp_files TEXT,
+    timings TEXT,
+    memory_profile TEXT,
+    result TEXT,
+    vfinish REAL,
+    lease_owner TEXT,
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_queue ON tasks (status, vfinish);
+CREATE INDEX IF NOT EXISTS idx_tasks_finished ON tasks (finished_ts);
+CREATE INDEX IF NOT EXISTS idx_tasks_batch ON tasks (batch_id);
+
+CREATE TABLE IF NOT EXISTS task_logs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    time TEXT,
+    message TEXT,
+    percent INTEGER,
+    type TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_task_logs_task ON task_logs (task_id, seq);
+
+-- API Key 单独存放，不随任务信息返回；任务完成或删除后即删除
+CREATE TABLE IF NOT EXISTS task_secrets (
+    task_id TEXT PRIMARY KEY,
+    api_key TEXT
+);
+
+-- 公平队列状态：每个流上一个任务的虚拟完成时间，以及全局虚拟时间
+CREATE TABLE IF NOT EXISTS flows (
+    flow TEXT PRIMARY KEY,
+    last_finish REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+# 以 JSON 文本保存的字段
+JSON_FIELDS = ("temp_files", "timings", "memory_profile")
+BOOL_FIELDS = ("profile_memory", "detail_logs")
+# 不对外返回的内部字段
+INTERNAL_FIELDS = ("created_ts", "finished_ts", "vfinish", "lease_owner", "lease_expires")
+
+
+def _now_iso() -> str:
+    return datetime.now().isoformat()
+
+
+def _log_time() -> str:
+    return datetime.now().strftime("%H:%M:%S")
+
+
+class JobStore:
+    """任务队列与任务状态存储（线程安全，每个线程使用独立的数据库连接）"""
+
+    def __init__(self, db_path: Union[str, Path], journal_mode: str = "WAL",
+                 priority_weights: Optional[Dict[str, float]] = None, max_attempts: int = 3):
+        """
+        Args:
+            db_path: 数据库文件路径
+            journal_mode: SQLite 日志模式；WAL 并发性能更好，但要求所有进程在同一台机器上，
+                跨节点共享网络存储卷时请使用 DELETE
+            priority_weights: 各优先级的公平队列权重
+            max_attempts: 任务最多处理的次数（含重试）；租约过期的任务达到该次数后不再接管，直接标记为失败
+        """
+        if max_attempts < 1:
+            raise ValueError("最多处理次数至少为 1")
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.journal_mode = journal_mode
+        self.priority_weights = priority_weights or parse_priority_weights(None)
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('virtual_time', 0)")
+
+    @classmethod
+    def from_settings(cls) -> "JobStore":
+        """按全局配置创建"""
+        return cls(
+            settings.job_db_path,
+            journal_mode=settings.job_db_journal_mode,
+            priority_weights=parse_priority_weights(settings.priority_weights),
+            max_attempts=settings.task_max_attempts
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """写事务（BEGIN IMMEDIATE，避免多个进程同时领取同一个任务）"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _insert_log(conn: sqlite3.Connection, task_id: str, message: str,
+                    percent: Optional[int] = None, log_type: Optional[str] = None):
+        conn.execute(
+            "INSERT INTO task_logs (task_id, time, message, percent, type) VALUES (?, ?, ?, ?, ?)",
+            (task_id, _log_time(), message, percent, log_type)
+        )
+
+    def _assign_vfinish(self, conn: sqlite3.Connection, client_id: str, priority: str,
+                        cost: float = 1.0) -> float:
+        """计算并记录任务的虚拟完成时间"""
+        if priority not in self.priority_weights:
+            raise ValueError(f"不支持的优先级: {priority}")
+        flow = f"{priority}|{client_id}"
+        virtual_time = conn.execute("SELECT value FROM meta WHERE key = 'virtual_time'").fetchone()[0]
+        row = conn.execute("SELECT last_finish FROM flows WHERE flow = ?", (flow,)).fetchone()
+        finish = compute_vfinish(virtual_time, row[0] if row else 0.0, cost, self.priority_weights[priority])
+        conn.execute(
+            "INSERT INTO flows (flow, last_finish) VALUES (?, ?) "
+            "ON CONFLICT(flow) DO UPDATE SET last_finish = excluded.last_finish",
+            (flow, finish)
+        )
+        return finish
+
+    # ---- API 侧 ----
+
+    def _insert_task(self, conn: sqlite3.Connection, task: Dict[str, Any], api_key: Optional[str]):
+        row = {key: value for key, value in task.items() if key != "logs"}
+        for field in JSON_FIELDS:
+            row[field] = json.dumps(row.get(field), ensure_ascii=False)
+        for field in BOOL_FIELDS:
+            row[field] = int(bool(row.get(field)))
+        row["created_ts"] = time.time()
+        if row["status"] == "pending":
+            row["vfinish"] = self._assign_vfinish(conn, row["client_id"], row["priority"])
+
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        conn.execute(f"INSERT INTO tasks ({columns}) VALUES ({placeholders})", tuple(row.values()))
+        conn.execute("INSERT INTO task_secrets (task_id, api_key) VALUES (?, ?)", (task["id"], api_key))
+
+    def create_task(self, task: Dict[str, Any], api_key: Optional[str] = None):
+        """
+        新建任务并入队
+
+        Args:
+            task: 任务信息（字段与 get_task 返回的一致，logs 除外）
+            api_key: Deepseek API Key（单独保存）
+        """
+        with self._write() as conn:
+            self._insert_task(conn, task, api_key)
+
+    def create_batch(self, mapping_task: Dict[str, Any], items: List[Dict[str, Any]],
+                     api_key: Optional[str] = None):
+        """
+        新建批量任务：共享映射任务入队，订单任务处于 waiting 状态，等映射完成后再入队
+
+        Args:
+            mapping_task: 共享映射任务（kind = batch_mapping，status = pending）
+            items: 订单任务（status = waiting，batch_id 与映射任务一致）
+            api_key: Deepseek API Key（每个任务单独保存，订单任务单独重试时也需要）
+        """
+        with self._write() as conn:
+            self._insert_task(conn, mapping_task, api_key)
+            for item in items:
+                self._insert_task(conn, item, api_key)
+
+    def get_batch(self, batch_id: str) -> List[Dict[str, Any]]:
+        """批量任务中的全部任务（共享映射任务在前，订单任务按提交顺序，不含日志）"""
+        rows = self._conn().execute(
+            "SELECT * FROM tasks WHERE batch_id = ? ORDER BY kind = ?, rowid", (batch_id, KIND_ORDER)
+        ).fetchall()
+        return [self._row_to_task(row, with_logs=False) for row in rows]
+
+    def get_batch_items(self, batch_id: str, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """批量任务中的订单任务（按提交顺序，不含日志），可按状态过滤"""
+        query = "SELECT * FROM tasks WHERE batch_id = ? AND kind = ?"
+        params = [batch_id, KIND_ORDER]
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        rows = self._conn().execute(query + " ORDER BY rowid", params).fetchall()
+        return [self._row_to_task(row, with_logs=False) for row in rows]
+
+    def _settle_batch(self, conn: sqlite3.Connection, task_id: str, status: str, message: str):
+        """共享映射任务结束时处理等待中的订单任务：完成则入队，否则一并结束"""
+        row = conn.execute("SELECT kind, batch_id FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        if row is None or row["kind"] != KIND_BATCH_MAPPING:
+            return
+
+        waiting = conn.execute(
+            "SELECT id, client_id, priority FROM tasks WHERE batch_id = ? AND status = 'waiting' ORDER BY rowid",
+            (row["batch_id"],)
+        ).fetchall()
+        for item in waiting:
+            if status == "completed":
+                vfinish = self._assign_vfinish(conn, item["client_id"], item["priority"])
+                conn.execute(
+                    "UPDATE tasks SET status = 'pending', message = '等待处理...', vfinish = ? WHERE id = ?",
+                    (vfinish, item["id"])
+                )
+            else:
+                item_message = f"批量商品映射未完成: {message}"
+                conn.execute(
+                    "UPDATE tasks SET status = ?, message = ?, finished_at = ?, finished_ts = ? WHERE id = ?",
+                    (status, item_message, _now_iso(), time.time(), item["id"])
+                )
+                self._insert_log(conn, item["id"], f"❌ {item_message}", percent=-1)
+
+    def _row_to_task(self, row: sqlite3.Row, with_logs: bool = True) -> Dict[str, Any]:
+        task = {key: row[key] for key in row.keys() if key not in INTERNAL_FIELDS}
+        for field in JSON_FIELDS:
+            task[field] = json.loads(task[field]) if task[field] else None
+        task["timings"] = task["timings"] or {}
+        task["temp_files"] = task["temp_files"] or []
+        for field in BOOL_FIELDS:
+            task[field] = bool(task[field])
+        if with_logs:
+            task["logs"] = self.get_logs(task["id"])
+        return task
+
+    def get_logs(self, task_id: str) -> List[Dict[str, Any]]:
+        """任务日志（与原内存任务的 logs 格式一致）"""
+        logs = []
+        for row in self._conn().execute(
+                "SELECT time, message, percent, type FROM task_logs WHERE task_id = ? ORDER BY seq", (task_id,)):
+            entry = {"time": row["time"], "message": row["message"]}
+            if row["type"]:
+                entry["type"] = row["type"]
+            else:
+                entry["percent"] = row["percent"]
+            logs.append(entry)
+        return logs
+
+    def get_task(self, task_id: str, with_logs: bool = True) -> Optional[Dict[str, Any]]:
+        """获取任务信息，不存在时返回 None"""
+        row = self._conn().execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._row_to_task(row, with_logs) if row else None
+
+    def list_tasks(self) -> List[Dict[str, Any]]:
+        """全部任务（按创建时间排序）"""
+        rows = self._conn().execute("SELECT * FROM tasks ORDER BY created_ts").fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def count_by_status(self, status: str) -> int:
+        """统计指定状态的任务数"""
+        return self._conn().execute("SELECT COUNT(*) FROM tasks WHERE status = ?", (status,)).fetchone()[0]
+
+    def in_flight(self) -> int:
+        """在途任务数（等待 + 处理中）"""
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        return self._conn().execute(
+            f"SELECT COUNT(*) FROM tasks WHERE status NOT IN ({placeholders})", FINISHED_STATUSES
+        ).fetchone()[0]
+
+    def recent_latencies(self, window_seconds: float) -> List[float]:
+        """最近 window_seconds 秒内结束的任务从提交到结束的耗时"""
+        rows = self._conn().execute(
+            "SELECT finished_ts - created_ts FROM tasks WHERE finished_ts >= ?",
+            (time.time() - window_seconds,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def abort(self, task_id: str, status: str, message: str, owner: Optional[str] = None) -> bool:
+        """
+        中止任务（取消或超时），持有租约的工作进程会在下次续约时发现并停止
+
+        Args:
+            task_id: 任务ID
+            status: cancelled 或 timeout
+            message: 状态消息
+            owner: 工作者标识；指定时只有仍持有租约才中止（避免误伤已被其他工作者接管的任务）
+
+        Returns:
+            是否中止成功（任务不存在或已结束时返回 False）
+        """
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        condition = f"id = ? AND status NOT IN ({placeholders})"
+        params = [status, message, _now_iso(), time.time(), task_id, *FINISHED_STATUSES]
+        if owner is not None:
+            condition += " AND lease_owner = ?"
+            params.append(owner)
+        with self._write() as conn:
+            cursor = conn.execute(
+                f"UPDATE tasks SET status = ?, message = ?, finished_at = ?, finished_ts = ?, "
+                f"result = NULL, lease_owner = NULL, lease_expires = NULL WHERE {condition}",
+                params
+            )
+            if cursor.rowcount:
+                self._insert_log(conn, task_id, f"⏹️ {message}", percent=-1)
+                self._settle_batch(conn, task_id, status, message)
+        return cursor.rowcount > 0
+
+    def retry(self, task_id: str, note: str) -> Dict[str, Any]:
+        """
+        重新排队失败、取消或超时的任务
+
+        Raises:
+            KeyError: 任务不存在
+            ValueError: 任务状态不允许重试
+        """
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT status, client_id, priority, kind, batch_id FROM tasks WHERE id = ?", (task_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(task_id)
+            if row["status"] not in RETRYABLE_STATUSES:
+                raise ValueError(f"任务状态为 {row['status']}，无法重试")
+            if row["kind"] == KIND_BATCH_MAPPING:
+                # 重试共享映射时，因映射未完成而结束的订单任务重新等待
+                placeholders = ", ".join("?" for _ in RETRYABLE_STATUSES)
+                conn.execute(
+                    f"UPDATE tasks SET status = 'waiting', progress = 0, message = '等待批量商品映射...', "
+                    f"finished_at = NULL, finished_ts = NULL "
+                    f"WHERE batch_id = ? AND kind = ? AND status IN ({placeholders})",
+                    (row["batch_id"], KIND_ORDER, *RETRYABLE_STATUSES)
+                )
+            vfinish = self._assign_vfinish(conn, row["client_id"], row["priority"])
+            conn.execute(
+                "UPDATE tasks SET status = 'pending', progress = 0, message = '等待重试...', "
+                "started_at = NULL, finished_at = NULL, finished_ts = NULL, result = NULL, "
+                "attempts = attempts + 1, vfinish = ? WHERE id = ?",
+                (vfinish, task_id)
+            )
+            attempts = conn.execute("SELECT attempts FROM tasks WHERE id = ?", (task_id,)).fetchone()[0]
+            self._insert_log(conn, task_id, f"🔁 重试任务（第 {attempts} 次）{note}", percent=0)
+        return self.get_task(task_id)
+
+    def delete(self, task_id: str) -> bool:
+        """删除任务及其日志和密钥"""
+        with self._write() as conn:
+            cursor = conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            conn.execute("DELETE FROM task_logs WHERE task_id = ?", (task_id,))
+            conn.execute("DELETE FROM task_secrets WHERE task_id = ?", (task_id,))
+        return cursor.rowcount > 0
+
+    # ---- 工作进程侧 ----
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        领取一个任务：优先接管租约已过期的任务（原工作进程已失联），其次是 vfinish 最小的等待任务
+
+        租约过期的任务已处理 max_attempts 次时不再接管，标记为失败（如每次都让工作进程崩溃的订单文件），
+        避免它依次拖垮所有工作进程。
+
+        Args:
+            owner: 工作者标识
+            lease_seconds: 租约时长
+
+        Returns:
+            领取到的任务（不含日志），没有任务时返回 None
+        """
+        now = time.time()
+        with self._write() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT id, status, vfinish, attempts FROM tasks WHERE status = 'processing' AND lease_expires < ? "
+                    "ORDER BY lease_expires LIMIT 1", (now,)
+                ).fetchone()
+                if row is None or row["attempts"] < self.max_attempts:
+                    break
+                self._fail_abandoned(conn, row["id"], row["attempts"])
+            if row is None:
+                row = conn.execute(
+                    "SELECT id, status, vfinish FROM tasks WHERE status = 'pending' "
+                    "ORDER BY vfinish, created_ts LIMIT 1"
+                ).fetchone()
+            if row is None:
+                return None
+
+            reclaimed = row["status"] == "processing"
+            conn.execute(
+                "UPDATE tasks SET status = 'processing', lease_owner = ?, lease_expires = ?, started_at = ?, "
+                "attempts = attempts + ? WHERE id = ?",
+                (owner, now + lease_seconds, _now_iso(), 1 if reclaimed else 0, row["id"])
+            )
+            # 自时钟：虚拟时间推进到正在服务的任务的完成时间
+            conn.execute("UPDATE meta SET value = MAX(value, ?) WHERE key = 'virtual_time'", (row["vfinish"] or 0,))
+            if reclaimed:
+                self._insert_log(conn, row["id"], "♻️ 原工作进程失联，任务已被重新领取", percent=0)
+
+        task = self.get_task(row["id"], with_logs=False)
+        task["lease_owner"] = owner
+        return task
+
+    def _fail_abandoned(self, conn: sqlite3.Connection, task_id: str, attempts: int):
+        """把多次处理都失联的任务标记为失败"""
+        message = f"处理失败: 工作进程在处理该任务时失联 {attempts} 次，不再重新领取"
+        conn.execute(
+            "UPDATE tasks SET status = 'failed', message = ?, finished_at = ?, finished_ts = ?, "
+            "lease_owner = NULL, lease_expires = NULL WHERE id = ?",
+            (message, _now_iso(), time.time(), task_id)
+        )
+        self._insert_log(conn, task_id, f"❌ {message}", percent=-1)
+        self._settle_batch(conn, task_id, "failed", message)
+        logger.error(f"任务多次导致工作进程失联，已标记为失败: {task_id}（{attempts} 次）")
+
+    def renew_lease(self, task_id: str, owner: str, lease_seconds: float) -> bool:
+        """
+        续约
+
+        Returns:
+            是否仍持有租约（任务被取消、超时或被其他工作者接管时返回 False）
+        """
+        with self._write() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'processing'",
+                (time.time() + lease_seconds, task_id, owner)
+            )
+        return cursor.rowcount > 0
+
+    def holds_lease(self, task_id: str, owner: str) -> bool:
+        """是否仍持有租约（只读检查，任务被取消、超时或被其他工作者接管时返回 False）"""
+        row = self._conn().execute(
+            "SELECT 1 FROM tasks WHERE id = ? AND lease_owner = ? AND status = 'processing'",
+            (task_id, owner)
+        ).fetchone()
+        return row is not None
+
+    def get_api_key(self, task_id: str) -> Optional[str]:
+        row = self._conn().execute("SELECT api_key FROM task_secrets WHERE task_id = ?", (task_id,)).fetchone()
+        return row[0] if row else None
+
+    def update_progress(self, task_id: str, owner: str, percent: int, message: str) -> bool:
+        """记录百分比进度（只有持有租约的工作者能更新）"""
+        with self._write() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET progress = ?, message = ? WHERE id = ? AND lease_owner = ? AND status = 'processing'",
+                (max(percent, 0), message, task_id, owner)
+            )
+            if cursor.rowcount:
+                self._insert_log(conn, task_id, message, percent=percent)
+        return cursor.rowcount > 0
+
+    def append_detail_logs(self, task_id: str, owner: str, messages: List[str]):
+        """批量追加详细日志（只有持有租约的工作者能追加）"""
+        with self._write() as conn:
+            held = conn.execute(
+                "SELECT 1 FROM tasks WHERE id = ? AND lease_owner = ? AND status = 'processing'", (task_id, owner)
+            ).fetchone()
+            if held:
+                log_time = _log_time()
+                conn.executemany(
+                    "INSERT INTO task_logs (task_id, time, message, percent, type) VALUES (?, ?, ?, NULL, 'detail')",
+                    [(task_id, log_time, message) for message in messages]
+                )
+
+    def finish(self, task_id: str, owner: str, status: str, message: Optional[str] = None,
+               log: Optional[str] = None, **fields) -> bool:
+        """
+        结束任务（完成或失败），同时释放租约
+
+        Args:
+            task_id: 任务ID
+            owner: 工作者标识
+            status: completed / failed
+            message: 状态消息（None 表示不修改）
+            log: 追加的日志
+            **fields: 其他需要更新的字段（timings、memory_profile、result 等）
+
+        Returns:
+            是否更新成功（租约已丢失时返回 False）
+        """
+        values = dict(fields)
+        for field in JSON_FIELDS:
+            if field in values:
+                values[field] = json.dumps(values[field], ensure_ascii=False)
+        values.update(status=status, finished_at=_now_iso(), finished_ts=time.time(),
+                      lease_owner=None, lease_expires=None)
+        if message is not None:
+            values["message"] = message
+        assignments = ", ".join(f"{key} = ?" for key in values)
+
+        with self._write() as conn:
+            cursor = conn.execute(
+                f"UPDATE tasks SET {assignments} WHERE id = ? AND lease_owner = ? AND status = 'processing'",
+                (*values.values(), task_id, owner)
+            )
+            if cursor.rowcount:
+                if log:
+                    self._insert_log(conn, task_id, log, percent=-1 if status == "failed" else 100)
+                if status == "completed":
+                    conn.execute("DELETE FROM task_secrets WHERE task_id = ?", (task_id,))
+                self._settle_batch(conn, task_id, status, values.get("message") or "")
+        return cursor.rowcount > 0
+
+    def fail_waiting(self, task_id: str, message: str):
+        """结束一个等待中的订单任务（如批量映射时该订单解析失败）"""
+        with self._write() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'failed', message = ?, finished_at = ?, finished_ts = ? "
+                "WHERE id = ? AND status = 'waiting'",
+                (message, _now_iso(), time.time(), task_id)
+            )
+            if cursor.rowcount:
+                self._insert_log(conn, task_id, f"❌ {message}", percent=-1)
+
+    def save_results(self, task_id: str, **fields):
+        """保存与状态无关的结果字段（如中止任务的耗时），不检查租约"""
+        values = dict(fields)
+        for field in JSON_FIELDS:
+            if field in values:
+                values[field] = json.dumps(values[field], ensure_ascii=False)
+        assignments = ", ".join(f"{key} = ?" for key in values)
+        with self._write() as conn:
+            conn.execute(f"UPDATE tasks SET {assignments} WHERE id = ?", (*values.values(), task_id))
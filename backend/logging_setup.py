@@ -0,0 +1,86 @@
+"""
+后端日志配置
+
+工作线程只把日志记录放进内存队列（QueueHandler），由单独的监听线程（QueueListener）
+写到控制台和可选的 JSON Lines 文件，处理任务时不会因为日志 I/O 阻塞。
+"""
+
+import json
+import atexit
+import queue
+import logging
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from .config import settings
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+JSON_LOG_FILE = "app.jsonl"
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging() -> QueueListener:
+    """
+    安装基于队列的日志处理（重复调用时直接返回已有的监听器）
+
+    根 logger 只保留一个 QueueHandler；控制台输出始终开启，
+    LOG_JSON=true 时另外写入 settings.log_dir 下按大小轮转的 JSON Lines 文件。
+
+    Returns:
+        日志监听器
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handlers = [console_handler]
+
+    if settings.log_json:
+        file_handler = RotatingFileHandler(
+            settings.log_dir / JSON_LOG_FILE,
+            maxBytes=settings.log_max_bytes,
+            backupCount=settings.log_backup_count,
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(settings.log_level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """停止监听线程并写出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
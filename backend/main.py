@@ -1,22 +1,29 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Body
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Body, Request
+from fastapi.responses import FileResponse, PlainTextResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 import shutil
+from contextlib import asynccontextmanager
 from pathlib import Path
 import uuid
-from typing import Optional
+import hashlib
+from typing import List, Optional, Tuple
 import logging
 
 from .task_manager import TaskManager
 from .config import settings
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from .metrics import observe_upload, bind_task_counts, bind_saturation, ADMISSION_REJECTIONS
+from .admission import AdmissionController
+from .scheduler import PRIORITIES, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+from .logging_setup import setup_logging, shutdown_logging
+from shared.product_standardizer import MAPPING_MODES, MAPPING_MODE_LLM
+from shared.llm_cassette import CASSETTE_MODE_REPLAY
+from shared.metrics import REGISTRY
+
+# 配置日志（队列异步写出，工作线程不阻塞在日志 I/O 上）
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -27,12 +34,101 @@ class ProcessRequest(BaseModel):
     order_content: Optional[str] = None
     excel_file_id: str
     api_key: Optional[str] = None
+    mapping_mode: Optional[str] = None
+    profile_memory: bool = False
+    detail_logs: bool = True
+    priority: Optional[str] = None
+
+class BatchItem(BaseModel):
+    """批量处理中的一个订单"""
+    order_file_id: Optional[str] = None
+    order_content: Optional[str] = None
+    excel_file_id: Optional[str] = None  # 不填时使用批量请求的 excel_file_id
+    name: Optional[str] = None           # 订单名称（如区域名），便于识别
+
+
+class BatchProcessRequest(BaseModel):
+    """批量处理请求模型"""
+    items: List[BatchItem]
+    excel_file_id: Optional[str] = None
+    api_key: Optional[str] = None
+    mapping_mode: Optional[str] = None
+    detail_logs: bool = False
+    priority: Optional[str] = None
+
+def resolve_client_id(api_key: Optional[str], http_request: Request) -> str:
+    """
+    确定公平调度使用的客户端标识（由服务端确定，不接受客户端自报的标识）
+
+    请求自带 API Key 时使用其哈希（不保存原文），否则使用客户端地址；
+    使用服务端配置的 API Key 的请求按地址区分，不会合并为同一个客户端。
+
+    Args:
+        api_key: 请求中携带的 API Key（不含服务端配置的默认 Key）
+        http_request: 请求
+
+    Returns:
+        客户端标识
+    """
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+    host = http_request.client.host if http_request.client else "unknown"
+    return f"ip:{host}"
+
+
+def resolve_priority(requested: Optional[str], default: str) -> str:
+    """
+    确定任务优先级：未指定时使用接口的默认优先级；显式请求的其他优先级必须在服务端配置的
+    ALLOWED_PRIORITIES 中，否则降为默认值（客户端不能自行提升优先级）
+
+    Args:
+        requested: 请求中的优先级
+        default: 接口的默认优先级
+
+    Returns:
+        优先级
+
+    Raises:
+        HTTPException: 不支持的优先级
+    """
+    if not requested:
+        return default
+    priority = requested.lower()
+    if priority not in PRIORITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的优先级: {priority}（可选: {', '.join(PRIORITIES)}）"
+        )
+    if priority != default and priority not in settings.allowed_priorities:
+        logger.warning(f"请求的优先级 {priority} 未被允许，使用默认优先级 {default}")
+        return default
+    return priority
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用启动时启动内嵌的工作线程，关闭时停止领取新任务"""
+    logger.info("="*60)
+    logger.info("🚀 四海订单处理服务已启动")
+    logger.info(f"📍 上传目录: {settings.upload_dir}")
+    logger.info(f"📍 输出目录: {settings.output_dir}")
+    logger.info(f"🔑 API Key 配置: {'已配置' if settings.deepseek_api_key else '未配置'}")
+    logger.info("="*60)
+    task_manager.start()
+    try:
+        yield
+    finally:
+        logger.info("👋 四海订单处理服务已关闭")
+        task_manager.shutdown()
+        shutdown_logging()
+
 
 # 创建 FastAPI 应用
 app = FastAPI(
     title="四海订单处理 API",
     description="订单数据处理和商品标准化 API",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS 配置
@@ -58,8 +154,16 @@ else:
     )
     logger.info(f"CORS 配置: 仅允许以下来源 {settings.cors_origins}")
 
-# 初始化任务管理器
+# 初始化任务管理器（内嵌的工作线程在应用启动时才开始领取任务，见 lifespan）
 task_manager = TaskManager()
+admission = AdmissionController.from_settings(task_manager.recent_latencies)
+bind_task_counts(task_manager.count_by_status)
+bind_saturation(lambda: admission.evaluate(task_manager.in_flight()).saturation)
+
+
+async def evaluate_admission(incoming: int = 1):
+    """准入评估（查询任务存储，在线程池中执行，不阻塞事件循环）"""
+    return await run_in_threadpool(lambda: admission.evaluate(task_manager.in_flight(), incoming=incoming))
 
 # 生产环境：挂载前端静态文件
 frontend_dist = Path(__file__).parent.parent / "frontend" / "dist"
@@ -93,6 +197,38 @@ async def health_check():
     }
 
 
+@app.get("/api/ready")
+async def readiness_check():
+    """
+    就绪检查（供负载均衡器使用，与 /api/health 不同，会反映服务饱和度）
+
+    Returns:
+        饱和时返回 503
+    """
+    decision = await evaluate_admission()
+    return JSONResponse(
+        status_code=200 if decision.admitted else 503,
+        content={
+            "ready": decision.admitted,
+            "reason": decision.reason,
+            "queueDepth": decision.queue_depth,
+            "recentLatency": decision.recent_latency,
+            "saturation": round(decision.saturation, 3),
+            "maxQueueDepth": admission.max_queue_depth,
+            "maxLatency": admission.max_latency
+        },
+        headers={} if decision.admitted else {"Retry-After": str(decision.retry_after)}
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 格式的服务指标"""
+    # 任务数等指标查询任务存储，在线程池中生成
+    content = await run_in_threadpool(REGISTRY.render)
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.post("/api/upload")
 async def upload_file(file: UploadFile = File(...)):
     """
@@ -133,6 +269,7 @@ async def upload_file(file: UploadFile = File(...)):
             shutil.copyfileobj(file.file, buffer)
 
         logger.info(f"文件上传成功: {file.filename} -> {save_path}")
+        observe_upload(file_ext.lstrip('.'), file_size)
 
         return {
             "fileId": file_id,
@@ -146,8 +283,40 @@ async def upload_file(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"文件上传失败: {str(e)}")
 
 
+def resolve_order_file(order_file_id: Optional[str], order_content: Optional[str]) -> Tuple[Path, Optional[Path]]:
+    """
+    确定订单文件：使用已上传的文件，或由文本内容创建临时文件
+
+    Args:
+        order_file_id: 订单文件ID
+        order_content: 订单文本内容
+
+    Returns:
+        (订单文件路径, 临时文件路径或 None)
+
+    Raises:
+        HTTPException: 订单文件不存在或临时文件创建失败
+    """
+    if order_file_id:
+        # 使用已上传的文件
+        order_file = settings.upload_dir / f"{order_file_id}.txt"
+        if not order_file.exists():
+            raise HTTPException(status_code=404, detail="订单文件不存在")
+        return order_file, None
+
+    # 从文本内容创建临时文件
+    try:
+        temp_order_file = settings.upload_dir / f"{uuid.uuid4()}.txt"
+        temp_order_file.write_text(order_content, encoding='utf-8')
+        logger.info(f"从文本内容创建临时订单文件: {temp_order_file}")
+        return temp_order_file, temp_order_file
+    except Exception as e:
+        logger.error(f"创建临时订单文件失败: {e}")
+        raise HTTPException(status_code=500, detail=f"创建临时订单文件失败: {str(e)}")
+
+
 @app.post("/api/process")
-async def start_processing(request: ProcessRequest):
+async def start_processing(request: ProcessRequest, http_request: Request):
     """
     开始处理任务
 
@@ -157,10 +326,27 @@ async def start_processing(request: ProcessRequest):
             - order_content: 订单文本内容（与 order_file_id 二选一）
             - excel_file_id: Excel模板文件ID
             - api_key: Deepseek API Key（可选，如果不提供则使用配置中的）
+            - mapping_mode: 商品映射模式 llm / local（可选，默认使用配置中的）
+            - profile_memory: 是否开启内存分析（可选，结果随任务返回，处理会明显变慢）
+            - detail_logs: 是否记录每个店铺、每个单元格的详细日志（可选，默认开启）
+            - priority: 优先级 interactive（交互，默认）/ batch（批量，排在交互任务之后），
+              只能请求服务端允许的优先级（ALLOWED_PRIORITIES）
+        http_request: 请求（客户端地址用于公平调度）
 
     Returns:
         任务ID
     """
+    # 准入控制：服务饱和时直接拒绝，避免任务无限堆积
+    decision = await evaluate_admission()
+    if not decision.admitted:
+        ADMISSION_REJECTIONS.inc(reason=decision.reason)
+        logger.warning(f"服务繁忙，拒绝新任务: {decision.reason} (在途 {decision.queue_depth})")
+        raise HTTPException(
+            status_code=429,
+            detail="服务繁忙，请稍后重试",
+            headers={"Retry-After": str(decision.retry_after)}
+        )
+
     # 验证订单来源：必须提供 order_file_id 或 order_content 之一
     if not request.order_file_id and not request.order_content:
         raise HTTPException(
@@ -174,26 +360,17 @@ async def start_processing(request: ProcessRequest):
             detail="订单文件ID和订单文本内容只能提供其中之一"
         )
 
-    # 处理订单文件
-    order_file = None
-    temp_order_file = None
+    mapping_mode = (request.mapping_mode or settings.mapping_mode).lower()
+    if mapping_mode not in MAPPING_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的映射模式: {mapping_mode}（可选: {', '.join(MAPPING_MODES)}）"
+        )
 
-    if request.order_file_id:
-        # 使用已上传的文件
-        order_file = settings.upload_dir / f"{request.order_file_id}.txt"
-        if not order_file.exists():
-            raise HTTPException(status_code=404, detail="订单文件不存在")
-    else:
-        # 从文本内容创建临时文件
-        try:
-            temp_file_id = str(uuid.uuid4())
-            temp_order_file = settings.upload_dir / f"{temp_file_id}.txt"
-            temp_order_file.write_text(request.order_content, encoding='utf-8')
-            order_file = temp_order_file
-            logger.info(f"从文本内容创建临时订单文件: {temp_order_file}")
-        except Exception as e:
-            logger.error(f"创建临时订单文件失败: {e}")
-            raise HTTPException(status_code=500, detail=f"创建临时订单文件失败: {str(e)}")
+    priority = resolve_priority(request.priority, PRIORITY_INTERACTIVE)
+
+    # 处理订单文件
+    order_file, temp_order_file = resolve_order_file(request.order_file_id, request.order_content)
 
     # 查找 Excel 模板文件
     excel_file = settings.upload_dir / f"{request.excel_file_id}.xlsx"
@@ -205,7 +382,7 @@ async def start_processing(request: ProcessRequest):
 
     # 使用配置中的 API Key 或传入的 API Key
     used_api_key = request.api_key or settings.deepseek_api_key
-    if not used_api_key:
+    if not used_api_key and mapping_mode == MAPPING_MODE_LLM and settings.llm_cassette_mode != CASSETTE_MODE_REPLAY:
         # 清理临时文件
         if temp_order_file and temp_order_file.exists():
             temp_order_file.unlink()
@@ -216,10 +393,17 @@ async def start_processing(request: ProcessRequest):
 
     # 创建任务
     try:
-        task_id = task_manager.create_task(
+        task_id = await run_in_threadpool(
+            task_manager.create_task,
             order_file=str(order_file),
             excel_file=str(excel_file),
-            api_key=used_api_key
+            api_key=used_api_key,
+            mapping_mode=mapping_mode,
+            profile_memory=request.profile_memory,
+            detail_logs=request.detail_logs,
+            temp_files=[str(temp_order_file)] if temp_order_file else None,
+            client_id=resolve_client_id(request.api_key, http_request),
+            priority=priority
         )
 
         logger.info(f"任务已创建: {task_id}")
@@ -238,6 +422,203 @@ async def start_processing(request: ProcessRequest):
         raise HTTPException(status_code=500, detail=f"创建任务失败: {str(e)}")
 
 
+@app.post("/api/process/batch")
+async def start_batch_processing(request: BatchProcessRequest, http_request: Request):
+    """
+    批量处理多个订单
+
+    所有订单的商品名称合并后只做一次商品映射，之后各订单的标准化和 Excel 写入由工作进程并行处理。
+
+    Args:
+        request: 批量处理请求，包含以下字段：
+            - items: 订单列表，每项为 order_file_id 或 order_content 之一，可选 excel_file_id 和 name
+            - excel_file_id: 默认的 Excel 模板文件ID（订单未指定模板时使用）
+            - api_key: Deepseek API Key（可选，如果不提供则使用配置中的）
+            - mapping_mode: 商品映射模式 llm / local（可选，默认使用配置中的）
+            - detail_logs: 是否记录详细日志（可选，默认关闭）
+            - priority: 优先级（可选，默认 batch；只能请求服务端允许的优先级）
+        http_request: 请求（客户端地址用于公平调度）
+
+    Returns:
+        批量任务ID和各订单的任务ID
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="请提供至少一个订单")
+    if len(request.items) > settings.batch_max_items:
+        raise HTTPException(status_code=400, detail=f"单次批量最多 {settings.batch_max_items} 个订单")
+
+    # 准入控制：按订单数计入在途任务
+    decision = await evaluate_admission(incoming=len(request.items) + 1)
+    if not decision.admitted:
+        ADMISSION_REJECTIONS.inc(reason=decision.reason)
+        logger.warning(f"服务繁忙，拒绝批量任务: {decision.reason} (在途 {decision.queue_depth})")
+        raise HTTPException(
+            status_code=429,
+            detail="服务繁忙，请稍后重试",
+            headers={"Retry-After": str(decision.retry_after)}
+        )
+
+    mapping_mode = (request.mapping_mode or settings.mapping_mode).lower()
+    if mapping_mode not in MAPPING_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的映射模式: {mapping_mode}（可选: {', '.join(MAPPING_MODES)}）"
+        )
+
+    priority = resolve_priority(request.priority, PRIORITY_BATCH)
+
+    used_api_key = request.api_key or settings.deepseek_api_key
+    if not used_api_key and mapping_mode == MAPPING_MODE_LLM and settings.llm_cassette_mode != CASSETTE_MODE_REPLAY:
+        raise HTTPException(
+            status_code=400,
+            detail="请配置 Deepseek API Key（通过环境变量或请求参数）"
+        )
+
+    items = []
+    temp_files: List[Path] = []
+    try:
+        for index, item in enumerate(request.items, start=1):
+            if bool(item.order_file_id) == bool(item.order_content):
+                raise HTTPException(status_code=400, detail=f"订单 {index}: 请提供订单文件ID或订单文本内容之一")
+
+            excel_file_id = item.excel_file_id or request.excel_file_id
+            if not excel_file_id:
+                raise HTTPException(status_code=400, detail=f"订单 {index}: 未指定 Excel 模板")
+            excel_file = settings.upload_dir / f"{excel_file_id}.xlsx"
+            if not excel_file.exists():
+                raise HTTPException(status_code=404, detail=f"订单 {index}: Excel模板文件不存在")
+
+            try:
+                order_file, temp_order_file = resolve_order_file(item.order_file_id, item.order_content)
+            except HTTPException as e:
+                raise HTTPException(status_code=e.status_code, detail=f"订单 {index}: {e.detail}")
+            if temp_order_file:
+                temp_files.append(temp_order_file)
+
+            items.append({
+                "order_file": str(order_file),
+                "excel_file": str(excel_file),
+                "name": item.name or f"订单 {index}",
+                "temp_files": [str(temp_order_file)] if temp_order_file else []
+            })
+
+        batch = await run_in_threadpool(
+            task_manager.create_batch,
+            items,
+            api_key=used_api_key,
+            mapping_mode=mapping_mode,
+            detail_logs=request.detail_logs,
+            client_id=resolve_client_id(request.api_key, http_request),
+            priority=priority
+        )
+
+    except Exception as e:
+        # 清理已创建的临时文件
+        for temp_file in temp_files:
+            temp_file.unlink(missing_ok=True)
+        if isinstance(e, HTTPException):
+            raise
+        logger.error(f"创建批量任务失败: {e}")
+        raise HTTPException(status_code=500, detail=f"创建批量任务失败: {str(e)}")
+
+    return {
+        "batchId": batch["batch_id"],
+        "mappingTaskId": batch["mapping_task_id"],
+        "message": f"批量任务已启动（{len(items)} 个订单）",
+        "items": [
+            {"index": index, "taskId": task_id, "name": item["name"]}
+            for index, (task_id, item) in enumerate(zip(batch["task_ids"], items), start=1)
+        ]
+    }
+
+
+def summarize_batch_status(mapping: Optional[dict], items: List[dict]) -> str:
+    """
+    批量任务的整体状态
+
+    Returns:
+        pending（等待映射）、processing、completed、partial（部分成功）、failed 或 cancelled
+    """
+    statuses = [item["status"] for item in items]
+    if mapping is not None and mapping["status"] == "pending":
+        return "pending"
+    if any(status in ("waiting", "pending", "processing") for status in statuses) or \
+            (mapping is not None and mapping["status"] == "processing"):
+        return "processing"
+    if statuses and all(status == "completed" for status in statuses):
+        return "completed"
+    if "completed" in statuses:
+        return "partial"
+    if statuses and all(status == "cancelled" for status in statuses):
+        return "cancelled"
+    return "failed"
+
+
+@app.get("/api/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """
+    获取批量任务状态
+
+    Args:
+        batch_id: 批量任务ID
+
+    Returns:
+        整体状态、共享映射状态和各订单的状态
+    """
+    batch = await run_in_threadpool(task_manager.get_batch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="批量任务不存在")
+
+    mapping, items = batch["mapping"], batch["items"]
+    counts = {}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+
+    return {
+        "batchId": batch_id,
+        "status": summarize_batch_status(mapping, items),
+        "counts": counts,
+        "mapping": {
+            "taskId": mapping["id"],
+            "status": mapping["status"],
+            "progress": mapping["progress"],
+            "message": mapping["message"],
+            "timings": mapping.get("timings", {})
+        } if mapping else None,
+        "items": [
+            {
+                "index": index,
+                "taskId": item["id"],
+                "name": item.get("name"),
+                "status": item["status"],
+                "progress": item["progress"],
+                "message": item["message"],
+                "attempts": item.get("attempts", 1),
+                "result": item.get("result")
+            }
+            for index, item in enumerate(items, start=1)
+        ]
+    }
+
+
+@app.post("/api/batch/{batch_id}/cancel")
+async def cancel_batch(batch_id: str):
+    """
+    取消批量任务中所有未结束的任务
+
+    Args:
+        batch_id: 批量任务ID
+
+    Returns:
+        取消的任务数
+    """
+    if not await run_in_threadpool(task_manager.get_batch, batch_id):
+        raise HTTPException(status_code=404, detail="批量任务不存在")
+
+    cancelled = await run_in_threadpool(task_manager.cancel_batch, batch_id)
+    return {"message": f"已取消 {cancelled} 个任务", "batchId": batch_id, "cancelled": cancelled}
+
+
 @app.get("/api/task/{task_id}")
 async def get_task_status(task_id: str):
     """
@@ -249,22 +630,90 @@ async def get_task_status(task_id: str):
     Returns:
         任务状态信息
     """
-    task = task_manager.get_task(task_id)
+    task = await run_in_threadpool(task_manager.get_task, task_id)
 
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
 
     return {
         "taskId": task_id,
+        "kind": task.get("kind"),
+        "batchId": task.get("batch_id"),
+        "name": task.get("name"),
         "status": task["status"],
         "progress": task["progress"],
         "message": task["message"],
         "logs": task.get("logs", []),
         "createdAt": task.get("created_at"),
+        "startedAt": task.get("started_at"),
+        "finishedAt": task.get("finished_at"),
+        "priority": task.get("priority"),
+        "attempts": task.get("attempts", 1),
+        "timings": task.get("timings", {}),
+        "memoryProfile": task.get("memory_profile"),
         "result": task.get("result")
     }
 
 
+@app.post("/api/task/{task_id}/cancel")
+async def cancel_task(task_id: str):
+    """
+    取消任务
+
+    正在处理的任务会在下一个检查点停止，状态立即变为 cancelled，临时文件随即清理。
+
+    Args:
+        task_id: 任务ID
+
+    Returns:
+        取消结果
+    """
+    task = await run_in_threadpool(task_manager.get_task, task_id)
+
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    if not await run_in_threadpool(task_manager.cancel_task, task_id):
+        raise HTTPException(status_code=409, detail=f"任务已结束，无法取消（状态: {task['status']}）")
+
+    return {
+        "message": "任务已取消",
+        "taskId": task_id,
+        "status": "cancelled"
+    }
+
+
+@app.post("/api/task/{task_id}/retry")
+async def retry_task(task_id: str):
+    """
+    重试失败、取消或超时的任务
+
+    复用已保存的阶段检查点（解析结果、商品映射、标准化数据），从最后完成的阶段继续。
+
+    Args:
+        task_id: 任务ID
+
+    Returns:
+        重试结果
+    """
+    if not await run_in_threadpool(task_manager.get_task, task_id):
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    try:
+        task = await run_in_threadpool(task_manager.retry_task, task_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+    return {
+        "message": "任务已重新提交",
+        "taskId": task_id,
+        "status": task["status"],
+        "attempts": task["attempts"]
+    }
+
+
 @app.get("/api/tasks")
 async def get_all_tasks():
     """
@@ -273,7 +722,7 @@ async def get_all_tasks():
     Returns:
         任务列表
     """
-    tasks = task_manager.get_all_tasks()
+    tasks = await run_in_threadpool(task_manager.get_all_tasks)
     return {
         "tasks": tasks,
         "count": len(tasks)
@@ -291,7 +740,7 @@ async def download_result(task_id: str):
     Returns:
         Excel文件
     """
-    task = task_manager.get_task(task_id)
+    task = await run_in_threadpool(task_manager.get_task, task_id)
 
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
@@ -321,7 +770,7 @@ async def delete_task(task_id: str):
     Returns:
         删除结果
     """
-    success = task_manager.delete_task(task_id)
+    success = await run_in_threadpool(task_manager.delete_task, task_id)
 
     if not success:
         raise HTTPException(status_code=404, detail="任务不存在")
@@ -342,6 +791,7 @@ async def get_config():
     """
     return {
         "hasApiKey": bool(settings.deepseek_api_key),
+        "mappingMode": settings.mapping_mode,
         "standardProducts": settings.standard_products,
         "maxFileSize": settings.max_file_size,
         "taskTimeout": settings.task_timeout
@@ -367,22 +817,3 @@ async def update_config(api_key: Optional[str] = Query(None)):
         "success": True,
         "message": "配置已更新"
     }
-
-
-# 启动事件
-@app.on_event("startup")
-async def startup_event():
-    """应用启动时执行"""
-    logger.info("="*60)
-    logger.info("🚀 四海订单处理服务已启动")
-    logger.info(f"📍 上传目录: {settings.upload_dir}")
-    logger.info(f"📍 输出目录: {settings.output_dir}")
-    logger.info(f"🔑 API Key 配置: {'已配置' if settings.deepseek_api_key else '未配置'}")
-    logger.info("="*60)
-
-
-# 关闭事件
-@app.on_event("shutdown")
-async def shutdown_event():
-    """应用关闭时执行"""
-    logger.info("👋 四海订单处理服务已关闭")
@@ -0,0 +1,78 @@
+"""
+后端服务指标
+
+任务、阶段耗时和上传字节数等服务层指标，与 shared.metrics 中的 AI 调用、缓存指标
+注册在同一个 REGISTRY 中，由 /metrics 统一输出。
+"""
+
+from typing import Callable, Dict
+
+from shared.metrics import REGISTRY
+
+TASK_DURATION = REGISTRY.histogram(
+    "sihai_task_duration_seconds", "任务处理总耗时（从开始处理到结束）", ["status", "mapping_mode"])
+TASKS = REGISTRY.counter(
+    "sihai_tasks_total", "结束的任务数", ["status", "mapping_mode"])
+STAGE_DURATION = REGISTRY.histogram(
+    "sihai_stage_duration_seconds", "各处理阶段耗时（来自任务的 timings）", ["stage"])
+QUEUE_DEPTH = REGISTRY.gauge(
+    "sihai_task_queue_depth", "等待处理的任务数")
+ACTIVE_WORKERS = REGISTRY.gauge(
+    "sihai_active_workers", "正在处理任务的工作线程数")
+UPLOAD_BYTES = REGISTRY.counter(
+    "sihai_upload_bytes_total", "上传文件的字节数", ["file_type"])
+UPLOADS = REGISTRY.counter(
+    "sihai_uploads_total", "上传文件数", ["file_type"])
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "sihai_admission_rejections_total", "因服务饱和被拒绝的任务提交", ["reason"])
+SATURATION = REGISTRY.gauge(
+    "sihai_saturation", "服务饱和度（在途任务数、最近耗时相对阈值的最大比例，>= 1 表示饱和）")
+
+
+def observe_task(status: str, mapping_mode: str, duration: float, timings: Dict[str, float]):
+    """
+    记录一个结束的任务
+
+    Args:
+        status: 任务最终状态
+        mapping_mode: 映射模式
+        duration: 处理耗时（秒）
+        timings: 各阶段耗时
+    """
+    TASKS.inc(status=status, mapping_mode=mapping_mode)
+    TASK_DURATION.observe(duration, status=status, mapping_mode=mapping_mode)
+    for stage, seconds in timings.items():
+        STAGE_DURATION.observe(seconds, stage=stage)
+
+
+def observe_upload(file_type: str, size: int):
+    """
+    记录一次上传
+
+    Args:
+        file_type: 文件类型（txt / xlsx）
+        size: 文件字节数
+    """
+    UPLOADS.inc(file_type=file_type)
+    UPLOAD_BYTES.inc(size, file_type=file_type)
+
+
+def bind_saturation(saturation: Callable[[], float]):
+    """
+    绑定饱和度的采集函数
+
+    Args:
+        saturation: 返回当前饱和度的函数
+    """
+    SATURATION.set_function(saturation)
+
+
+def bind_task_counts(count_by_status: Callable[[str], int]):
+    """
+    绑定队列深度和活跃线程数的采集函数
+
+    Args:
+        count_by_status: 返回指定状态任务数的函数
+    """
+    QUEUE_DEPTH.set_function(lambda: count_by_status("pending"))
+    ACTIVE_WORKERS.set_function(lambda: count_by_status("processing"))
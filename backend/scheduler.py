@@ -0,0 +1,60 @@
+"""
+任务调度策略：加权公平队列
+
+每个流（优先级 + 客户端）按权重分配处理机会：提交时按自时钟公平队列（SCFQ）计算虚拟完成时间
+vfinish = max(当前虚拟时间, 该流上一个任务的 vfinish) + cost / 权重，工作进程总是领取 vfinish 最小的任务
+（排队状态保存在 job_store 中，见 JobStore.claim）。
+一个客户端一次提交 100 个任务时，其他客户端新提交的任务会插到它的队列中间，而不是排在最后；
+interactive 的权重高于 batch，单个订单的交互请求会排在批量任务之前。
+"""
+
+from typing import Dict, Optional
+
+# 优先级
+PRIORITY_INTERACTIVE = "interactive"  # 交互式单个订单，要求低延迟
+PRIORITY_BATCH = "batch"              # 批量任务，在交互任务之后处理
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+DEFAULT_PRIORITY_WEIGHTS = {PRIORITY_INTERACTIVE: 8.0, PRIORITY_BATCH: 1.0}
+
+
+def parse_priority_weights(value: Optional[str]) -> Dict[str, float]:
+    """
+    解析优先级权重配置
+
+    Args:
+        value: 形如 "interactive:8,batch:1" 的字符串，为空时使用默认权重
+
+    Returns:
+        {优先级: 权重}
+    """
+    weights = dict(DEFAULT_PRIORITY_WEIGHTS)
+    if not value:
+        return weights
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition(':')
+        name = name.strip()
+        if name not in PRIORITIES:
+            raise ValueError(f"未知的优先级: {name}")
+        weights[name] = float(weight)
+        if weights[name] <= 0:
+            raise ValueError(f"优先级权重必须大于 0: {item}")
+    return weights
+
+
+def compute_vfinish(virtual_time: float, last_finish: float, cost: float, weight: float) -> float:
+    """
+    计算任务的虚拟完成时间（自时钟公平队列）
+
+    Args:
+        virtual_time: 当前虚拟时间（最近被领取的任务的 vfinish）
+        last_finish: 同一个流上一个任务的 vfinish
+        cost: 任务的相对开销
+        weight: 任务所在优先级的权重
+
+    Returns:
+        vfinish
+    """
+    return max(virtual_time, last_finish) + cost / weight
@@ -1,61 +1,245 @@
 import uuid
-from threading import Thread
 from datetime import datetime
-from typing import Dict, Optional
+from typing import List, Optional
 from pathlib import Path
-import shutil
 import logging
 
-from shared.product_standardizer import ProductStandardizer
+from shared.checkpoint import checkpoint_fingerprint, STAGE_PARSED
+from .config import settings
+from .job_store import JobStore, RETRYABLE_STATUSES, FINISHED_STATUSES, KIND_ORDER, KIND_BATCH_MAPPING
+from .scheduler import PRIORITY_INTERACTIVE, PRIORITY_BATCH
+from .worker import Worker, task_checkpoint, cleanup_task_files
 
 logger = logging.getLogger(__name__)
 
 
 class TaskManager:
-    """简单的任务管理器（基于内存存储）"""
+    """
+    任务管理器（API 侧）
 
-    def __init__(self):
-        self.tasks: Dict[str, dict] = {}
+    任务保存在共享的 JobStore 中，任意 API 进程都能查询、取消和重试；
+    任务由工作进程领取处理，可以内嵌在本进程中（embedded_workers > 0），也可以单独部署。
+    内嵌的工作线程在 start() 时才开始领取任务（由应用的 lifespan 调用），创建实例没有副作用。
+    """
 
-    def create_task(self, order_file: str, excel_file: str, api_key: str) -> str:
+    def __init__(self, store: Optional[JobStore] = None, embedded_workers: Optional[int] = None):
         """
-        创建并启动任务
+        Args:
+            store: 任务存储（默认按配置创建）
+            embedded_workers: 本进程内嵌的工作线程数（默认为 MAX_WORKERS，0 表示不处理任务）
+        """
+        self.store = store or JobStore.from_settings()
+        if embedded_workers is None:
+            embedded_workers = settings.max_workers
+        self.worker: Optional[Worker] = None
+        if embedded_workers > 0:
+            self.worker = Worker(self.store, concurrency=embedded_workers)
+
+    def start(self):
+        """启动内嵌的工作线程"""
+        if self.worker is not None:
+            self.worker.start()
+
+    def create_task(self, order_file: str, excel_file: str, api_key: Optional[str],
+                    mapping_mode: str = "llm", profile_memory: bool = False,
+                    detail_logs: bool = True, temp_files: Optional[List[str]] = None,
+                    client_id: str = "anonymous", priority: str = PRIORITY_INTERACTIVE) -> str:
+        """
+        创建任务并入队
 
         Args:
             order_file: 订单文件路径
             excel_file: Excel模板文件路径
-            api_key: Deepseek API Key
+            api_key: Deepseek API Key（本地映射模式下可为空）
+            mapping_mode: 商品映射模式（llm / local）
+            profile_memory: 是否开启内存分析
+            detail_logs: 是否记录详细日志（每个店铺、每个单元格），批量处理时可关闭
+            temp_files: 随任务创建的临时文件（如由文本内容生成的订单文件），任务取消或超时时删除
+            client_id: 客户端标识（用于公平调度，不要传入 API Key 原文）
+            priority: 优先级（interactive / batch）
 
         Returns:
             任务ID
         """
+        task = self._new_task(order_file, excel_file, mapping_mode, profile_memory, detail_logs,
+                              temp_files, client_id, priority)
+
+        # API Key 单独保存，不放进任务信息（任务信息会通过接口返回），任务完成或删除后移除
+        self.store.create_task(task, api_key)
+        if self.worker is not None:
+            self.worker.wake()
+
+        logger.info(f"任务已创建: {task['id']}")
+        return task["id"]
+
+    def _new_task(self, order_file: str, excel_file: str, mapping_mode: str, profile_memory: bool,
+                  detail_logs: bool, temp_files: Optional[List[str]], client_id: str, priority: str,
+                  status: str = "pending", batch_id: Optional[str] = None, name: Optional[str] = None) -> dict:
+        """构造订单任务的信息"""
         task_id = str(uuid.uuid4())
 
-        # 复制 Excel 文件到输出目录（避免修改原文件）
-        output_file = Path("outputs") / f"{task_id}.xlsx"
-        shutil.copy(excel_file, output_file)
+        # 检查点指纹：订单内容、映射模式或标准商品变化后旧检查点自动失效
+        fingerprint = checkpoint_fingerprint(order_file, mapping_mode, settings.standard_products)
 
-        task = {
+        return {
             "id": task_id,
-            "status": "pending",  # pending, processing, completed, failed
+            "kind": KIND_ORDER,
+            "batch_id": batch_id,
+            "name": name,
+            # waiting（等待批量映射）, pending, processing, completed, failed, cancelled, timeout
+            "status": status,
+            "progress": 0,
+            "message": "等待批量商品映射..." if status == "waiting" else "等待处理...",
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "order_file": str(order_file),
+            "excel_file": str(excel_file),
+            # 工作进程开始处理时从模板复制（避免修改原文件）
+            "output_file": str(settings.output_dir / f"{task_id}.xlsx"),
+            "mapping_mode": mapping_mode,
+            "timings": {},
+            "profile_memory": profile_memory,
+            "detail_logs": detail_logs,
+            "client_id": client_id,
+            "priority": priority,
+            "memory_profile": None,
+            "temp_files": [str(path) for path in temp_files or []],
+            "fingerprint": fingerprint,
+            "attempts": 1,
+            "result": None
+        }
+
+    def create_batch(self, items: List[dict], api_key: Optional[str], mapping_mode: str = "llm",
+                     detail_logs: bool = False, client_id: str = "anonymous",
+                     priority: str = PRIORITY_BATCH) -> dict:
+        """
+        创建批量任务：所有订单共享一次商品映射，之后各订单的标准化和 Excel 写入并行处理
+
+        Args:
+            items: 订单列表，每项包含 order_file、excel_file，可选 name 和 temp_files
+            api_key: Deepseek API Key（本地映射模式下可为空）
+            mapping_mode: 商品映射模式（llm / local）
+            detail_logs: 是否记录详细日志
+            client_id: 客户端标识
+            priority: 优先级（默认 batch）
+
+        Returns:
+            {"batch_id", "mapping_task_id", "task_ids"}
+        """
+        batch_id = str(uuid.uuid4())
+        tasks = [
+            self._new_task(item["order_file"], item["excel_file"], mapping_mode, False, detail_logs,
+                           item.get("temp_files"), client_id, priority,
+                           status="waiting", batch_id=batch_id, name=item.get("name"))
+            for item in items
+        ]
+        mapping_task = {
+            "id": str(uuid.uuid4()),
+            "kind": KIND_BATCH_MAPPING,
+            "batch_id": batch_id,
+            "name": f"批量商品映射（{len(tasks)} 个订单）",
+            "status": "pending",
             "progress": 0,
             "message": "等待处理...",
-            "logs": [],
             "created_at": datetime.now().isoformat(),
-            "order_file": order_file,
-            "excel_file": excel_file,
-            "output_file": str(output_file),
+            "started_at": None,
+            "finished_at": None,
+            "order_file": "",
+            "excel_file": "",
+            "output_file": "",
+            "mapping_mode": mapping_mode,
+            "timings": {},
+            "profile_memory": False,
+            "detail_logs": detail_logs,
+            "client_id": client_id,
+            "priority": priority,
+            "memory_profile": None,
+            "temp_files": [],
+            "fingerprint": "",
+            "attempts": 1,
             "result": None
         }
 
-        self.tasks[task_id] = task
+        self.store.create_batch(mapping_task, tasks, api_key)
+        if self.worker is not None:
+            self.worker.wake()
+
+        logger.info(f"批量任务已创建: {batch_id}（{len(tasks)} 个订单）")
+        return {
+            "batch_id": batch_id,
+            "mapping_task_id": mapping_task["id"],
+            "task_ids": [task["id"] for task in tasks]
+        }
+
+    def get_batch(self, batch_id: str) -> Optional[dict]:
+        """
+        获取批量任务
+
+        Args:
+            batch_id: 批量任务ID
 
-        # 在后台线程中处理
-        thread = Thread(target=self._process_task, args=(task_id, api_key), daemon=True)
-        thread.start()
+        Returns:
+            {"mapping": 共享映射任务, "items": 订单任务列表}，不存在时返回 None
+        """
+        tasks = self.store.get_batch(batch_id)
+        if not tasks:
+            return None
+        return {
+            "mapping": next((task for task in tasks if task["kind"] == KIND_BATCH_MAPPING), None),
+            "items": [task for task in tasks if task["kind"] == KIND_ORDER]
+        }
 
-        logger.info(f"任务已创建: {task_id}")
-        return task_id
+    def cancel_batch(self, batch_id: str) -> int:
+        """
+        取消批量任务中所有未结束的任务
+
+        Returns:
+            取消的任务数
+        """
+        cancelled = 0
+        for task in self.store.get_batch(batch_id):
+            if task["status"] not in FINISHED_STATUSES and self._abort_task(task["id"], "cancelled", "批量任务已取消"):
+                cancelled += 1
+        return cancelled
+
+    def retry_task(self, task_id: str) -> dict:
+        """
+        重试失败、取消或超时的任务
+
+        复用任务的阶段检查点，从最后完成的阶段继续（例如只重新写入 Excel，不再调用 AI 映射）。
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            任务信息
+
+        Raises:
+            KeyError: 任务不存在
+            ValueError: 任务状态不允许重试
+            FileNotFoundError: 重试所需的文件已不存在
+        """
+        task = self.store.get_task(task_id, with_logs=False)
+        if task is None:
+            raise KeyError(task_id)
+        if task["status"] not in RETRYABLE_STATUSES:
+            raise ValueError(f"任务状态为 {task['status']}，无法重试")
+
+        checkpoint = task_checkpoint(task)
+        if task["kind"] == KIND_ORDER:
+            if not checkpoint.has(STAGE_PARSED) and not Path(task["order_file"]).exists():
+                raise FileNotFoundError("订单文件已清理且没有检查点，无法重试")
+            if not Path(task["excel_file"]).exists():
+                raise FileNotFoundError("Excel模板文件不存在，无法重试")
+
+        completed = checkpoint.completed_stages()
+        task = self.store.retry(task_id, f"，复用检查点: {', '.join(completed)}" if completed else "")
+        if self.worker is not None:
+            self.worker.wake()
+
+        logger.info(f"任务重试: {task_id} (第 {task['attempts']} 次)")
+        return task
 
     def get_task(self, task_id: str) -> Optional[dict]:
         """
@@ -67,81 +251,57 @@ class TaskManager:
         Returns:
             任务信息字典，如果任务不存在则返回 None
         """
-        return self.tasks.get(task_id)
+        return self.store.get_task(task_id)
 
-    def _process_task(self, task_id: str, api_key: str):
+    def cancel_task(self, task_id: str) -> bool:
         """
-        处理任务（在后台线程中运行）
+        取消任务
+
+        任务状态立即变为 cancelled 并清理临时文件。正在本进程内处理的任务立即触发取消令牌
+        （进行中的 AI 请求也随即放弃）；在其他进程处理的任务由工作者在 WORKER_CANCEL_POLL_INTERVAL 内发现。
 
         Args:
             task_id: 任务ID
-            api_key: Deepseek API Key
-        """
-        task = self.tasks[task_id]
-
-        def progress_callback(percent: int, message: str):
-            """进度回调函数"""
-            # 详细日志：只添加日志，不更新进度和状态
-            if percent == -2:
-                log_entry = {
-                    "time": datetime.now().strftime("%H:%M:%S"),
-                    "message": message,
-                    "type": "detail"
-                }
-                task["logs"].append(log_entry)
-                return
-
-            task["progress"] = percent
-            task["message"] = message
-
-            # 添加日志
-            log_entry = {
-                "time": datetime.now().strftime("%H:%M:%S"),
-                "message": message,
-                "percent": percent
-            }
-            task["logs"].append(log_entry)
-
-            # 更新状态
-            if percent == 100:
-                task["status"] = "completed"
-            elif percent == -1:
-                task["status"] = "failed"
-            elif percent > 0:
-                task["status"] = "processing"
-
-            logger.info(f"[任务 {task_id[:8]}] [{percent}%] {message}")
-
-        try:
-            # 创建处理器
-            processor = ProductStandardizer(
-                api_key=api_key,
-                progress_callback=progress_callback
-            )
-
-            # 处理订单
-            result_path = processor.process_order(
-                order_file_path=task["order_file"],
-                excel_file_path=task["output_file"]
-            )
-
-            task["result"] = str(result_path)
-            task["status"] = "completed"
-            logger.info(f"任务完成: {task_id}")
-
-        except Exception as e:
-            task["status"] = "failed"
-            task["message"] = f"处理失败: {str(e)}"
-            task["logs"].append({
-                "time": datetime.now().strftime("%H:%M:%S"),
-                "message": f"❌ 错误: {str(e)}",
-                "percent": -1
-            })
-            logger.error(f"任务失败: {task_id}, 错误: {e}", exc_info=True)
+
+        Returns:
+            是否取消成功（任务不存在或已结束时返回 False）
+        """
+        return self._abort_task(task_id, "cancelled", "任务已取消")
+
+    def _abort_task(self, task_id: str, status: str, message: str) -> bool:
+        if not self.store.abort(task_id, status, message):
+            return False
+        if self.worker is not None:
+            self.worker.cancel(task_id)
+        task = self.store.get_task(task_id, with_logs=False)
+        if task is not None:
+            cleanup_task_files(task)
+        logger.warning(f"任务已中止 ({status}): {task_id}")
+        return True
+
+    def count_by_status(self, status: str) -> int:
+        """
+        统计指定状态的任务数
+
+        Args:
+            status: 任务状态
+
+        Returns:
+            任务数量
+        """
+        return self.store.count_by_status(status)
+
+    def in_flight(self) -> int:
+        """在途任务数（等待 + 处理中）"""
+        return self.store.in_flight()
+
+    def recent_latencies(self, window_seconds: float) -> List[float]:
+        """最近结束的任务从提交到结束的耗时（所有工作进程）"""
+        return self.store.recent_latencies(window_seconds)
 
     def get_all_tasks(self) -> list:
         """获取所有任务列表"""
-        return list(self.tasks.values())
+        return self.store.list_tasks()
 
     def delete_task(self, task_id: str) -> bool:
         """
@@ -153,16 +313,26 @@ class TaskManager:
         Returns:
             是否删除成功
         """
-        if task_id in self.tasks:
-            # 清理输出文件
-            task = self.tasks[task_id]
-            if task.get("result"):
-                result_file = Path(task["result"])
-                if result_file.exists():
-                    result_file.unlink()
+        task = self.store.get_task(task_id, with_logs=False)
+        if task is None:
+            return False
+
+        # 仍在处理的任务先取消，释放工作进程
+        self._abort_task(task_id, "cancelled", "任务已删除")
+
+        # 清理输出文件和检查点
+        if task.get("result"):
+            result_file = Path(task["result"])
+            if result_file.exists():
+                result_file.unlink()
+        task_checkpoint(task).clear()
+
+        self.store.delete(task_id)
+        logger.info(f"任务已删除: {task_id}")
+        return True
 
-            del self.tasks[task_id]
-            logger.info(f"任务已删除: {task_id}")
-            return True
+    def shutdown(self):
+        """停止内嵌的工作线程（不再领取新任务）"""
+        if self.worker is not None:
+            self.worker.stop()
 
-        return False
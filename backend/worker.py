@@ -0,0 +1,366 @@
+"""
+任务工作进程
+
+从 JobStore 领取任务并处理，可以嵌入 API 进程运行（MAX_WORKERS > 0），也可以单独启动：
+
+    python -m backend.worker --concurrency 4
+
+多个工作进程（包括共享同一存储卷的其他节点）可以同时运行，任务通过租约互斥领取；
+API 进程和工作进程都可以各自水平扩展。
+"""
+
+import os
+import time
+import uuid
+import socket
+import shutil
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from shared.product_standardizer import ProductStandardizer
+from shared.llm_cassette import build_llm_client, parse_replay_latency
+from shared.cancellation import CancelToken, TaskCancelled, TaskTimedOut
+from shared.checkpoint import CheckpointStore, STAGE_PARSED
+from shared.parse_memo import PARSE_MEMO
+from shared.shop_index import ShopMatchConfig, load_shop_aliases
+from .config import settings
+from .metrics import observe_task
+from .job_store import JobStore, KIND_BATCH_MAPPING
+
+logger = logging.getLogger(__name__)
+
+
+def task_checkpoint(task: dict) -> CheckpointStore:
+    """任务的阶段检查点"""
+    return CheckpointStore(settings.checkpoint_dir / task["id"], task["fingerprint"])
+
+
+def cleanup_task_files(task: dict):
+    """删除任务的输出副本和临时文件"""
+    for path in [task["output_file"], *task.get("temp_files", [])]:
+        if not path:
+            continue
+        try:
+            Path(path).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"清理文件失败: {path}, {e}")
+
+
+def shop_match_config() -> ShopMatchConfig:
+    """按配置创建店铺匹配配置（别名文件在工作者启动时读取）"""
+    aliases = load_shop_aliases(settings.shop_aliases_file) if settings.shop_aliases_file else {}
+    keywords = tuple(keyword.strip() for keyword in settings.shop_keywords.split(',') if keyword.strip())
+    return ShopMatchConfig(aliases=aliases, keywords=keywords, max_distance=settings.shop_match_max_distance)
+
+
+def use_streaming(task: dict, checkpoint: CheckpointStore) -> bool:
+    """大订单文件流式处理；已有解析结果检查点时（如批量任务）使用常规流程复用检查点"""
+    if checkpoint.has(STAGE_PARSED):
+        return False
+    path = Path(task["order_file"])
+    if not path.exists():
+        return False
+    return path.stat().st_size >= settings.order_stream_threshold_mb * 1024 * 1024
+
+
+class Worker:
+    """任务工作者：若干个线程循环领取并处理任务"""
+
+    def __init__(self, store: JobStore, concurrency: int = 4, worker_id: Optional[str] = None,
+                 lease_seconds: Optional[float] = None, poll_interval: Optional[float] = None):
+        """
+        Args:
+            store: 任务存储
+            concurrency: 处理线程数
+            worker_id: 工作者标识（默认为 主机名:进程号:随机后缀）
+            lease_seconds: 租约时长，处理期间每 1/3 租约续约一次
+            poll_interval: 没有任务时的轮询间隔（秒）
+        """
+        if concurrency < 1:
+            raise ValueError("处理线程数至少为 1")
+        self.store = store
+        self.concurrency = concurrency
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds or settings.worker_lease_seconds
+        self.poll_interval = poll_interval or settings.worker_poll_interval
+        self.shop_match = shop_match_config()
+
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        # 正在处理的任务的取消令牌（本进程内取消时立即触发）
+        self._tokens: Dict[str, CancelToken] = {}
+        self._tokens_lock = threading.Lock()
+
+    def start(self):
+        """启动处理线程"""
+        if PARSE_MEMO.maxsize != settings.parse_memo_size:
+            PARSE_MEMO.resize(settings.parse_memo_size)
+        for slot in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, args=(f"{self.worker_id}/{slot}",),
+                                      name=f"task-worker-{slot}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"🛠️ 工作者已启动: {self.worker_id}（{self.concurrency} 个线程）")
+
+    def wake(self):
+        """有新任务入队时唤醒空闲线程，避免等待轮询间隔"""
+        self._wake.set()
+
+    def cancel(self, task_id: str) -> bool:
+        """
+        立即取消本工作者正在处理的任务（任务状态由调用方在 JobStore 中标记）
+
+        Returns:
+            任务是否正在本工作者中处理
+        """
+        with self._tokens_lock:
+            token = self._tokens.get(task_id)
+        if token is None:
+            return False
+        token.cancel()
+        return True
+
+    def stop(self, wait: bool = False):
+        """
+        停止领取新任务，正在处理的任务继续执行到结束
+
+        Args:
+            wait: 是否等待处理线程退出
+        """
+        self._stopped.set()
+        self._wake.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _loop(self, owner: str):
+        while not self._stopped.is_set():
+            try:
+                task = self.store.claim(owner, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"领取任务失败: {e}", exc_info=True)
+                task = None
+
+            if task is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            try:
+                self.run_task(task, owner)
+            except Exception as e:
+                logger.error(f"任务执行异常: {task['id']}, {e}", exc_info=True)
+
+    def run_task(self, task: dict, owner: str):
+        """
+        处理一个已领取的任务
+
+        Args:
+            task: 任务信息（来自 JobStore.claim）
+            owner: 持有租约的工作者标识
+        """
+        task_id = task["id"]
+        started = time.perf_counter()
+        cancel_token = CancelToken(settings.task_timeout)
+        checkpoint = task_checkpoint(task)
+        logger.info(f"开始处理任务: {task_id} (第 {task['attempts']} 次)")
+
+        def abort(status: str, message: str):
+            if self.store.abort(task_id, status, message, owner=owner):
+                logger.warning(f"任务已中止 ({status}): {task_id}")
+            cancel_token.cancel()
+
+        # 看门狗：到达截止时间立即把任务标记为超时；处理流程在检查点协作退出
+        watchdog = threading.Timer(settings.task_timeout, abort,
+                                   args=("timeout", f"任务处理超时（超过 {settings.task_timeout} 秒）"))
+        watchdog.daemon = True
+        watchdog.start()
+
+        # 心跳：每 1/3 租约续约一次，其间按 cancel_poll_interval 检查租约；
+        # 不再持有租约说明任务已被（其他进程）取消、超时或被其他工作者接管
+        heartbeat_stop = threading.Event()
+        renew_interval = self.lease_seconds / 3
+        poll_interval = min(settings.worker_cancel_poll_interval, renew_interval)
+
+        def heartbeat():
+            renewed = time.monotonic()
+            while not heartbeat_stop.wait(poll_interval):
+                try:
+                    if time.monotonic() - renewed >= renew_interval:
+                        held = self.store.renew_lease(task_id, owner, self.lease_seconds)
+                        renewed = time.monotonic()
+                    else:
+                        held = self.store.holds_lease(task_id, owner)
+                except Exception as e:
+                    logger.warning(f"续约失败: {task_id}, {e}")
+                    continue
+                if not held:
+                    cancel_token.cancel()
+                    return
+
+        heartbeat_thread = threading.Thread(target=heartbeat, name=f"lease-{task_id[:8]}", daemon=True)
+        heartbeat_thread.start()
+        with self._tokens_lock:
+            self._tokens[task_id] = cancel_token
+
+        def progress_callback(percent: int, message: str):
+            """进度回调函数"""
+            # 详细日志：只添加日志，不更新进度（一次回调可能合并了多条，以换行分隔）
+            if percent == -2:
+                self.store.append_detail_logs(task_id, owner, message.split("\n"))
+                return
+            # 失败由下面的异常处理统一记录
+            if percent == -1:
+                return
+            if self.store.update_progress(task_id, owner, percent, message):
+                logger.info(f"[任务 {task_id[:8]}] [{percent}%] {message}")
+
+        processor = None
+        status = "failed"
+        try:
+            api_key = self.store.get_api_key(task_id)
+            llm_client = build_llm_client(
+                api_key=api_key,
+                base_url=settings.deepseek_base_url,
+                cassette_mode=settings.llm_cassette_mode,
+                cassette_dir=settings.llm_cassette_dir,
+                replay_latency=parse_replay_latency(settings.llm_replay_latency),
+                max_retries=settings.llm_max_retries,
+                timeout=settings.llm_timeout
+            )
+            processor = ProductStandardizer(
+                api_key=api_key,
+                base_url=settings.deepseek_base_url,
+                progress_callback=progress_callback,
+                mapping_mode=task["mapping_mode"],
+                llm_client=llm_client,
+                detail_logs=task["detail_logs"],
+                shop_match=self.shop_match
+            )
+
+            if task["kind"] == KIND_BATCH_MAPPING:
+                result, message = self._prepare_batch(processor, task, cancel_token)
+            else:
+                # 每次处理都从模板重新复制（上一次可能写了一半）
+                shutil.copy(task["excel_file"], task["output_file"])
+                result = str(processor.process_order(
+                    order_file_path=task["order_file"],
+                    excel_file_path=task["output_file"],
+                    profile_memory=task["profile_memory"],
+                    cancel_token=cancel_token,
+                    checkpoint=checkpoint,
+                    streaming=use_streaming(task, checkpoint)
+                ))
+                message = None
+
+            if self.store.finish(task_id, owner, "completed", message=message, result=result,
+                                 timings=processor.timings, memory_profile=processor.memory_profile):
+                status = "completed"
+                # 完成后检查点不再需要
+                checkpoint.clear()
+                logger.info(f"任务完成: {task_id}")
+            else:
+                status = "cancelled"
+
+        except TaskCancelled as e:
+            # 一般已由取消接口或看门狗标记；这里处理检查点先于看门狗发现超时、以及租约丢失的情况
+            status = "timeout" if isinstance(e, TaskTimedOut) else "cancelled"
+            abort(status, str(e))
+
+        except Exception as e:
+            fields = {}
+            if processor is not None:
+                fields = {"timings": processor.timings, "memory_profile": processor.memory_profile}
+            if self.store.finish(task_id, owner, "failed", message=f"处理失败: {str(e)}",
+                                 log=f"❌ 错误: {str(e)}", **fields):
+                logger.error(f"任务失败: {task_id}, 错误: {e}", exc_info=True)
+
+        finally:
+            watchdog.cancel()
+            heartbeat_stop.set()
+            with self._tokens_lock:
+                self._tokens.pop(task_id, None)
+
+        timings = processor.timings if processor is not None else {}
+        if status != "completed":
+            current = self.store.get_task(task_id, with_logs=False)
+            if current is not None:
+                status = current["status"]
+                if status in ("cancelled", "timeout"):
+                    if processor is not None:
+                        self.store.save_results(task_id, timings=processor.timings,
+                                                memory_profile=processor.memory_profile)
+                    # 工作线程可能在任务被取消后才退出，再清理一次它留下的文件
+                    cleanup_task_files(task)
+
+        observe_task(status, task["mapping_mode"], time.perf_counter() - started, timings)
+
+    def _prepare_batch(self, processor: ProductStandardizer, task: dict,
+                       cancel_token: CancelToken) -> tuple:
+        """
+        执行批量任务的共享映射，结果写入各订单任务的检查点
+
+        Returns:
+            (result, message)：共享映射任务没有输出文件，result 为 None
+        """
+        items = self.store.get_batch_items(task["batch_id"], status="waiting")
+        mapping, errors = processor.prepare_batch(
+            [item["order_file"] for item in items],
+            [task_checkpoint(item) for item in items],
+            cancel_token=cancel_token
+        )
+        for index, error in errors.items():
+            self.store.fail_waiting(items[index]["id"], f"处理失败: {error}")
+        return None, f"批量商品映射完成: {len(mapping)} 个商品变体，{len(items) - len(errors)}/{len(items)} 个订单"
+
+
+def main():
+    from shared.metrics import REGISTRY
+    from .logging_setup import setup_logging, shutdown_logging
+
+    parser = argparse.ArgumentParser(description="订单处理工作进程")
+    parser.add_argument("--concurrency", type=int, default=max(settings.max_workers, 1), help="处理线程数")
+    parser.add_argument("--worker-id", default=None, help="工作者标识（默认为 主机名:进程号:随机后缀）")
+    parser.add_argument("--metrics-port", type=int, default=0, help="指标端口（0 表示不开启）")
+    args = parser.parse_args()
+
+    setup_logging()
+    store = JobStore.from_settings()
+    worker = Worker(store, concurrency=args.concurrency, worker_id=args.worker_id)
+
+    if args.metrics_port:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = REGISTRY.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("0.0.0.0", args.metrics_port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"📊 指标端口: {args.metrics_port}")
+
+    worker.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        logger.info("正在停止工作进程，等待处理中的任务结束...")
+        worker.stop(wait=True)
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
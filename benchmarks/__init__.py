@@ -0,0 +1,5 @@
+"""
+性能测试与压测工具
+
+- llm_stub: 本地 OpenAI 兼容的 /chat/completions 桩服务（可注入延迟和故障）
+"""
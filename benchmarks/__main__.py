@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能测试命令行入口
+
+使用方法：
+    # 生成测试数据（订单文件 + Excel 模板）
+    python -m benchmarks generate --shops 200 --lines 12 --skus 500 --out-dir bench_data
+
+    # 运行分阶段性能测试并保存结果（先做对照校验，不一致时退出码为 1，不计时）
+    python -m benchmarks run --shops 200 --lines 12 --skus 500 --output bench_results/current.json
+
+    # 与基线对比，出现回退时退出码为 1
+    python -m benchmarks compare bench_results/baseline.json bench_results/current.json --threshold 0.1
+
+    # 商品行解析器：与参考实现逐行对照（不一致时退出码为 1），并对比吞吐量
+    python -m benchmarks parser --lines 100000
+
+    # 店铺列解析：按对照用例校验（不一致时退出码为 1）
+    python -m benchmarks shops
+
+    # 全部对照校验（商品行解析 + 店铺列解析，不计时），不一致时退出码为 1，可用于 CI
+    python -m benchmarks check
+"""
+
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+from .generators import generate_shop_names, write_order_file, write_template
+from .stages import (
+    ALL_STAGES, BenchmarkCase, run_benchmarks, save_results, load_results, compare_results
+)
+from .reference_parser import check_parser, benchmark_parser
+from .shop_cases import GOLDEN_SHOPS, check_shop_index
+
+
+def _add_case_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--shops", type=int, default=100, help="店铺数量 (默认: 100)")
+    parser.add_argument("--lines", type=int, default=10, help="每个店铺的商品行数 (默认: 10)")
+    parser.add_argument("--skus", type=int, default=200, help="模板商品行数 (默认: 200)")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+    parser.add_argument("--noise-rate", type=float, default=0.02, help="噪声行比例 (默认: 0.02)")
+    parser.add_argument("--typo-rate", type=float, default=0.05, help="错别字比例 (默认: 0.05)")
+
+
+def _case_from_args(args) -> BenchmarkCase:
+    return BenchmarkCase(
+        shops=args.shops,
+        lines=args.lines,
+        skus=args.skus,
+        seed=args.seed,
+        llm_latency=getattr(args, "llm_latency", "fixed:0"),
+        noise_rate=args.noise_rate,
+        typo_rate=args.typo_rate
+    )
+
+
+def cmd_generate(args) -> int:
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    shop_names = generate_shop_names(args.shops, args.seed)
+    order_file = write_order_file(out_dir / "order.txt", args.shops, args.lines, seed=args.seed,
+                                  noise_rate=args.noise_rate, typo_rate=args.typo_rate,
+                                  shop_names=shop_names)
+    template_file = write_template(out_dir / "template.xlsx", args.skus, shop_names, seed=args.seed)
+    print(f"✅ 订单文件: {order_file}")
+    print(f"✅ Excel 模板: {template_file}")
+    return 0
+
+
+def _run_checks(seed: int = 42) -> int:
+    """运行全部对照校验，返回不一致的数量"""
+    parser_mismatches = check_parser(seed=seed)
+    for mismatch in parser_mismatches[:20]:
+        print(f"❌ 商品行解析: {mismatch}")
+    shop_mismatches = check_shop_index()
+    for mismatch in shop_mismatches:
+        print(f"❌ 店铺列解析: {mismatch}")
+    return len(parser_mismatches) + len(shop_mismatches)
+
+
+def cmd_check(args) -> int:
+    mismatches = _run_checks(seed=args.seed)
+    if mismatches:
+        print(f"\n❌ 对照校验不一致: {mismatches} 处")
+        return 1
+    print(f"✅ 对照校验通过（商品行解析与参考实现一致，店铺列解析 {len(GOLDEN_SHOPS)} 个用例）")
+    return 0
+
+
+def cmd_run(args) -> int:
+    # 结果与参考实现不一致时计时没有意义
+    mismatches = _run_checks(seed=args.seed)
+    if mismatches:
+        print(f"\n❌ 对照校验不一致: {mismatches} 处，不运行性能测试")
+        return 1
+
+    stages = args.stages.split(',') if args.stages else None
+    results = run_benchmarks(_case_from_args(args), repeat=args.repeat, stages=stages,
+                             workdir=args.workdir)
+
+    print(f"{'阶段':<14}{'中位数(s)':>12}{'最小(s)':>12}{'条/秒':>14}")
+    for stage, stats in results["stages"].items():
+        rate = f"{stats['items_per_sec']:.0f}" if stats["items_per_sec"] else "-"
+        print(f"{stage:<14}{stats['median']:>12.4f}{stats['min']:>12.4f}{rate:>14}")
+
+    if args.output:
+        path = save_results(results, args.output)
+        print(f"\n结果已保存: {path}")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    if baseline.get("case") != current.get("case"):
+        print("⚠️  两次测试的参数不同，对比结果仅供参考")
+
+    rows = compare_results(baseline, current, threshold=args.threshold, metric=args.metric)
+    marks = {"ok": "  ", "regression": "❌", "improved": "✅", "new": "🆕", "missing": "⚠️"}
+
+    print(f"   {'阶段':<14}{'基线(s)':>12}{'本次(s)':>12}{'比值':>10}")
+    for row in rows:
+        base = f"{row['baseline']:.4f}" if row["baseline"] is not None else "-"
+        cur = f"{row['current']:.4f}" if row["current"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+        print(f"{marks[row['status']]} {row['stage']:<14}{base:>12}{cur:>12}{ratio:>10}")
+
+    regressions = [row["stage"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n❌ 性能回退（超过 {args.threshold:.0%}）: {', '.join(regressions)}")
+        return 1
+    print("\n✅ 没有发现性能回退")
+    return 0
+
+
+def cmd_parser(args) -> int:
+    mismatches = check_parser(seed=args.seed)
+    for mismatch in mismatches[:20]:
+        print(f"❌ {mismatch}")
+    if mismatches:
+        print(f"\n❌ 与参考实现不一致: {len(mismatches)} 处")
+        return 1
+    print("✅ 与参考实现完全一致（对照语料、生成的订单行、随机组合行）")
+
+    stats = benchmark_parser(args.lines, repeat=args.repeat, seed=args.seed)
+    print(f"\n{'实现':<14}{'行/秒':>14}")
+    print(f"{'reference':<14}{stats['reference']:>14.0f}")
+    print(f"{'current':<14}{stats['current']:>14.0f}")
+    print(f"\n提升: {stats['speedup']:.1f}x（{stats['lines']} 行，解析 + 名称标准化）")
+    return 0
+
+
+def cmd_shops(args) -> int:
+    mismatches = check_shop_index()
+    for mismatch in mismatches:
+        print(f"❌ {mismatch}")
+    if mismatches:
+        print(f"\n❌ 店铺列解析与期望不一致: {len(mismatches)}/{len(GOLDEN_SHOPS)} 个用例")
+        return 1
+    print(f"✅ 店铺列解析与期望一致（{len(GOLDEN_SHOPS)} 个用例）")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="四海订单处理 - 性能测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="生成测试订单文件和 Excel 模板")
+    _add_case_arguments(generate_parser)
+    generate_parser.add_argument("--out-dir", default="bench_data", help="输出目录 (默认: bench_data)")
+    generate_parser.set_defaults(func=cmd_generate)
+
+    run_parser = subparsers.add_parser("run", help="运行分阶段性能测试")
+    _add_case_arguments(run_parser)
+    run_parser.add_argument("--repeat", type=int, default=5, help="每个阶段重复次数 (默认: 5)")
+    run_parser.add_argument("--stages", default=None,
+                            help=f"只运行指定阶段，逗号分隔 (可选: {','.join(ALL_STAGES)})")
+    run_parser.add_argument("--llm-latency", default="fixed:0",
+                            help="桩客户端的延迟分布，如 fixed:0.5、lognormal:-0.5,0.4 (默认: fixed:0)")
+    run_parser.add_argument("--workdir", default=None, help="测试数据目录 (默认: 临时目录)")
+    run_parser.add_argument("--output", default=None, help="结果 JSON 输出路径")
+    run_parser.set_defaults(func=cmd_run)
+
+    compare_parser = subparsers.add_parser("compare", help="与基线结果对比")
+    compare_parser.add_argument("baseline", help="基线结果 JSON")
+    compare_parser.add_argument("current", help="本次结果 JSON")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="允许的变慢比例 (默认: 0.10)")
+    compare_parser.add_argument("--metric", choices=["min", "median", "mean"], default="median",
+                                help="对比的统计量 (默认: median)")
+    compare_parser.set_defaults(func=cmd_compare)
+
+    parser_parser = subparsers.add_parser("parser", help="商品行解析器：对照参考实现并测试吞吐量")
+    parser_parser.add_argument("--lines", type=int, default=100000, help="测试行数 (默认: 100000)")
+    parser_parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最快一次 (默认: 5)")
+    parser_parser.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+    parser_parser.set_defaults(func=cmd_parser)
+
+    shops_parser = subparsers.add_parser("shops", help="店铺列解析：按对照用例校验")
+    shops_parser.set_defaults(func=cmd_shops)
+
+    check_cmd_parser = subparsers.add_parser("check", help="全部对照校验（商品行解析 + 店铺列解析）")
+    check_cmd_parser.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+    check_cmd_parser.set_defaults(func=cmd_check)
+
+    args = parser.parse_args()
+
+    # 性能测试时只输出警告以上的日志，避免日志 I/O 干扰计时
+    logging.getLogger().setLevel(logging.WARNING)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
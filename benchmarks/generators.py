@@ -0,0 +1,240 @@
+"""
+合成数据生成器
+
+- 订单文件：N 个店铺 × M 行，覆盖 parse_product_line 支持的全部格式，可加入噪声和错别字
+- Excel 模板：K 个商品行 × S 个店铺列，版式与真实模板一致（第 2 行表头，第 3 列商品名称）
+"""
+
+import random
+from pathlib import Path
+from typing import List, Optional, Union
+
+from openpyxl import Workbook
+
+# 标准商品（与 ProductStandardizer.standard_products 一致）及常见简写
+PRODUCT_ALIASES = {
+    "四海170g鱼蛋鲜装": ["鱼蛋鲜装", "鱼蛋"],
+    "四海150g鱼之豆腐鲜装": ["鱼之豆腐", "鱼豆腐"],
+    "四海250g手打香菇贡丸鲜装": ["手打香菇贡丸", "香菇贡丸", "手打香菇丸"],
+    "四海170g八爪鱼味鱼球鲜装": ["八爪鱼味鱼球", "八爪鱼味鱼丸", "八爪鱼丸"],
+    "四海250g手打牛筋丸鲜装": ["手打牛筋丸", "牛筋丸"],
+    "四海250g手打牛肉丸鲜装": ["手打牛肉丸"],
+    "四海200g鲜装鱼籽虾饼": ["鱼籽虾饼", "鲜装鱼籽虾饼"],
+    "四海170g鲜装台湾花枝味鱼丸": ["台湾花枝味鱼丸", "台湾花枝丸", "花枝味鱼丸"],
+    "四海170g鲜装墨鱼味鱼丸": ["墨鱼味鱼丸", "墨鱼丸"],
+    "四海250g墨鱼鱼饼": ["墨鱼鱼饼"],
+    "四海150g鲜装牛肉丸": ["鲜装牛肉丸", "牛肉丸"],
+}
+
+# 常见错别字（真实订单中出现过的）
+TYPOS = {"菇": "茹", "枝": "技", "筋": "斤", "籽": "子", "豆腐": "豆付"}
+
+# 店铺名称素材
+CITIES = ["长沙", "岳阳", "株洲", "湘潭", "衡阳", "邵阳", "常德", "益阳", "郴州", "永州",
+          "怀化", "娄底", "张家界", "吉首", "浏阳", "宁乡", "醴陵", "韶山", "汨罗", "耒阳"]
+PLACES = ["五江", "金海", "洋湖", "砂之船", "新天地", "万达", "步步高", "梅溪湖", "九华",
+          "易俗河", "碧桂园", "丽发新城", "天元", "金星路", "购广", "东方红", "十字街", "舜德"]
+SUFFIXES = ["店", "广场店", "", "旗舰店", ""]
+
+# 模板中的非店铺列（与 update_excel_file 的排除列表一致）
+TEMPLATE_FIXED_COLUMNS = ["序号", "商品编码", "商品名称", "规格", "入库价", "售价", "前台毛利"]
+
+# 合成商品素材（用于把模板扩充到 K 行）
+FILLER_FLAVORS = ["鸡肉", "猪肉", "虾仁", "蟹柳", "芝士", "黑椒", "咖喱", "紫菜", "玉米", "鳕鱼"]
+FILLER_KINDS = ["肠", "饺", "卷", "排", "棒", "串", "包", "酥"]
+
+
+def generate_shop_names(count: int, seed: Optional[int] = None) -> List[str]:
+    """
+    生成不重复的店铺名称
+
+    Args:
+        count: 店铺数量
+        seed: 随机种子
+
+    Returns:
+        店铺名称列表
+    """
+    rng = random.Random(seed)
+    names: List[str] = []
+    seen = set()
+    while len(names) < count:
+        name = rng.choice(CITIES) + rng.choice(PLACES) + rng.choice(SUFFIXES)
+        if name in seen:
+            name = f"{name}{len(names) + 1}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _product_text(rng: random.Random, standard_name: str, typo_rate: float) -> str:
+    """生成一个商品名称的随机写法（重量单位、是否带品牌/鲜装、错别字）"""
+    weight = standard_name[2:standard_name.index('g')]
+    choice = rng.random()
+    if choice < 0.15:
+        name = standard_name
+    elif choice < 0.6:
+        unit = rng.choice(["g", "g", "克", "G"])
+        name = f"{weight}{unit}{rng.choice(PRODUCT_ALIASES[standard_name])}"
+    else:
+        name = rng.choice(PRODUCT_ALIASES[standard_name])
+
+    if rng.random() < typo_rate:
+        for right, wrong in TYPOS.items():
+            if right in name:
+                name = name.replace(right, wrong, 1)
+                break
+    return name
+
+
+def _format_line(rng: random.Random, name: str, quantity: int) -> str:
+    """按 parse_product_line 支持的格式之一输出一行"""
+    style = rng.randrange(8)
+    if style == 0:
+        return f"{name}:{quantity}件"
+    if style == 1:
+        return f"{name}：{quantity}件"
+    if style == 2:
+        return f"{name}：{quantity}"
+    if style == 3:
+        return f"{name}  {quantity}件"
+    if style == 4:
+        return f"{name}    {quantity}"
+    if style == 5:
+        return f"{name}{quantity}件"
+    if style == 6:
+        return f"{name}{quantity} 件"
+    return f"{name}{quantity}"
+
+
+def generate_order_text(n_shops: int, lines_per_shop: int, seed: Optional[int] = None,
+                        noise_rate: float = 0.02, typo_rate: float = 0.05,
+                        shop_names: Optional[List[str]] = None) -> str:
+    """
+    生成 order.txt 格式的订单文本
+
+    Args:
+        n_shops: 店铺数量
+        lines_per_shop: 每个店铺的商品行数
+        seed: 随机种子
+        noise_rate: 噪声行（无法本地解析的备注、多余空格）的比例
+        typo_rate: 商品名称出现错别字的比例
+        shop_names: 指定店铺名称（默认随机生成）
+
+    Returns:
+        订单文本
+    """
+    rng = random.Random(seed)
+    shop_names = shop_names or generate_shop_names(n_shops, seed)
+    standard_names = list(PRODUCT_ALIASES)
+    blocks = []
+
+    for shop_name in shop_names[:n_shops]:
+        header_style = rng.randrange(3)
+        if header_style == 0:
+            header = f"{shop_name}:"
+        elif header_style == 1:
+            header = f"{shop_name}："
+        else:
+            header = shop_name
+
+        lines = [header]
+        for _ in range(lines_per_shop):
+            if rng.random() < noise_rate:
+                lines.append(rng.choice(["请尽快安排配送", "  谢谢  ", "周五前到货"]))
+                continue
+            name = _product_text(rng, rng.choice(standard_names), typo_rate)
+            line = _format_line(rng, name, rng.randint(1, 20))
+            if rng.random() < noise_rate:
+                line = f"  {line} "
+            lines.append(line)
+        blocks.append("\n".join(lines))
+
+    return "\n\n".join(blocks) + "\n"
+
+
+def write_order_file(path: Union[str, Path], n_shops: int, lines_per_shop: int,
+                     seed: Optional[int] = None, **kwargs) -> Path:
+    """
+    生成订单文件
+
+    Args:
+        path: 输出路径
+        n_shops: 店铺数量
+        lines_per_shop: 每个店铺的商品行数
+        seed: 随机种子
+        **kwargs: 传给 generate_order_text 的其他参数
+
+    Returns:
+        订单文件路径
+    """
+    path = Path(path)
+    path.write_text(generate_order_text(n_shops, lines_per_shop, seed=seed, **kwargs), encoding='utf-8')
+    return path
+
+
+def generate_sku_names(k_skus: int, seed: Optional[int] = None) -> List[str]:
+    """
+    生成 K 个商品名称（前 11 个为标准商品，其余为合成商品）
+
+    Args:
+        k_skus: 商品数量
+        seed: 随机种子
+
+    Returns:
+        商品名称列表
+    """
+    rng = random.Random(seed)
+    names = list(PRODUCT_ALIASES)[:k_skus]
+    seen = set(names)
+    while len(names) < k_skus:
+        name = (f"四海{rng.choice([100, 150, 200, 250, 300, 500])}g"
+                f"{rng.choice(FILLER_FLAVORS)}{rng.choice(FILLER_KINDS)}")
+        if name in seen:
+            name = f"{name}{len(names)}号"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def write_template(path: Union[str, Path], k_skus: int, shop_names: List[str],
+                   seed: Optional[int] = None) -> Path:
+    """
+    生成与真实订货模板版式一致的 Excel 模板
+
+    第 1 行标题，第 2 行表头（固定列 + 店铺列），第 3 行起每行一个商品，商品名称在第 3 列。
+    商品行顺序随机打乱，避免标准商品总是出现在表头附近。
+
+    Args:
+        path: 输出路径
+        k_skus: 商品行数
+        shop_names: 店铺列名称
+        seed: 随机种子
+
+    Returns:
+        模板文件路径
+    """
+    rng = random.Random(seed)
+    sku_names = generate_sku_names(k_skus, seed)
+    rng.shuffle(sku_names)
+
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.cell(row=1, column=1, value="四海订货单")
+
+    headers = TEMPLATE_FIXED_COLUMNS + list(shop_names)
+    for col, header in enumerate(headers, start=1):
+        worksheet.cell(row=2, column=col, value=header)
+
+    for index, sku_name in enumerate(sku_names):
+        row = index + 3
+        worksheet.cell(row=row, column=1, value=index + 1)
+        worksheet.cell(row=row, column=2, value=f"SH{100000 + index}")
+        worksheet.cell(row=row, column=3, value=sku_name)
+        worksheet.cell(row=row, column=4, value="1*20")
+        worksheet.cell(row=row, column=5, value=round(rng.uniform(8, 30), 2))
+        worksheet.cell(row=row, column=6, value=round(rng.uniform(10, 40), 2))
+
+    path = Path(path)
+    workbook.save(path)
+    return path
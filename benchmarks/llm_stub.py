@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 Deepseek 桩服务（OpenAI 兼容的 /chat/completions 接口）
+
+由本地确定性匹配器（NgramMatcher + 本地行解析）生成响应，支持配置延迟分布、
+错误率、429 注入和并发上限，用于在不访问真实 API 的情况下压测 Web 服务、
+观察重试和并发行为。
+
+使用方法：
+    python -m benchmarks.llm_stub --port 8100 --latency lognormal:-0.5,0.4 --error-rate 0.02 --rate-429 0.05
+
+然后把服务指向桩服务：
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8100 python start_server.py
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import threading
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from shared.ngram_matcher import NgramMatcher
+from shared.product_standardizer import ProductStandardizer, MAPPING_MODE_LOCAL
+
+# 与 ProductStandardizer 中提示词对应的标记
+MAPPING_PROMPT_PATTERN = re.compile(r'需要映射的商品名称[^\n]*：\s*(\[.*?\])\s*\n', re.DOTALL)
+BATCH_PARSE_MARKER = "订单行列表："
+BATCH_LINE_PATTERN = re.compile(r'^(\d+)\.\s(.*)$', re.MULTILINE)
+SINGLE_PARSE_PATTERN = re.compile(r'订单行："(.*)"')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数（中文约每 2 个字符 1 个 token）"""
+    return max(1, len(text) // 2)
+
+
+@dataclass
+class LatencyDistribution:
+    """
+    延迟分布（秒）
+
+    规格字符串格式：
+        fixed:0.5            固定延迟
+        uniform:0.2,1.5      均匀分布
+        normal:0.8,0.2       正态分布（均值, 标准差），负值截断为 0
+        lognormal:-0.5,0.4   对数正态分布（mu, sigma）
+        exp:0.8              指数分布（均值）
+    """
+    kind: str = "fixed"
+    params: Tuple[float, ...] = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        kind, _, raw = spec.partition(':')
+        kind = kind.strip().lower()
+        params = tuple(float(p) for p in raw.split(',') if p.strip()) if raw else ()
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+        if kind not in expected:
+            raise ValueError(f"不支持的延迟分布: {kind}")
+        if len(params) != expected[kind]:
+            raise ValueError(f"延迟分布 {kind} 需要 {expected[kind]} 个参数")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(*self.params)
+        else:
+            value = rng.expovariate(1.0 / self.params[0]) if self.params[0] > 0 else 0.0
+        return max(0.0, value)
+
+
+@dataclass
+class FaultProfile:
+    """故障注入配置"""
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    error_rate: float = 0.0      # 返回 500 的概率
+    rate_429: float = 0.0        # 返回 429 的概率
+    retry_after: float = 1.0     # 429 响应的 Retry-After（秒）
+    max_concurrent: int = 0      # 同时处理的请求上限，超过返回 429（0 表示不限制）
+    seed: Optional[int] = None
+
+
+class StubBackend:
+    """根据提示词类型生成确定性的响应内容"""
+
+    def __init__(self, standard_products: Optional[List[str]] = None):
+        self.parser = ProductStandardizer(api_key=None, mapping_mode=MAPPING_MODE_LOCAL)
+        self.matcher = NgramMatcher(standard_products or self.parser.standard_products)
+
+    def complete(self, messages: List[Dict[str, Any]]) -> str:
+        """
+        生成响应文本
+
+        Args:
+            messages: 对话消息列表
+
+        Returns:
+            模型响应文本（JSON）
+        """
+        prompt = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "user")
+
+        # 商品映射
+        match = MAPPING_PROMPT_PATTERN.search(prompt)
+        if match:
+            names = json.loads(match.group(1))
+            return json.dumps(self.matcher.match(names), ensure_ascii=False)
+
+        # 批量行解析
+        if BATCH_PARSE_MARKER in prompt:
+            section = prompt.split(BATCH_PARSE_MARKER, 1)[1]
+            results = []
+            for number, line in BATCH_LINE_PATTERN.findall(section):
+                product_name, quantity = self.parser.parse_product_line(line)
+                results.append({"line": int(number), "product_name": product_name, "quantity": quantity})
+            return json.dumps(results, ensure_ascii=False)
+
+        # 单行解析
+        match = SINGLE_PARSE_PATTERN.search(prompt)
+        if match:
+            product_name, quantity = self.parser.parse_product_line(match.group(1))
+            return json.dumps({"product_name": product_name, "quantity": quantity}, ensure_ascii=False)
+
+        return "{}"
+
+
+class StubClient:
+    """
+    进程内桩客户端
+
+    与 OpenAI 客户端相同的 chat.completions.create 接口，直接调用 StubBackend，
+    可按延迟分布 sleep 模拟网络耗时。用于阶段性能测试等不需要 HTTP 的场景。
+    """
+
+    def __init__(self, backend: Optional[StubBackend] = None,
+                 latency: Optional[LatencyDistribution] = None, seed: Optional[int] = None):
+        self.backend = backend or StubBackend()
+        self.latency = latency or LatencyDistribution()
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs) -> Any:
+        self.calls += 1
+        delay = self.latency.sample(self.rng)
+        # 与真实客户端一样遵守单次请求的 timeout
+        timeout = kwargs.get("timeout")
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"桩客户端请求超时（{timeout:.2f}s）")
+        if delay > 0:
+            time.sleep(delay)
+
+        messages = kwargs.get("messages", [])
+        content = self.backend.complete(messages)
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        return SimpleNamespace(
+            model=kwargs.get("model", "deepseek-chat"),
+            choices=[SimpleNamespace(
+                index=0,
+                finish_reason="stop",
+                message=SimpleNamespace(role="assistant", content=content)
+            )],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens
+            )
+        )
+
+
+class StubStats:
+    """桩服务的请求统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.ok = 0
+            self.errors = 0
+            self.rate_limited = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.total_latency = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "ok": self.ok,
+                "errors": self.errors,
+                "rateLimited": self.rate_limited,
+                "inFlight": self.in_flight,
+                "maxInFlight": self.max_in_flight,
+                "avgLatency": self.total_latency / self.ok if self.ok else 0.0
+            }
+
+
+def _error_response(status: int, message: str, error_type: str,
+                    headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """OpenAI 格式的错误响应"""
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": error_type, "code": status}},
+        headers=headers
+    )
+
+
+def create_app(backend: Optional[StubBackend] = None,
+               profile: Optional[FaultProfile] = None) -> FastAPI:
+    """
+    创建桩服务应用
+
+    Args:
+        backend: 响应生成器
+        profile: 故障注入配置
+
+    Returns:
+        FastAPI 应用
+    """
+    backend = backend or StubBackend()
+    profile = profile or FaultProfile()
+    rng = random.Random(profile.seed)
+    stats = StubStats()
+
+    app = FastAPI(title="Deepseek 桩服务")
+    app.state.profile = profile
+    app.state.stats = stats
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+
+        with stats._lock:
+            stats.requests += 1
+            over_limit = profile.max_concurrent and stats.in_flight >= profile.max_concurrent
+            roll = rng.random()
+            delay = profile.latency.sample(rng)
+            if not over_limit:
+                stats.in_flight += 1
+                stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+
+        retry_headers = {"Retry-After": f"{profile.retry_after:g}"}
+        if over_limit:
+            with stats._lock:
+                stats.rate_limited += 1
+            return _error_response(429, "并发请求过多", "rate_limit_error", retry_headers)
+
+        try:
+            if roll < profile.rate_429:
+                with stats._lock:
+                    stats.rate_limited += 1
+                return _error_response(429, "请求频率超限（注入）", "rate_limit_error", retry_headers)
+
+            await asyncio.sleep(delay)
+
+            if roll < profile.rate_429 + profile.error_rate:
+                with stats._lock:
+                    stats.errors += 1
+                return _error_response(500, "服务内部错误（注入）", "server_error")
+
+            messages = body.get("messages", [])
+            content = backend.complete(messages)
+            prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+            completion_tokens = estimate_tokens(content)
+
+            with stats._lock:
+                stats.ok += 1
+                stats.total_latency += delay
+
+            return {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "deepseek-chat"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            }
+        finally:
+            with stats._lock:
+                stats.in_flight -= 1
+
+    app.add_api_route("/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+
+    @app.get("/stub/stats")
+    async def get_stats():
+        """请求统计"""
+        return stats.snapshot()
+
+    @app.post("/stub/reset")
+    async def reset_stats():
+        """重置统计"""
+        stats.reset()
+        return {"success": True}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Deepseek 桩服务（延迟与故障注入）")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址 (默认: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8100, help="监听端口 (默认: 8100)")
+    parser.add_argument("--latency", default="fixed:0",
+                        help="延迟分布，如 fixed:0.5、uniform:0.2,1.5、normal:0.8,0.2、lognormal:-0.5,0.4、exp:0.8")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的概率 (默认: 0)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="返回 429 的概率 (默认: 0)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 响应的 Retry-After 秒数 (默认: 1)")
+    parser.add_argument("--max-concurrent", type=int, default=0, help="并发上限，超过返回 429 (默认: 不限制)")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    profile = FaultProfile(
+        latency=LatencyDistribution.parse(args.latency),
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        max_concurrent=args.max_concurrent,
+        seed=args.seed
+    )
+
+    import uvicorn
+    uvicorn.run(create_app(profile=profile), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
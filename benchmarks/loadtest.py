@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Web 服务 HTTP 压测工具
+
+按完整的用户流程驱动 backend.main:app：上传订单和模板 → 提交处理 → 轮询任务状态 → 下载结果。
+支持闭环（固定并发）和开环（泊松到达率）两种负载模式，默认自动启动本地桩服务
+（benchmarks.llm_stub）和 Web 服务，统计：
+
+- 任务完成耗时（服务端 createdAt → finishedAt，以及客户端完整流程耗时）的 p50/p95/p99
+- 排队等待（服务端 createdAt → startedAt）的 p50/p95/p99
+- 各接口响应耗时的 p50/p95/p99
+- 服务进程 RSS 随时间的变化（Linux 下读取 /proc）
+
+使用方法：
+    # 自动启动桩服务和 Web 服务，8 并发跑 200 个任务
+    python -m benchmarks.loadtest --concurrency 8 --tasks 200 --llm-latency lognormal:-0.5,0.4
+
+    # 开环：每秒 5 个任务，持续 60 秒，结果写入 JSON
+    python -m benchmarks.loadtest --rate 5 --duration 60 --output bench_results/load.json
+
+    # 压测已启动的服务（需自行把服务的 DEEPSEEK_BASE_URL 指向桩服务）
+    python -m benchmarks.loadtest --target http://127.0.0.1:8000 --server-pid 12345
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import subprocess
+import tempfile
+import statistics
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .generators import generate_shop_names, generate_order_text, write_template
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """计算分位数（线性插值），q 取 0~100"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    """统计 p50/p95/p99 等指标"""
+    return {
+        "count": len(values),
+        "mean": statistics.mean(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None
+    }
+
+
+def read_rss_bytes(pid: int) -> Optional[int]:
+    """读取进程常驻内存（Linux /proc），无法读取时返回 None"""
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+def _seconds_between(start: Optional[str], end: Optional[str]) -> Optional[float]:
+    if not start or not end:
+        return None
+    return (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds()
+
+
+class LoadTester:
+    """压测执行器"""
+
+    def __init__(self, base_url: str, order_texts: List[str], template_path: Path,
+                 poll_interval: float = 0.2, task_timeout: float = 600,
+                 reuse_template: bool = False, mapping_mode: Optional[str] = None):
+        self.base_url = base_url.rstrip('/')
+        self.order_texts = order_texts
+        self.template_path = template_path
+        self.poll_interval = poll_interval
+        self.task_timeout = task_timeout
+        self.reuse_template = reuse_template
+        self.mapping_mode = mapping_mode
+
+        self.api_latency: Dict[str, List[float]] = {}
+        self.task_records: List[Dict[str, Any]] = []
+        self.errors: Dict[str, int] = {}
+        self._template_id: Optional[str] = None
+
+    async def _request(self, client: httpx.AsyncClient, name: str, method: str,
+                       url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.api_latency.setdefault(name, []).append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            key = f"{name}:{response.status_code}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+            response.raise_for_status()
+        return response
+
+    async def _upload(self, client: httpx.AsyncClient, filename: str, content: bytes) -> str:
+        response = await self._request(client, "upload", "POST", "/api/upload",
+                                       files={"file": (filename, content)})
+        return response.json()["fileId"]
+
+    async def run_one(self, client: httpx.AsyncClient, index: int):
+        """执行一次完整的用户流程"""
+        record: Dict[str, Any] = {"index": index, "status": "error"}
+        started = time.perf_counter()
+        try:
+            order_text = self.order_texts[index % len(self.order_texts)]
+            order_id = await self._upload(client, "order.txt", order_text.encode('utf-8'))
+
+            if self.reuse_template and self._template_id:
+                template_id = self._template_id
+            else:
+                template_id = await self._upload(client, "template.xlsx", self.template_path.read_bytes())
+                self._template_id = template_id
+
+            payload = {"order_file_id": order_id, "excel_file_id": template_id}
+            if self.mapping_mode:
+                payload["mapping_mode"] = self.mapping_mode
+            response = await self._request(client, "process", "POST", "/api/process", json=payload)
+            task_id = response.json()["taskId"]
+            record["task_id"] = task_id
+
+            deadline = time.perf_counter() + self.task_timeout
+            task: Dict[str, Any] = {}
+            while time.perf_counter() < deadline:
+                response = await self._request(client, "task", "GET", f"/api/task/{task_id}")
+                task = response.json()
+                if task["status"] not in ("pending", "processing"):
+                    break
+                await asyncio.sleep(self.poll_interval)
+
+            record["status"] = task.get("status", "timeout")
+            record["queue_wait"] = _seconds_between(task.get("createdAt"), task.get("startedAt"))
+            record["task_duration"] = _seconds_between(task.get("createdAt"), task.get("finishedAt"))
+
+            if task.get("status") == "completed":
+                await self._request(client, "download", "GET", f"/api/download/{task_id}")
+
+        except httpx.HTTPError as e:
+            record["error"] = str(e)
+        finally:
+            record["flow_duration"] = time.perf_counter() - started
+            self.task_records.append(record)
+
+    async def run_closed_loop(self, concurrency: int, total_tasks: Optional[int],
+                              duration: Optional[float]):
+        """闭环负载：固定数量的虚拟用户循环执行流程"""
+        counter = iter(range(sys.maxsize))
+        stop_at = time.perf_counter() + duration if duration else None
+
+        async def user(client: httpx.AsyncClient):
+            while True:
+                index = next(counter)
+                if total_tasks is not None and index >= total_tasks:
+                    return
+                if stop_at and time.perf_counter() >= stop_at:
+                    return
+                await self.run_one(client, index)
+
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=60) as client:
+            await asyncio.gather(*(user(client) for _ in range(concurrency)))
+
+    async def run_open_loop(self, rate: float, total_tasks: Optional[int],
+                            duration: Optional[float], seed: Optional[int] = None):
+        """开环负载：按泊松过程到达，不等待前一个任务完成"""
+        rng = random.Random(seed)
+        stop_at = time.perf_counter() + duration if duration else None
+        pending = []
+
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=60,
+                                     limits=httpx.Limits(max_connections=1000)) as client:
+            index = 0
+            while True:
+                if total_tasks is not None and index >= total_tasks:
+                    break
+                if stop_at and time.perf_counter() >= stop_at:
+                    break
+                pending.append(asyncio.create_task(self.run_one(client, index)))
+                index += 1
+                await asyncio.sleep(rng.expovariate(rate))
+            await asyncio.gather(*pending)
+
+    def report(self) -> Dict[str, Any]:
+        completed = [r for r in self.task_records if r["status"] == "completed"]
+        statuses: Dict[str, int] = {}
+        for record in self.task_records:
+            statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+
+        return {
+            "tasks": len(self.task_records),
+            "statuses": statuses,
+            "errors": self.errors,
+            "task_duration": summarize([r["task_duration"] for r in completed if r.get("task_duration") is not None]),
+            "queue_wait": summarize([r["queue_wait"] for r in self.task_records if r.get("queue_wait") is not None]),
+            "flow_duration": summarize([r["flow_duration"] for r in completed]),
+            "api_latency": {name: summarize(values) for name, values in self.api_latency.items()}
+        }
+
+
+async def sample_rss(pid: int, interval: float, samples: List[Dict[str, float]], started: float):
+    """定时采样服务进程 RSS"""
+    while True:
+        rss = read_rss_bytes(pid)
+        if rss is not None:
+            samples.append({"t": round(time.perf_counter() - started, 3), "rss_bytes": rss})
+        await asyncio.sleep(interval)
+
+
+def _wait_http(url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"服务启动超时: {url}")
+
+
+def start_services(args) -> List[subprocess.Popen]:
+    """启动桩服务和 Web 服务（子进程）"""
+    stub_cmd = [sys.executable, "-m", "benchmarks.llm_stub", "--port", str(args.stub_port),
+                "--latency", args.llm_latency, "--error-rate", str(args.llm_error_rate),
+                "--rate-429", str(args.llm_rate_429)]
+    stub = subprocess.Popen(stub_cmd, cwd=str(PROJECT_ROOT))
+    _wait_http(f"http://127.0.0.1:{args.stub_port}/stub/stats")
+
+    env = os.environ.copy()
+    env["DEEPSEEK_BASE_URL"] = f"http://127.0.0.1:{args.stub_port}"
+    env.setdefault("DEEPSEEK_API_KEY", "sk-loadtest")
+    server_cmd = [sys.executable, "-m", "uvicorn", "backend.main:app",
+                  "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning"]
+    server = subprocess.Popen(server_cmd, cwd=str(PROJECT_ROOT), env=env)
+    _wait_http(f"http://127.0.0.1:{args.port}/api/health")
+    return [stub, server]
+
+
+def print_report(report: Dict[str, Any], rss_samples: List[Dict[str, float]]):
+    def fmt(value):
+        return f"{value:.3f}" if value is not None else "-"
+
+    print("=" * 60)
+    print(f"任务数: {report['tasks']}  状态: {report['statuses']}")
+    if report["errors"]:
+        print(f"错误: {report['errors']}")
+    print(f"{'指标':<22}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    rows = [("任务完成(服务端)", report["task_duration"]),
+            ("排队等待", report["queue_wait"]),
+            ("完整流程(客户端)", report["flow_duration"])]
+    rows += [(f"接口 {name}", stats) for name, stats in report["api_latency"].items()]
+    for name, stats in rows:
+        print(f"{name:<22}{fmt(stats['p50']):>10}{fmt(stats['p95']):>10}{fmt(stats['p99']):>10}{fmt(stats['max']):>10}")
+    if rss_samples:
+        peak = max(s["rss_bytes"] for s in rss_samples)
+        print(f"服务 RSS: 起始 {rss_samples[0]['rss_bytes'] / 1024 / 1024:.1f}MB, "
+              f"峰值 {peak / 1024 / 1024:.1f}MB, 结束 {rss_samples[-1]['rss_bytes'] / 1024 / 1024:.1f}MB")
+    print("=" * 60)
+
+
+async def run(args) -> Dict[str, Any]:
+    work_dir = Path(tempfile.mkdtemp(prefix="sihai-load-"))
+    shop_names = generate_shop_names(args.shops, args.seed)
+    template_path = write_template(work_dir / "template.xlsx", args.skus, shop_names, seed=args.seed)
+    order_texts = [generate_order_text(args.shops, args.lines, seed=args.seed + i, shop_names=shop_names)
+                   for i in range(args.order_variants)]
+
+    processes: List[subprocess.Popen] = []
+    server_pid = args.server_pid
+    base_url = args.target
+    if not base_url:
+        processes = start_services(args)
+        server_pid = processes[-1].pid
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    tester = LoadTester(base_url, order_texts, template_path, poll_interval=args.poll_interval,
+                        reuse_template=args.reuse_template, mapping_mode=args.mapping_mode)
+    rss_samples: List[Dict[str, float]] = []
+    started = time.perf_counter()
+    sampler = asyncio.create_task(sample_rss(server_pid, args.rss_interval, rss_samples, started)) \
+        if server_pid else None
+
+    try:
+        if args.rate:
+            await tester.run_open_loop(args.rate, args.tasks, args.duration, seed=args.seed)
+        else:
+            await tester.run_closed_loop(args.concurrency, args.tasks, args.duration)
+    finally:
+        if sampler:
+            sampler.cancel()
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=10)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = tester.report()
+    report["wall_time"] = time.perf_counter() - started
+    report["rss"] = rss_samples
+    report["params"] = {k: v for k, v in vars(args).items()}
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="四海订单处理 - Web 服务压测")
+    load = parser.add_argument_group("负载")
+    load.add_argument("--concurrency", type=int, default=4, help="闭环并发用户数 (默认: 4)")
+    load.add_argument("--rate", type=float, default=None, help="开环到达率（任务/秒），设置后忽略 --concurrency")
+    load.add_argument("--tasks", type=int, default=None, help="任务总数")
+    load.add_argument("--duration", type=float, default=None, help="压测时长（秒）")
+    load.add_argument("--poll-interval", type=float, default=0.2, help="任务状态轮询间隔 (默认: 0.2)")
+    load.add_argument("--reuse-template", action="store_true", help="只上传一次模板，所有任务共用")
+    load.add_argument("--mapping-mode", default=None, help="请求中指定的映射模式 (llm / local)")
+
+    data = parser.add_argument_group("数据")
+    data.add_argument("--shops", type=int, default=20, help="每个订单的店铺数 (默认: 20)")
+    data.add_argument("--lines", type=int, default=10, help="每个店铺的商品行数 (默认: 10)")
+    data.add_argument("--skus", type=int, default=100, help="模板商品行数 (默认: 100)")
+    data.add_argument("--order-variants", type=int, default=5, help="不同订单内容的数量 (默认: 5)")
+    data.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+
+    target = parser.add_argument_group("目标服务")
+    target.add_argument("--target", default=None, help="已启动服务的地址（不指定则自动启动桩服务和 Web 服务）")
+    target.add_argument("--server-pid", type=int, default=None, help="服务进程 PID（用于采样 RSS）")
+    target.add_argument("--port", type=int, default=8765, help="自动启动时 Web 服务的端口 (默认: 8765)")
+    target.add_argument("--stub-port", type=int, default=8766, help="自动启动时桩服务的端口 (默认: 8766)")
+    target.add_argument("--llm-latency", default="lognormal:-0.7,0.4", help="桩服务延迟分布")
+    target.add_argument("--llm-error-rate", type=float, default=0.0, help="桩服务 500 错误率")
+    target.add_argument("--llm-rate-429", type=float, default=0.0, help="桩服务 429 注入比例")
+    target.add_argument("--rss-interval", type=float, default=0.5, help="RSS 采样间隔（秒） (默认: 0.5)")
+
+    parser.add_argument("--output", default=None, help="结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    if args.tasks is None and args.duration is None:
+        args.tasks = 50
+
+    report = asyncio.run(run(args))
+    print_report(report, report["rss"])
+
+    if args.output:
+        path = Path(args.output)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"结果已保存: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
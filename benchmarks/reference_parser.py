@@ -0,0 +1,188 @@
+"""
+商品行解析的参考实现与对照语料
+
+参考实现保留原先逐个尝试正则的写法，用于校验 shared/line_parser.py 的单次扫描解析器：
+对照语料覆盖全部支持的格式和边界情况，另外再用生成的订单行和随机组合的行做差分对比。
+
+    python -m benchmarks parser --lines 200000
+"""
+
+import re
+import time
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from shared.line_parser import parse_product_line, normalize_product_name
+from .generators import generate_order_text
+
+
+def reference_parse_product_line(line: str) -> Tuple[Optional[str], Optional[int]]:
+    """原先的解析实现（冒号切分 → 多空格分隔 → 数字直接跟在商品名后）"""
+    line = line.strip()
+    if not line:
+        return None, None
+
+    product_name = None
+    quantity = None
+
+    if ':' in line or '：' in line:
+        parts = re.split(r'[：:]', line)
+        if len(parts) >= 2:
+            product_name = parts[0].strip()
+            quantity_str = parts[1].strip()
+            match = re.search(r'(\d+)', quantity_str)
+            if match:
+                quantity = int(match.group(1))
+
+    if product_name is None:
+        match = re.match(r'^(.+?)\s{2,}(\d+)\s*件?$', line)
+        if match:
+            product_name = match.group(1).strip()
+            quantity = int(match.group(2))
+        else:
+            match = re.match(r'(.+?)(\d+)\s*件?$', line)
+            if match:
+                product_name = match.group(1).strip()
+                quantity = int(match.group(2))
+
+    return product_name, quantity
+
+
+def reference_normalize_product_name(product_name: str) -> str:
+    """原先的商品名称标准化实现"""
+    name = product_name.strip()
+    name = re.sub(r'(\d+)克', r'\1g', name)
+    name = re.sub(r'(\d+)G', r'\1g', name)
+    name = re.sub(r'\s+', '', name)
+    return name
+
+
+# 对照语料：全部支持的格式及边界情况
+GOLDEN_LINES = [
+    # 方式1: 冒号分隔
+    "四海150g鲜装牛肉丸:2件",
+    "四海150g鲜装牛肉丸：2件",
+    "170g鱼蛋鲜装：12",
+    "鱼蛋鲜装 ： 3 件",
+    "牛肉丸:",
+    "牛肉丸：件",
+    ":5件",
+    "：5",
+    "牛肉丸:2件:备注3",
+    "牛肉丸：共2箱3件",
+    "五江店：",
+    "备注: 周五前到货",
+    "牛肉丸:２件",
+    # 方式2: 多空格或制表符分隔
+    "150g鲜装牛肉丸  2件",
+    "150g鲜装牛肉丸    2",
+    "150g鲜装牛肉丸\t\t3 件",
+    "150g鲜装牛肉丸 \t 3",
+    "手打 牛肉丸   10件",
+    "250g 手打牛筋丸  7",
+    "鱼蛋　　4件",
+    # 方式3: 数字直接跟在商品名后
+    "150g鲜装牛肉丸2件",
+    "150g鲜装牛肉丸2 件",
+    "150g鲜装牛肉丸2",
+    "150g鲜装牛肉丸 2",
+    "170克鱼蛋鲜装10件",
+    "150G鲜装牛肉丸1",
+    "鱼蛋鲜装０３件",
+    "牛肉丸12345",
+    "5件",
+    "12件",
+    "123",
+    "7",
+    "a1",
+    # 无法解析
+    "",
+    "   ",
+    "件",
+    "谢谢",
+    "请尽快安排配送",
+    "牛肉丸件",
+    "牛肉丸2箱",
+    "牛肉丸2件 谢谢",
+    # 首尾空白、换行
+    "  150g鲜装牛肉丸2件  ",
+    "\t牛肉丸：3件\r",
+    "牛肉丸\n2件",
+    "牛肉丸 \n 2件",
+    "牛\n肉丸  2件",
+]
+
+# 商品名称标准化的对照语料
+GOLDEN_NAMES = [
+    "四海150g鲜装牛肉丸", "150克鲜装牛肉丸", "150G鲜装牛肉丸", " 手打 牛肉丸 ",
+    "150 克牛肉丸", "G牛肉丸", "5克G", "5G克", "１５０克牛肉丸", "鱼蛋　鲜装", "",
+]
+
+_FUZZ_ALPHABET = ["牛肉丸", "鱼蛋", "150g", "克", "G", "件", "箱", ":", "：", " ", "  ", "\t", "　",
+                  "0", "1", "2", "12", "３", "a", "\n"]
+
+
+def _fuzz_lines(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(_FUZZ_ALPHABET) for _ in range(rng.randint(1, 6))) for _ in range(count)]
+
+
+def check_parser(generated_lines: int = 20000, fuzz_lines: int = 20000, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    对比单次扫描解析器与参考实现
+
+    Args:
+        generated_lines: 生成订单文本的大致行数
+        fuzz_lines: 随机组合行数
+        seed: 随机种子
+
+    Returns:
+        不一致的行（为空表示完全一致）
+    """
+    text = generate_order_text(max(generated_lines // 10, 1), 10, seed=seed, noise_rate=0.05, typo_rate=0.1)
+    lines = GOLDEN_LINES + text.split("\n") + _fuzz_lines(fuzz_lines, seed)
+
+    mismatches = []
+    for line in lines:
+        expected = reference_parse_product_line(line)
+        actual = parse_product_line(line)
+        if actual != expected:
+            mismatches.append({"line": line, "expected": expected, "actual": actual})
+        if expected[0]:
+            expected_name = reference_normalize_product_name(expected[0])
+            actual_name = normalize_product_name(expected[0])
+            if actual_name != expected_name:
+                mismatches.append({"name": expected[0], "expected": expected_name, "actual": actual_name})
+    for name in GOLDEN_NAMES + lines:
+        if normalize_product_name(name) != reference_normalize_product_name(name):
+            mismatches.append({"name": name, "expected": reference_normalize_product_name(name),
+                               "actual": normalize_product_name(name)})
+    return mismatches
+
+
+def _lines_per_sec(parse: Callable[[str], tuple], normalize: Callable[[str], str],
+                   lines: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for line in lines:
+            product_name, _ = parse(line)
+            if product_name:
+                normalize(product_name)
+        best = min(best, time.perf_counter() - started)
+    return len(lines) / best if best > 0 else 0.0
+
+
+def benchmark_parser(line_count: int = 100000, repeat: int = 3, seed: int = 42) -> Dict[str, float]:
+    """
+    逐行解析（解析 + 名称标准化）的吞吐量：参考实现与单次扫描解析器
+
+    Returns:
+        {"reference": 行/秒, "current": 行/秒, "speedup": 倍数}
+    """
+    text = generate_order_text(max(line_count // 10, 1), 10, seed=seed)
+    lines = [line for line in text.split("\n") if line]
+    reference = _lines_per_sec(reference_parse_product_line, reference_normalize_product_name, lines, repeat)
+    current = _lines_per_sec(parse_product_line, normalize_product_name, lines, repeat)
+    return {"lines": len(lines), "reference": reference, "current": current,
+            "speedup": current / reference if reference else 0.0}
@@ -0,0 +1,79 @@
+"""
+店铺列解析的对照用例
+
+固定的模板表头和店铺名及其期望结果，用于校验 shared/shop_index.py 的解析顺序
+（精确 / 别名、子串、错别字、关键词），特别是不同城市的同名门店不能被近似匹配写错列，
+同城门店的错别字不能被城市关键词写到其他门店的列。
+
+    python -m benchmarks shops
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from shared.shop_index import ShopIndex
+
+# 模板表头（按列顺序，列号从 8 开始，与生成的模板一致）
+GOLDEN_HEADERS = [
+    "岳阳梅溪湖店", "郴州舜德店", "郴州购广", "株洲万达店", "长沙五一广场店",
+    "衡阳新天地", "衡阳新天地店", "邵阳万达", "长沙五江店", "岳阳金鹗店",
+]
+
+GOLDEN_ALIASES = {"金鹗山": "岳阳金鹗店"}
+
+# (店铺名, 近似匹配允许的编辑距离, 期望的表头)；期望为 None 表示应当找不到
+GOLDEN_SHOPS: List[Tuple[str, int, Optional[str]]] = [
+    # 精确 / 别名
+    ("郴州舜德店", 0, "郴州舜德店"),
+    ("郴州舜德店：", 0, "郴州舜德店"),
+    ("衡阳新天地店", 0, "衡阳新天地店"),
+    ("金鹗山", 0, "岳阳金鹗店"),
+    # 子串、关键词
+    ("郴州舜德", 0, "郴州舜德店"),
+    ("株洲万达店2", 0, "株洲万达店"),
+    ("长沙", 0, "长沙五一广场店"),
+    ("五江旗舰店", 0, "长沙五江店"),
+    # 不同城市的同名门店：无论是否开启近似匹配都不能写到其他城市的列
+    ("永州舜德", 0, None),
+    ("永州舜德", 1, None),
+    ("郴州广场店", 0, None),
+    ("郴州广场店", 1, None),
+    ("衡阳万达", 0, None),
+    ("衡阳万达", 1, None),
+    ("株州万达店", 1, None),
+    # 开启近似匹配后，城市相同、店名部分的错别字（替换、少字、多字）
+    ("长沙五一广埸店", 0, None),
+    ("长沙五一广埸店", 1, "长沙五一广场店"),
+    ("长沙五一广店", 1, "长沙五一广场店"),
+    ("长沙五一大广场店", 1, "长沙五一广场店"),
+    ("不存在的店", 1, None),
+    # 同城门店的错别字：先于城市关键词（岳阳）匹配，不写到 岳阳梅溪湖店；
+    # 未开启近似匹配时视为找不到
+    ("岳阳金颚", 1, "岳阳金鹗店"),
+    ("岳阳金颚店", 1, "岳阳金鹗店"),
+    ("岳阳金颚", 2, "岳阳金鹗店"),
+    ("岳阳金颚店", 2, "岳阳金鹗店"),
+    ("岳阳金颚", 0, None),
+    ("岳阳金颚店", 0, None),
+    # 同城没有相近表头时仍按关键词匹配
+    ("岳阳新天地", 1, "岳阳梅溪湖店"),
+]
+
+
+def check_shop_index() -> List[Dict[str, Any]]:
+    """
+    按对照用例解析店铺列
+
+    Returns:
+        与期望不一致的用例（为空表示全部一致）
+    """
+    shop_columns = {header: column for column, header in enumerate(GOLDEN_HEADERS, start=8)}
+    indexes = {}
+    mismatches = []
+    for shop_name, max_distance, expected in GOLDEN_SHOPS:
+        if max_distance not in indexes:
+            indexes[max_distance] = ShopIndex(shop_columns, aliases=GOLDEN_ALIASES, max_distance=max_distance)
+        match = indexes[max_distance].match(shop_name)
+        if match.header != expected:
+            mismatches.append({"shop": shop_name, "max_distance": max_distance,
+                               "expected": expected, "actual": match.header, "method": match.method})
+    return mismatches
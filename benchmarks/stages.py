@@ -0,0 +1,211 @@
+"""
+流水线分阶段性能测试
+
+阶段：读取 (read)、店铺解析 (parse)、逐行解析 (parse_lines)、商品映射 (mapping，
+使用进程内桩客户端)、标准化 (standardize)、写入 Excel (excel_write) 以及端到端
+(end_to_end)。结果以 JSON 保存，并可与基线对比找出性能回退。
+"""
+
+import json
+import time
+import shutil
+import platform
+import statistics
+import tempfile
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from shared.product_standardizer import ProductStandardizer
+from .generators import generate_shop_names, write_order_file, write_template
+from .llm_stub import StubClient, LatencyDistribution
+
+RESULT_FORMAT_VERSION = 1
+
+ALL_STAGES = ["read", "parse", "parse_lines", "mapping", "standardize", "excel_write", "end_to_end"]
+
+
+@dataclass
+class BenchmarkCase:
+    """一组性能测试参数"""
+    shops: int = 100
+    lines: int = 10
+    skus: int = 200
+    seed: int = 42
+    llm_latency: str = "fixed:0"
+    noise_rate: float = 0.02
+    typo_rate: float = 0.05
+
+
+def _measure(func: Callable[[], Any], repeat: int,
+             setup: Optional[Callable[[], None]] = None) -> List[float]:
+    """执行 repeat 次并返回每次耗时（秒），setup 不计入耗时"""
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return runs
+
+
+def _summarize(runs: List[float], items: int) -> Dict[str, Any]:
+    median = statistics.median(runs)
+    return {
+        "runs": runs,
+        "min": min(runs),
+        "median": median,
+        "mean": statistics.mean(runs),
+        "items": items,
+        "items_per_sec": items / median if median > 0 else None
+    }
+
+
+def run_benchmarks(case: BenchmarkCase, repeat: int = 5, stages: Optional[List[str]] = None,
+                   workdir: Optional[Union[str, Path]] = None) -> Dict[str, Any]:
+    """
+    运行分阶段性能测试
+
+    Args:
+        case: 测试参数
+        repeat: 每个阶段重复次数
+        stages: 需要运行的阶段（默认全部）
+        workdir: 数据目录（默认使用临时目录）
+
+    Returns:
+        测试结果（可直接保存为 JSON）
+    """
+    stages = stages or ALL_STAGES
+    unknown = set(stages) - set(ALL_STAGES)
+    if unknown:
+        raise ValueError(f"未知的阶段: {', '.join(sorted(unknown))}")
+
+    temp_dir = None
+    if workdir is None:
+        temp_dir = tempfile.mkdtemp(prefix="sihai-bench-")
+        workdir = temp_dir
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        shop_names = generate_shop_names(case.shops, case.seed)
+        order_file = write_order_file(workdir / "order.txt", case.shops, case.lines, seed=case.seed,
+                                      noise_rate=case.noise_rate, typo_rate=case.typo_rate,
+                                      shop_names=shop_names)
+        template_file = write_template(workdir / "template.xlsx", case.skus, shop_names, seed=case.seed)
+        output_file = workdir / "output.xlsx"
+
+        stub = StubClient(latency=LatencyDistribution.parse(case.llm_latency), seed=case.seed)
+        processor = ProductStandardizer(api_key=None, llm_client=stub)
+
+        # 准备各阶段的输入（不计入耗时）
+        raw_data = processor.read_order_data_from_file(str(order_file))
+        parsed_data = processor.parse_raw_data(raw_data)
+        lines = [line for entry in parsed_data for line in entry['data'].split('\n')]
+        product_mapping = processor.create_product_mapping(parsed_data)
+        standardized_data = processor.standardize_data(parsed_data, product_mapping)
+
+        def parse_lines():
+            for line in lines:
+                product_name, _ = processor.parse_product_line(line)
+                if product_name:
+                    processor.normalize_product_name(product_name)
+
+        def copy_template():
+            shutil.copy(template_file, output_file)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for stage in stages:
+            if stage == "read":
+                runs = _measure(lambda: processor.read_order_data_from_file(str(order_file)), repeat)
+                items = len(lines)
+            elif stage == "parse":
+                runs = _measure(lambda: processor.parse_raw_data(raw_data), repeat)
+                items = len(raw_data)
+            elif stage == "parse_lines":
+                runs = _measure(parse_lines, repeat)
+                items = len(lines)
+            elif stage == "mapping":
+                runs = _measure(lambda: processor.create_product_mapping(parsed_data), repeat)
+                items = len(lines)
+            elif stage == "standardize":
+                runs = _measure(lambda: processor.standardize_data(parsed_data, product_mapping), repeat)
+                items = len(lines)
+            elif stage == "excel_write":
+                runs = _measure(lambda: processor.update_excel_file(str(output_file), standardized_data),
+                                repeat, setup=copy_template)
+                items = sum(len(entry['products']) for entry in standardized_data)
+            else:
+                runs = _measure(lambda: processor.process_order(str(order_file), str(output_file)),
+                                repeat, setup=copy_template)
+                items = len(lines)
+            results[stage] = _summarize(runs, items)
+
+        return {
+            "version": RESULT_FORMAT_VERSION,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "case": asdict(case),
+            "repeat": repeat,
+            "stages": results
+        }
+
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def save_results(results: Dict[str, Any], path: Union[str, Path]) -> Path:
+    """保存测试结果为 JSON"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+    return path
+
+
+def load_results(path: Union[str, Path]) -> Dict[str, Any]:
+    """读取测试结果 JSON"""
+    return json.loads(Path(path).read_text(encoding='utf-8'))
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = 0.10, metric: str = "median") -> List[Dict[str, Any]]:
+    """
+    对比两次测试结果
+
+    Args:
+        baseline: 基线结果
+        current: 本次结果
+        threshold: 允许的变慢比例（0.10 表示慢 10% 以内不算回退）
+        metric: 对比的统计量（min / median / mean）
+
+    Returns:
+        每个阶段的对比行：stage、baseline、current、ratio、status（ok / regression / improved / new / missing）
+    """
+    rows = []
+    base_stages = baseline.get("stages", {})
+    current_stages = current.get("stages", {})
+    for stage in list(dict.fromkeys(list(base_stages) + list(current_stages))):
+        base = base_stages.get(stage)
+        cur = current_stages.get(stage)
+        if base is None or cur is None:
+            rows.append({"stage": stage,
+                         "baseline": base[metric] if base else None,
+                         "current": cur[metric] if cur else None,
+                         "ratio": None,
+                         "status": "new" if base is None else "missing"})
+            continue
+
+        ratio = cur[metric] / base[metric] if base[metric] > 0 else float("inf")
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({"stage": stage, "baseline": base[metric], "current": cur[metric],
+                     "ratio": ratio, "status": status})
+    return rows
@@ -62,6 +62,13 @@ export const getTaskStatus = async (taskId) => {
   return await api.get(`/task/${taskId}`)
 }
 
+/**
+ * 取消任务
+ */
+export const cancelTask = async (taskId) => {
+  return await api.post(`/task/${taskId}/cancel`)
+}
+
 /**
  * 下载结果文件
  */
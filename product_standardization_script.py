@@ -11,12 +11,18 @@ import os
 import sys
 import glob
 import logging
+import argparse
 from dotenv import load_dotenv
 
 # 确保可以导入 shared 模块
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from shared.product_standardizer import ProductStandardizer
+from shared.product_standardizer import ProductStandardizer, MAPPING_MODE_LLM, MAPPING_MODE_LOCAL
+from shared.tracing import format_timings, format_memory_profile
+from shared.shop_index import ShopMatchConfig, load_shop_aliases
+from shared.llm_cassette import (
+    build_llm_client, parse_replay_latency, CASSETTE_MODES, CASSETTE_MODE_REPLAY
+)
 
 # 加载环境变量
 load_dotenv()
@@ -60,21 +66,94 @@ def find_excel_file(directory: str = ".") -> str:
         return xlsx_files[0]
 
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="四海订单处理工具 - CLI")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="离线模式：使用本地相似度匹配进行商品映射，不调用 Deepseek API"
+    )
+    parser.add_argument(
+        "--cassette-mode",
+        choices=CASSETTE_MODES,
+        default=os.getenv('LLM_CASSETTE_MODE') or None,
+        help="AI 请求录制/回放：record 录制到磁盘，replay 从磁盘回放（不访问网络）"
+    )
+    parser.add_argument(
+        "--cassette-dir",
+        default=os.getenv('LLM_CASSETTE_DIR', 'cassettes'),
+        help="录制/回放的磁带目录 (默认: cassettes)"
+    )
+    parser.add_argument(
+        "--replay-latency",
+        default=os.getenv('LLM_REPLAY_LATENCY', 'none'),
+        help="回放延迟：none、recorded（按录制耗时）或固定秒数 (默认: none)"
+    )
+    parser.add_argument(
+        "--excel",
+        action="append",
+        default=None,
+        help="Excel 模板文件，可重复指定以同时写入多个模板（默认自动查找当前目录的模板）"
+    )
+    parser.add_argument(
+        "--export",
+        default=None,
+        help="同时导出店铺 × 商品数量矩阵（含合计），按扩展名选择格式：.csv 或 .parquet"
+    )
+    parser.add_argument(
+        "--shop-aliases",
+        default=os.getenv('SHOP_ALIASES_FILE') or None,
+        help="店铺别名文件（JSON，{\"表头店铺名\": [\"别名\", ...]}），订单店铺名与模板表头不一致时使用"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="流式处理：逐个店铺读取和标准化，只持有当前店铺的订单行（用于月底汇总的大文件）"
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="处理结束后输出各阶段耗时"
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="输出详细日志（每个店铺、每个单元格的更新）"
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="用 tracemalloc 分析各阶段的内存分配（处理会明显变慢）"
+    )
+    return parser.parse_args()
+
+
 def main():
     """CLI 主入口"""
+    args = parse_args()
+    if args.verbose:
+        logging.getLogger("shared.product_standardizer").setLevel(logging.DEBUG)
+    mapping_mode = MAPPING_MODE_LOCAL if args.offline else MAPPING_MODE_LLM
+
     # 从环境变量获取 Deepseek API 密钥
     api_key = os.getenv('DEEPSEEK_API_KEY')
     
-    if not api_key:
+    if not api_key and mapping_mode == MAPPING_MODE_LLM and args.cassette_mode != CASSETTE_MODE_REPLAY:
         logger.error("请设置环境变量 DEEPSEEK_API_KEY")
         logger.error("可以创建 .env 文件并添加: DEEPSEEK_API_KEY=your_api_key")
+        logger.error("或使用 --offline 以本地相似度匹配模式运行")
         sys.exit(1)
     
     # 查找 Excel 文件
-    excel_file = find_excel_file()
-    if not excel_file:
+    excel_files = args.excel or [find_excel_file()]
+    if not all(excel_files):
         logger.error("无法找到Excel文件，处理终止")
         sys.exit(1)
+    for excel_file in excel_files:
+        if not os.path.exists(excel_file):
+            logger.error(f"找不到Excel文件: {excel_file}")
+            sys.exit(1)
     
     # 检查 order.txt 是否存在
     order_file = "order.txt"
@@ -83,14 +162,41 @@ def main():
         sys.exit(1)
     
     # 创建处理器实例并处理订单
-    processor = ProductStandardizer(api_key=api_key)
+    base_url = os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
+    llm_client = build_llm_client(
+        api_key=api_key,
+        base_url=base_url,
+        cassette_mode=args.cassette_mode,
+        cassette_dir=args.cassette_dir,
+        replay_latency=parse_replay_latency(args.replay_latency)
+    )
+    processor = ProductStandardizer(
+        api_key=api_key,
+        base_url=base_url,
+        mapping_mode=mapping_mode,
+        llm_client=llm_client,
+        shop_match=ShopMatchConfig(aliases=load_shop_aliases(args.shop_aliases)) if args.shop_aliases else None
+    )
     
     try:
-        output_path = processor.process_order(order_file, excel_file)
-        logger.info(f"处理完成，输出文件: {output_path}")
+        outputs = processor.process_order_multi(order_file, excel_files,
+                                                profile_memory=args.profile_memory,
+                                                streaming=args.stream)
+        for output_path in outputs.values():
+            logger.info(f"处理完成，输出文件: {output_path}")
+        if args.export:
+            export_path = processor.quantity_matrix.export(args.export)
+            logger.info(f"数量矩阵已导出: {export_path}（合计 {processor.quantity_matrix.total()} 件）")
     except Exception as e:
         logger.error(f"处理失败: {e}")
         sys.exit(1)
+    finally:
+        if args.timings:
+            print("\n各阶段耗时:")
+            print(format_timings(processor.timings))
+        if processor.memory_profile:
+            print("\n各阶段内存分配:")
+            print(format_memory_profile(processor.memory_profile))
 
 
 if __name__ == "__main__":
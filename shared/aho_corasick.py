@@ -0,0 +1,112 @@
+"""
+Aho-Corasick 多模式字符串匹配
+
+把一组模式串编译成一个自动机，对文本扫描一遍即可找出所有出现的模式串，
+耗时与文本长度加匹配数成正比，与模式串数量无关。用于店铺名与表头、商品名与模板商品行的匹配。
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class AhoCorasick:
+    """多模式匹配自动机"""
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Args:
+            patterns: 模式串（空串和重复的模式串被忽略，模式串序号按首次出现的顺序）
+        """
+        self.patterns: List[str] = []
+        index: Dict[str, int] = {}
+        for pattern in patterns:
+            if pattern and pattern not in index:
+                index[pattern] = len(self.patterns)
+                self.patterns.append(pattern)
+
+        # 状态 0 为根；_goto[状态][字符] → 下一状态
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # 在该状态结束的模式串序号（含沿失败链可达的后缀）
+        self._output: List[Tuple[int, ...]] = [()]
+
+        own_output: List[List[int]] = [[]]
+        for pattern_index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    own_output.append([])
+                state = next_state
+            own_output[state].append(pattern_index)
+
+        # 按层次遍历计算失败链，输出合并失败状态的输出（长的模式串在前）
+        self._output = [tuple(output) for output in own_output]
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        扫描文本，按结束位置顺序产出所有匹配（同一位置结束的匹配，长的在前）
+
+        Args:
+            text: 文本
+
+        Returns:
+            (起始位置, 模式串序号) 的迭代器
+        """
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self.patterns
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_index in output[state]:
+                yield position + 1 - len(patterns[pattern_index]), pattern_index
+
+    def find_all(self, text: str) -> List[int]:
+        """
+        文本中出现的模式串序号（去重，按首次出现的结束位置排序）
+
+        Args:
+            text: 文本
+
+        Returns:
+            模式串序号列表
+        """
+        seen = {}
+        for _, pattern_index in self.iter_matches(text):
+            seen.setdefault(pattern_index, None)
+        return list(seen)
+
+    def longest_match(self, text: str) -> Optional[int]:
+        """
+        文本中出现的最长模式串（等长时取先出现的）
+
+        Args:
+            text: 文本
+
+        Returns:
+            模式串序号，没有匹配时返回 None
+        """
+        best: Optional[int] = None
+        for _, pattern_index in self.iter_matches(text):
+            if best is None or len(self.patterns[pattern_index]) > len(self.patterns[best]):
+                best = pattern_index
+        return best
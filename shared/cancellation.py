@@ -0,0 +1,77 @@
+import time
+import threading
+from typing import Optional
+
+
+class TaskCancelled(Exception):
+    """任务被取消（在检查点抛出）"""
+
+
+class TaskTimedOut(TaskCancelled):
+    """任务超过截止时间"""
+
+
+class CancelToken:
+    """
+    协作式取消令牌
+
+    处理流程在阶段之间和循环中调用 check()，令牌被取消或超过截止时间时抛出异常；
+    remaining() 用于把剩余时间作为超时传给 AI 请求，避免一次卡住的请求拖住整个任务。
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Args:
+            timeout: 从现在起的超时秒数，None 表示不限时
+        """
+        self._event = threading.Event()
+        self.deadline: Optional[float] = None
+        if timeout is not None:
+            self.set_timeout(timeout)
+
+    def set_timeout(self, timeout: Optional[float]):
+        """
+        设置（或清除）截止时间
+
+        Args:
+            timeout: 从现在起的超时秒数，None 表示不限时
+        """
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def cancel(self):
+        """取消任务"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已被取消"""
+        return self._event.is_set()
+
+    @property
+    def expired(self) -> bool:
+        """是否已超过截止时间"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self) -> Optional[float]:
+        """
+        距截止时间的剩余秒数
+
+        Returns:
+            剩余秒数（不小于 0），没有截止时间时返回 None
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """
+        检查点：已取消或已超时时抛出异常
+
+        Raises:
+            TaskCancelled: 任务已被取消
+            TaskTimedOut: 任务已超时
+        """
+        if self._event.is_set():
+            raise TaskCancelled("任务已取消")
+        if self.expired:
+            raise TaskTimedOut("任务处理超时")
@@ -0,0 +1,135 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 检查点格式版本（中间结果结构变化时递增，旧检查点自动失效）
+CHECKPOINT_VERSION = 1
+
+# 可保存检查点的阶段（按流程顺序）
+STAGE_PARSED = "parsed"              # parse_raw_data 的结果
+STAGE_MAPPING = "mapping"            # create_product_mapping 的结果
+STAGE_STANDARDIZED = "standardized"  # standardize_data 的结果
+CHECKPOINT_STAGES = (STAGE_PARSED, STAGE_MAPPING, STAGE_STANDARDIZED)
+
+MANIFEST_FILE = "manifest.json"
+
+
+def checkpoint_fingerprint(order_file_path: Union[str, Path], mapping_mode: str,
+                           standard_products: Iterable[str]) -> str:
+    """
+    计算检查点指纹：订单内容、映射模式或标准商品列表变化时指纹随之变化
+
+    Args:
+        order_file_path: 订单文件路径
+        mapping_mode: 商品映射模式
+        standard_products: 标准商品名称列表
+
+    Returns:
+        指纹（SHA-256 十六进制）
+    """
+    digest = hashlib.sha256()
+    digest.update(f"v{CHECKPOINT_VERSION}\n{mapping_mode}\n".encode('utf-8'))
+    digest.update("\n".join(standard_products).encode('utf-8'))
+    digest.update(b"\n")
+    with open(order_file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """
+    阶段检查点存储
+
+    每个任务一个目录，各阶段的中间结果保存为 JSON（原子写入）。
+    目录中的 manifest 记录指纹，指纹不一致时（输入已变化）旧检查点全部作废。
+    """
+
+    def __init__(self, directory: Union[str, Path], fingerprint: str):
+        """
+        Args:
+            directory: 检查点目录（每个任务独立）
+            fingerprint: 输入指纹，见 checkpoint_fingerprint
+        """
+        self.directory = Path(directory)
+        self.fingerprint = fingerprint
+
+        manifest = self._read_json(self.directory / MANIFEST_FILE)
+        if manifest is not None and manifest.get("fingerprint") != fingerprint:
+            logger.info(f"输入已变化，丢弃旧检查点: {self.directory}")
+            self.clear()
+
+    def _path(self, stage: str) -> Path:
+        if stage not in CHECKPOINT_STAGES:
+            raise ValueError(f"未知的检查点阶段: {stage}")
+        return self.directory / f"{stage}.json"
+
+    @staticmethod
+    def _read_json(path: Path) -> Optional[Any]:
+        if not path.exists():
+            return None
+        try:
+            with path.open('r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            # 写入中途崩溃等原因导致的损坏文件按不存在处理
+            logger.warning(f"检查点文件无法读取，忽略: {path}, {e}")
+            return None
+
+    def _write_json(self, path: Path, data: Any):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.directory), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def has(self, stage: str) -> bool:
+        """是否已有该阶段的检查点"""
+        return self._path(stage).exists()
+
+    def load(self, stage: str) -> Optional[Any]:
+        """
+        读取阶段检查点
+
+        Args:
+            stage: 阶段名称
+
+        Returns:
+            保存的中间结果，不存在时返回 None
+        """
+        record = self._read_json(self._path(stage))
+        if record is None or record.get("fingerprint") != self.fingerprint:
+            return None
+        return record.get("data")
+
+    def save(self, stage: str, data: Any):
+        """
+        保存阶段检查点
+
+        Args:
+            stage: 阶段名称
+            data: 中间结果（需可 JSON 序列化）
+        """
+        self._write_json(self.directory / MANIFEST_FILE,
+                         {"version": CHECKPOINT_VERSION, "fingerprint": self.fingerprint})
+        self._write_json(self._path(stage), {"fingerprint": self.fingerprint, "data": data})
+
+    def completed_stages(self) -> list:
+        """已保存检查点的阶段（按流程顺序）"""
+        return [stage for stage in CHECKPOINT_STAGES if self.has(stage)]
+
+    def clear(self):
+        """删除全部检查点"""
+        shutil.rmtree(self.directory, ignore_errors=True)
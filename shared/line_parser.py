@@ -0,0 +1,94 @@
+"""
+商品行解析
+
+单次扫描解析一行订单，结果与原先依次尝试 re.split / re.search / re.match 的实现完全一致
+（参考实现和对照语料见 benchmarks/reference_parser.py）：
+
+1. 含冒号（: 或 ：）：第一个冒号前为商品名，第一、二个冒号之间的第一串数字为数量
+   （没有数字时数量为 None；冒号在行首时商品名为空字符串，如 ":5件" → ("", 5)）
+2. 其余：行尾为 数字 [空白] [件]，数字前为商品名（两个以上空白分隔或直接相连结果相同）
+
+数字和空白按 Unicode 判断（与正则的 \\d、\\s 一致），全角数字也能转换为数量。
+"""
+
+import re
+from typing import Optional, Tuple
+
+# 解析规则的版本，规则变化时递增（用于缓存等依赖解析结果的地方）
+PARSER_VERSION = 1
+
+# 冒号后、下一个冒号前的第一串数字
+_COLON_QUANTITY = re.compile(r'[^:：\d]*(\d+)')
+
+# 重量单位：数字后的 克 / G 统一为 g（与依次替换 (\d+)克、(\d+)G 等价）
+_WEIGHT_UNIT = re.compile(r'(?<=\d)[克G]')
+
+_QUANTITY_UNIT = '件'
+
+_ASCII_DIGITS = '0123456789'
+
+
+def parse_product_line(line: str) -> Tuple[Optional[str], Optional[int]]:
+    """
+    解析单行商品数据
+
+    Args:
+        line: 单行数据
+
+    Returns:
+        (商品名, 数量) 元组，无法解析时返回 (None, None)
+    """
+    line = line.strip()
+    if not line:
+        return None, None
+
+    # 方式1: 冒号分隔（第一个半角或全角冒号）
+    colon = line.find(':')
+    full_colon = line.find('：')
+    if full_colon >= 0 and (colon < 0 or full_colon < colon):
+        colon = full_colon
+    if colon >= 0:
+        match = _COLON_QUANTITY.match(line, colon + 1)
+        return line[:colon].strip(), int(match.group(1)) if match else None
+
+    # 方式2/3: 行尾的数量（可选的空白和"件"）
+    body = line[:-1].rstrip() if line[-1] == _QUANTITY_UNIT else line
+    head = body.rstrip(_ASCII_DIGITS)
+    if head and head[-1].isdecimal():
+        # 全角等非 ASCII 数字
+        start = len(head)
+        while start and body[start - 1].isdecimal():
+            start -= 1
+        head = body[:start]
+
+    start = len(head)
+    if start == len(body):
+        return None, None
+    if start == 0:
+        # 整行都是数字：商品名至少一个字符
+        if len(body) < 2:
+            return None, None
+        start = 1
+        head = body[:1]
+
+    # 商品名不跨行（与正则的 . 一致）；两个以上空白分隔时空白可以包含换行
+    name = head.rstrip()
+    if '\n' in head and ('\n' in name or len(head) - len(name) < 2):
+        return None, None
+    return name, int(body[start:])
+
+
+def normalize_product_name(product_name: str) -> str:
+    """
+    标准化商品名称：统一重量单位（克、G → g），去除所有空白
+
+    Args:
+        product_name: 原始商品名称
+
+    Returns:
+        标准化后的商品名称
+    """
+    name = product_name
+    if '克' in name or 'G' in name:
+        name = _WEIGHT_UNIT.sub('g', name)
+    return ''.join(name.split())
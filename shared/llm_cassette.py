@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Union
+
+from shared.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# 磁带模式
+CASSETTE_MODE_RECORD = "record"  # 调用真实 API 并把请求/响应写入磁盘
+CASSETTE_MODE_REPLAY = "replay"  # 只从磁盘回放，不访问网络
+CASSETTE_MODES = (CASSETTE_MODE_RECORD, CASSETTE_MODE_REPLAY)
+
+# 回放延迟："none" 不等待，"recorded" 按录制时的耗时等待，或者固定秒数
+REPLAY_LATENCY_NONE = "none"
+REPLAY_LATENCY_RECORDED = "recorded"
+
+
+class CassetteMissError(Exception):
+    """回放模式下找不到对应请求的录制记录"""
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    """
+    计算请求的磁带键（请求参数的规范化 JSON 的 SHA-256）
+
+    Args:
+        request: chat.completions.create 的参数
+
+    Returns:
+        十六进制摘要
+    """
+    canonical = json.dumps(request, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _to_response(record: Dict[str, Any]) -> SimpleNamespace:
+    """把录制的响应还原为与 OpenAI SDK 返回值结构一致的对象"""
+    response = record["response"]
+    usage = response.get("usage") or {}
+    return SimpleNamespace(
+        model=response.get("model"),
+        choices=[SimpleNamespace(
+            index=0,
+            finish_reason=response.get("finish_reason"),
+            message=SimpleNamespace(role="assistant", content=response.get("content"))
+        )],
+        usage=SimpleNamespace(
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            total_tokens=usage.get("total_tokens", 0)
+        )
+    )
+
+
+class CassetteClient:
+    """
+    Deepseek 客户端的录制/回放层
+
+    对外暴露与 OpenAI 客户端相同的 chat.completions.create 接口。录制模式下
+    转发到真实客户端并把请求→响应对存成 JSON 文件；回放模式下直接从磁盘读取，
+    可选按录制耗时（或固定延迟）模拟网络等待，便于离线端到端运行和性能对比。
+    """
+
+    def __init__(self, cassette_dir: Union[str, Path], mode: str = CASSETTE_MODE_REPLAY,
+                 client: Optional[Any] = None,
+                 replay_latency: Union[str, float] = REPLAY_LATENCY_NONE,
+                 latency_scale: float = 1.0):
+        """
+        初始化磁带客户端
+
+        Args:
+            cassette_dir: 磁带目录
+            mode: record 或 replay
+            client: 真实的 OpenAI 客户端（录制模式必需）
+            replay_latency: 回放延迟，"none"、"recorded" 或固定秒数
+            latency_scale: 录制延迟的缩放系数（仅 "recorded" 模式）
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"不支持的磁带模式: {mode}")
+        if mode == CASSETTE_MODE_RECORD and client is None:
+            raise ValueError("录制模式需要提供真实的 API 客户端")
+
+        self.cassette_dir = Path(cassette_dir)
+        self.cassette_dir.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.client = client
+        self.replay_latency = replay_latency
+        self.latency_scale = latency_scale
+
+        self.hits = 0
+        self.misses = 0
+
+        # 与 OpenAI 客户端保持相同的调用方式：client.chat.completions.create(...)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _path(self, key: str) -> Path:
+        return self.cassette_dir / f"{key}.json"
+
+    def _replay_delay(self, record: Dict[str, Any]) -> float:
+        """计算回放时需要模拟的延迟（秒）"""
+        if self.replay_latency == REPLAY_LATENCY_NONE:
+            return 0.0
+        if self.replay_latency == REPLAY_LATENCY_RECORDED:
+            return float(record.get("latency", 0.0)) * self.latency_scale
+        return float(self.replay_latency)
+
+    def _write(self, key: str, record: Dict[str, Any]):
+        """原子写入一条录制记录"""
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.cassette_dir), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def create(self, **kwargs) -> Any:
+        """
+        chat.completions.create 的录制/回放实现
+
+        Args:
+            **kwargs: 与 OpenAI SDK 相同的请求参数
+
+        Returns:
+            响应对象
+        """
+        request = {k: v for k, v in kwargs.items() if k != "timeout"}
+        key = request_key(request)
+        path = self._path(key)
+
+        if self.mode == CASSETTE_MODE_REPLAY:
+            if not path.exists():
+                self.misses += 1
+                CACHE_REQUESTS.inc(cache="cassette", result="miss")
+                raise CassetteMissError(f"磁带中没有该请求的录制记录: {key[:12]}")
+            with path.open('r', encoding='utf-8') as f:
+                record = json.load(f)
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="cassette", result="hit")
+            delay = self._replay_delay(record)
+            if delay > 0:
+                time.sleep(delay)
+            return _to_response(record)
+
+        # 录制模式：转发到真实客户端
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(**kwargs)
+        latency = time.perf_counter() - started
+
+        choice = response.choices[0]
+        usage = getattr(response, "usage", None)
+        record = {
+            "request": request,
+            "response": {
+                "model": getattr(response, "model", None),
+                "content": choice.message.content,
+                "finish_reason": getattr(choice, "finish_reason", None),
+                "usage": {
+                    "prompt_tokens": getattr(usage, "prompt_tokens", 0),
+                    "completion_tokens": getattr(usage, "completion_tokens", 0),
+                    "total_tokens": getattr(usage, "total_tokens", 0)
+                } if usage else None
+            },
+            "latency": latency,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        }
+        self._write(key, record)
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache="cassette", result="miss")
+        logger.info(f"已录制 AI 请求: {key[:12]} ({latency:.2f}s)")
+        return response
+
+
+def build_llm_client(api_key: Optional[str], base_url: str,
+                     cassette_mode: Optional[str] = None,
+                     cassette_dir: Optional[Union[str, Path]] = None,
+                     replay_latency: Union[str, float] = REPLAY_LATENCY_NONE,
+                     max_retries: int = 2,
+                     timeout: Optional[float] = None) -> Optional[Any]:
+    """
+    构建 ProductStandardizer 使用的 AI 客户端（可选包一层录制/回放）
+
+    Args:
+        api_key: Deepseek API Key（回放模式下可为空）
+        base_url: API基础URL
+        cassette_mode: 磁带模式，None 表示不启用
+        cassette_dir: 磁带目录
+        replay_latency: 回放延迟
+        max_retries: 429/5xx 等可重试错误的最大重试次数
+        timeout: 单次请求超时（秒），None 使用 SDK 默认值
+
+    Returns:
+        客户端对象；未启用磁带且没有 API Key 时返回 None
+    """
+    from openai import OpenAI
+
+    client_options: Dict[str, Any] = {"max_retries": max_retries}
+    if timeout is not None:
+        client_options["timeout"] = timeout
+    client = OpenAI(api_key=api_key, base_url=base_url, **client_options) if api_key else None
+    if not cassette_mode:
+        return client
+
+    if not cassette_dir:
+        raise ValueError("启用录制/回放时必须指定磁带目录")
+    return CassetteClient(cassette_dir, mode=cassette_mode, client=client,
+                          replay_latency=replay_latency)
+
+
+def parse_replay_latency(value: Optional[str]) -> Union[str, float]:
+    """
+    解析回放延迟配置（"none"、"recorded" 或秒数）
+
+    Args:
+        value: 配置字符串
+
+    Returns:
+        规范化后的回放延迟
+    """
+    if not value:
+        return REPLAY_LATENCY_NONE
+    value = value.strip().lower()
+    if value in (REPLAY_LATENCY_NONE, REPLAY_LATENCY_RECORDED):
+        return value
+    return float(value)
@@ -0,0 +1,243 @@
+"""
+进程内指标（Prometheus 文本格式）
+
+提供 Counter / Gauge / Histogram 三种基础指标和全局注册表 REGISTRY，
+不依赖外部库，记录开销为一次加锁的字典更新。后端通过 /metrics 暴露 REGISTRY.render()。
+"""
+
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 默认的耗时分桶（秒），覆盖本地计算到慢速 AI 调用
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类：按标签值分组存储"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """返回 (样本名, 标签串, 值) 列表"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for sample_name, labels, value in self.samples():
+            lines.append(f"{sample_name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def items(self) -> List[Tuple[Tuple[str, ...], float]]:
+        """返回 [(标签值元组, 计数)]"""
+        with self._lock:
+            return list(self._values.items())
+
+    def samples(self):
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in self.items()]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值；也可以绑定一个函数，在采集时计算"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], object]] = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], object]):
+        """
+        绑定采集函数
+
+        无标签时函数返回数值；有标签时返回 {标签值元组: 数值}。
+        """
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            result = self._function()
+            if self.labelnames:
+                items = [(tuple(str(v) for v in key), float(value)) for key, value in result.items()]
+            else:
+                items = [((), float(result))]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in items]
+
+
+class Histogram(_Metric):
+    """分桶直方图"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各桶计数..., +Inf 计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+
+        samples = []
+        for key, state in items:
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                samples.append((f"{self.name}_bucket",
+                                _format_labels(self.labelnames, key, ("le", _format_value(bound))),
+                                cumulative))
+            cumulative += state[len(self.buckets)]
+            samples.append((f"{self.name}_bucket",
+                            _format_labels(self.labelnames, key, ("le", "+Inf")), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, key), state[-1]))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, key), cumulative))
+        return samples
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已注册: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 全局注册表
+REGISTRY = Registry()
+
+# 处理流程相关指标（由 ProductStandardizer 和录制/回放层记录）
+LLM_REQUEST_DURATION = REGISTRY.histogram(
+    "sihai_llm_request_duration_seconds", "AI 调用耗时", ["call_site"])
+LLM_REQUESTS = REGISTRY.counter(
+    "sihai_llm_requests_total", "AI 调用次数", ["call_site", "outcome"])
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "sihai_llm_prompt_tokens_total", "AI 调用的提示词 token 数（来自 usage）", ["call_site"])
+LLM_COMPLETION_TOKENS = REGISTRY.counter(
+    "sihai_llm_completion_tokens_total", "AI 调用的生成 token 数（来自 usage）", ["call_site"])
+CACHE_REQUESTS = REGISTRY.counter(
+    "sihai_cache_requests_total", "缓存查询次数", ["cache", "result"])
+CACHE_ENTRIES = REGISTRY.gauge(
+    "sihai_cache_entries", "缓存条目数", ["cache"])
+
+
+def _cache_hit_ratios() -> Dict[Tuple[str], float]:
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in CACHE_REQUESTS.items():
+        hits_total = totals.setdefault(cache, [0.0, 0.0])
+        if result == "hit":
+            hits_total[0] += value
+        hits_total[1] += value
+    return {(cache,): hits / total for cache, (hits, total) in totals.items() if total > 0}
+
+
+CACHE_HIT_RATIO = REGISTRY.gauge("sihai_cache_hit_ratio", "缓存命中率", ["cache"])
+CACHE_HIT_RATIO.set_function(_cache_hit_ratios)
@@ -0,0 +1,274 @@
+import re
+import logging
+from typing import List, Dict, Optional, Iterable, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 重量标记，如 "170g"、"250克"、"150G"
+WEIGHT_PATTERN = re.compile(r'(\d+)\s*(?:g|G|克)')
+
+# 参与相似度计算前去除的品牌前缀
+BRAND_PREFIX = "四海"
+
+
+def extract_weight(name: str) -> Optional[int]:
+    """
+    提取商品名称中的重量（克）
+
+    Args:
+        name: 商品名称
+
+    Returns:
+        重量数值，没有重量信息时返回 None
+    """
+    match = WEIGHT_PATTERN.search(name)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def char_bigrams(name: str) -> List[str]:
+    """
+    生成字符二元组（去除品牌前缀和重量后，首尾加边界符）
+
+    Args:
+        name: 商品名称
+
+    Returns:
+        二元组列表（可能重复）
+    """
+    text = WEIGHT_PATTERN.sub('', name.replace(BRAND_PREFIX, ''))
+    text = re.sub(r'\s+', '', text)
+    if not text:
+        return []
+    text = f"^{text}$"
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+class NgramMatcher:
+    """
+    基于字符二元组 TF-IDF 的本地商品映射器
+
+    把所有标准商品编码为 TF-IDF 向量，对变体名称批量计算余弦相似度矩阵，
+    重量信息作为硬约束（两边都有重量时必须一致）。输出与
+    ProductStandardizer.create_product_mapping 相同的 {变体: 标准全称} 结构，
+    可作为不调用 AI 的离线映射模式。
+    """
+
+    def __init__(self, standard_products: List[str], min_score: float = 0.2,
+                 block_size: int = 512):
+        """
+        初始化匹配器
+
+        Args:
+            standard_products: 标准商品全称列表
+            min_score: 最低相似度，低于该值的变体不输出映射
+            block_size: 分块计算时每块的变体数量（控制内存峰值）
+        """
+        self.standard_products = list(standard_products)
+        self.min_score = min_score
+        self.block_size = block_size
+
+        # 词表与 IDF 只基于标准商品构建
+        sku_grams = [char_bigrams(name) for name in self.standard_products]
+        self.vocabulary: Dict[str, int] = {}
+        for grams in sku_grams:
+            for gram in grams:
+                self.vocabulary.setdefault(gram, len(self.vocabulary))
+
+        n_skus = len(self.standard_products)
+        doc_freq = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for grams in sku_grams:
+            for index in {self.vocabulary[gram] for gram in grams}:
+                doc_freq[index] += 1
+        self.idf = (np.log((1 + n_skus) / (1 + doc_freq)) + 1).astype(np.float32)
+        # 词表外的二元组按最大 IDF 计入变体向量的模长，降低噪声变体的得分
+        self.unknown_idf = float(np.log(1 + n_skus) + 1)
+
+        # 标准商品矩阵按 (二元组, 商品, 权重) 稀疏存储，按二元组排序，每个商品向量已做 L2 归一化
+        entries: Dict[Tuple[int, int], float] = {}
+        for column, grams in enumerate(sku_grams):
+            for gram in grams:
+                key = (self.vocabulary[gram], column)
+                entries[key] = entries.get(key, 0.0) + 1.0
+        keys = sorted(entries)
+        self.sku_grams = np.array([key[0] for key in keys], dtype=np.int64)
+        self.sku_columns = np.array([key[1] for key in keys], dtype=np.int64)
+        self.sku_values = np.array([entries[key] for key in keys], dtype=np.float32)
+        self.sku_values *= self.idf[self.sku_grams]
+        norms = np.sqrt(np.bincount(self.sku_columns, weights=self.sku_values ** 2, minlength=n_skus))
+        norms[norms == 0] = 1
+        self.sku_values /= norms[self.sku_columns].astype(np.float32)
+
+        # 标准商品重量：0 表示没有重量信息
+        self.sku_weights = np.array(
+            [extract_weight(name) or 0 for name in self.standard_products], dtype=np.int64
+        )
+
+    def _encode(self, names: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        把变体名称编码为稀疏 TF-IDF 向量（CSR 形式）
+
+        Args:
+            names: 变体名称列表
+
+        Returns:
+            (indptr, indices, data) 三元组，data 已按变体做 L2 归一化
+        """
+        indptr = np.zeros(len(names) + 1, dtype=np.int64)
+        indices: List[int] = []
+        data: List[float] = []
+
+        for row, name in enumerate(names):
+            counts: Dict[int, int] = {}
+            unknown = 0
+            for gram in char_bigrams(name):
+                index = self.vocabulary.get(gram)
+                if index is None:
+                    unknown += 1
+                else:
+                    counts[index] = counts.get(index, 0) + 1
+
+            weights = [count * float(self.idf[index]) for index, count in counts.items()]
+            norm = float(np.sqrt(sum(w * w for w in weights) + (unknown * self.unknown_idf) ** 2))
+            if norm > 0:
+                indices.extend(counts.keys())
+                data.extend(w / norm for w in weights)
+            indptr[row + 1] = len(indices)
+
+        return (indptr,
+                np.asarray(indices, dtype=np.int64),
+                np.asarray(data, dtype=np.float32))
+
+    def _postings(self, sku_columns: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        构建指定标准商品子集的倒排表（二元组 -> 商品）
+
+        Args:
+            sku_columns: 参与计算的标准商品列号
+
+        Returns:
+            (post_ptr, post_sku, post_val)：按二元组分段的局部列号和权重
+        """
+        local_index = np.full(len(self.standard_products), -1, dtype=np.int64)
+        local_index[sku_columns] = np.arange(len(sku_columns))
+        keep = local_index[self.sku_columns] >= 0
+
+        grams = self.sku_grams[keep]
+        post_ptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(grams, minlength=len(self.vocabulary)), out=post_ptr[1:])
+        return post_ptr, local_index[self.sku_columns[keep]], self.sku_values[keep]
+
+    @staticmethod
+    def _expand(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """把若干 [start, start+length) 区间展开为连续的下标数组"""
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+        segment_starts = np.cumsum(lengths) - lengths
+        return np.repeat(starts - segment_starts, lengths) + np.arange(total)
+
+    def _score_block(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+                     rows: np.ndarray, postings: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                     n_columns: int) -> np.ndarray:
+        """
+        计算一块变体对标准商品子集的相似度
+
+        变体的每个非零二元组沿倒排表展开，一次 bincount 累加出整块的得分矩阵，
+        计算量与共享二元组的 (变体, 商品) 对数成正比。
+
+        Args:
+            indptr, indices, data: 全部变体的 CSR 编码
+            rows: 本块变体的行号
+            postings: _postings 返回的倒排表
+            n_columns: 标准商品子集的大小
+
+        Returns:
+            (len(rows), n_columns) 的相似度矩阵
+        """
+        post_ptr, post_sku, post_val = postings
+
+        # 本块所有变体的非零元素
+        row_lengths = indptr[rows + 1] - indptr[rows]
+        nz = self._expand(indptr[rows], row_lengths)
+        nz_rows = np.repeat(np.arange(len(rows)), row_lengths)
+        nz_grams = indices[nz]
+
+        # 沿倒排表展开
+        post_lengths = post_ptr[nz_grams + 1] - post_ptr[nz_grams]
+        entries = self._expand(post_ptr[nz_grams], post_lengths)
+        flat = np.repeat(nz_rows, post_lengths) * n_columns + post_sku[entries]
+        weights = np.repeat(data[nz], post_lengths) * post_val[entries]
+
+        scores = np.bincount(flat, weights=weights, minlength=len(rows) * n_columns)
+        return scores.reshape(len(rows), n_columns).astype(np.float32)
+
+    def similarity_matrix(self, variants: List[str]) -> np.ndarray:
+        """
+        计算完整的相似度矩阵（违反重量约束的位置为 -1）
+
+        适用于规模较小的分析场景；大批量映射请使用 match。
+
+        Args:
+            variants: 变体名称列表
+
+        Returns:
+            (变体数, 标准商品数) 的相似度矩阵
+        """
+        indptr, indices, data = self._encode(variants)
+        all_columns = np.arange(len(self.standard_products))
+        scores = self._score_block(indptr, indices, data, np.arange(len(variants)),
+                                   self._postings(all_columns), len(all_columns))
+
+        variant_weights = np.array([extract_weight(name) or 0 for name in variants], dtype=np.int64)
+        conflict = ((variant_weights[:, None] != 0) & (self.sku_weights[None, :] != 0)
+                    & (variant_weights[:, None] != self.sku_weights[None, :]))
+        scores[conflict] = -1
+        return scores
+
+    def match(self, variants: Iterable[str]) -> Dict[str, str]:
+        """
+        批量映射变体名称到标准全称
+
+        按重量分组计算：有重量的变体只与同重量（或无重量）的标准商品比较，
+        每组内分块做批量稀疏矩阵运算。
+
+        Args:
+            variants: 变体名称
+
+        Returns:
+            {变体: 标准全称} 映射，相似度低于 min_score 的变体不包含在内
+        """
+        names = list(dict.fromkeys(variants))
+        if not names or not self.standard_products:
+            return {}
+
+        indptr, indices, data = self._encode(names)
+        variant_weights = np.array([extract_weight(name) or 0 for name in names], dtype=np.int64)
+
+        mapping: Dict[str, str] = {}
+        all_columns = np.arange(len(self.standard_products))
+
+        for weight in np.unique(variant_weights):
+            group_rows = np.nonzero(variant_weights == weight)[0]
+            if weight == 0:
+                sku_columns = all_columns
+            else:
+                sku_columns = np.nonzero((self.sku_weights == weight) | (self.sku_weights == 0))[0]
+            if len(sku_columns) == 0:
+                continue
+
+            postings = self._postings(sku_columns)
+            for start in range(0, len(group_rows), self.block_size):
+                rows = group_rows[start:start + self.block_size]
+                scores = self._score_block(indptr, indices, data, rows, postings, len(sku_columns))
+                best = scores.argmax(axis=1)
+                best_scores = scores[np.arange(len(rows)), best]
+                for row, column, score in zip(rows, best, best_scores):
+                    if score >= self.min_score:
+                        mapping[names[row]] = self.standard_products[sku_columns[column]]
+
+        logger.info(f"本地相似度映射: {len(mapping)}/{len(names)} 个变体")
+        return mapping
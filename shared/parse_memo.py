@@ -0,0 +1,114 @@
+"""
+跨任务的商品行解析缓存
+
+同样的订单行（如 "170g鱼蛋鲜装2件"）每天在不同任务中重复出现成千上万次，
+解析结果和名称标准化结果缓存在进程内共享的 LRU 中（所有 ProductStandardizer 共用 PARSE_MEMO）。
+
+- 键为 (解析器版本, 原始行)；解析规则变化（PARSER_VERSION 递增）后旧结果不会被命中
+- 有上限，超过后淘汰最久未使用的条目；基于 functools.lru_cache，多线程并发读写安全
+- 命中 / 未命中数按增量汇总到 sihai_cache_requests_total{cache="parse_memo"}（由 report_metrics 写入，
+  避免每行都加锁更新指标）
+"""
+
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from shared.line_parser import PARSER_VERSION, parse_product_line, normalize_product_name
+from shared.metrics import CACHE_REQUESTS, CACHE_ENTRIES
+
+# 默认缓存条目数（解析和名称标准化各自的上限）
+DEFAULT_MAXSIZE = 65536
+
+
+def _parse(version: int, line: str) -> Tuple[Optional[str], Optional[int]]:
+    return parse_product_line(line)
+
+
+def _normalize(version: int, product_name: str) -> str:
+    return normalize_product_name(product_name)
+
+
+class ParseMemo:
+    """商品行解析和名称标准化的 LRU 缓存"""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, version: int = PARSER_VERSION):
+        """
+        Args:
+            maxsize: 解析结果和名称标准化结果各自最多缓存的条目数
+            version: 解析器版本（缓存键的一部分）
+        """
+        self.version = version
+        self._lock = threading.Lock()
+        self._reported = (0, 0)
+        self._build(maxsize)
+
+    def _build(self, maxsize: int):
+        if maxsize < 1:
+            raise ValueError("缓存条目数至少为 1")
+        self.maxsize = maxsize
+        self._parse = lru_cache(maxsize=maxsize)(_parse)
+        self._normalize = lru_cache(maxsize=maxsize)(_normalize)
+
+    def parse_product_line(self, line: str) -> Tuple[Optional[str], Optional[int]]:
+        """解析单行商品数据（见 shared.line_parser.parse_product_line）"""
+        return self._parse(self.version, line)
+
+    def normalize_product_name(self, product_name: str) -> str:
+        """标准化商品名称（见 shared.line_parser.normalize_product_name）"""
+        return self._normalize(self.version, product_name)
+
+    def _counts(self) -> Tuple[int, int, int]:
+        parse_info = self._parse.cache_info()
+        normalize_info = self._normalize.cache_info()
+        return (parse_info.hits + normalize_info.hits,
+                parse_info.misses + normalize_info.misses,
+                parse_info.currsize + normalize_info.currsize)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存统计（进程启动或上次 clear / resize 以来）
+
+        Returns:
+            {"version", "size", "maxsize", "hits", "misses", "hit_rate"}（解析和名称标准化合计）
+        """
+        hits, misses, size = self._counts()
+        total = hits + misses
+        return {
+            "version": self.version,
+            "size": size,
+            "maxsize": self.maxsize * 2,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0
+        }
+
+    def report_metrics(self):
+        """把上次汇报以来的命中 / 未命中数写入 CACHE_REQUESTS"""
+        with self._lock:
+            hits, misses, _ = self._counts()
+            reported_hits, reported_misses = self._reported
+            self._reported = (hits, misses)
+        if hits > reported_hits:
+            CACHE_REQUESTS.inc(hits - reported_hits, cache="parse_memo", result="hit")
+        if misses > reported_misses:
+            CACHE_REQUESTS.inc(misses - reported_misses, cache="parse_memo", result="miss")
+
+    def resize(self, maxsize: int):
+        """修改缓存上限（清空已有条目）"""
+        with self._lock:
+            self._build(maxsize)
+            self._reported = (0, 0)
+
+    def clear(self):
+        """清空缓存和统计"""
+        with self._lock:
+            self._parse.cache_clear()
+            self._normalize.cache_clear()
+            self._reported = (0, 0)
+
+
+# 进程内共享的缓存
+PARSE_MEMO = ParseMemo()
+
+CACHE_ENTRIES.set_function(lambda: {("parse_memo",): PARSE_MEMO.stats()["size"]})
@@ -3,34 +3,104 @@ import json
 import re
 from openai import OpenAI
 import requests
-from typing import List, Dict, Any, Callable, Optional
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple, Union
 import logging
 import os
 import glob
+import time
+import threading
 from pathlib import Path
 import shutil
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from shared.ngram_matcher import NgramMatcher
+from shared.parse_memo import ParseMemo, PARSE_MEMO
+from shared.template_index import LoadedTemplate, load_template
+from shared.shop_index import (
+    ShopMatchConfig, MATCH_EXACT, MATCH_ALIAS, MATCH_SUBSTRING, MATCH_KEYWORD, MATCH_FUZZY, clean_shop_name
+)
+from shared.quantity_matrix import QuantityMatrix
+from shared.tracing import StageTimer, MemoryProfiler
+from shared.progress import ProgressEmitter, PROGRESS_DETAIL
+from shared.cancellation import CancelToken, TaskCancelled, TaskTimedOut
+from shared.checkpoint import CheckpointStore, STAGE_PARSED, STAGE_MAPPING, STAGE_STANDARDIZED
+from shared.metrics import (
+    LLM_REQUEST_DURATION, LLM_REQUESTS, LLM_PROMPT_TOKENS, LLM_COMPLETION_TOKENS
+)
 
-# 配置日志
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 商品映射模式
+MAPPING_MODE_LLM = "llm"      # 调用 Deepseek 进行映射
+MAPPING_MODE_LOCAL = "local"  # 本地相似度匹配（离线，不调用 AI）
+MAPPING_MODES = (MAPPING_MODE_LLM, MAPPING_MODE_LOCAL)
+
+# 流式读取订单文件的缓冲区大小
+ORDER_READ_BUFFER = 1024 * 1024
+
+# AI 请求进行中检查取消和超时的间隔（秒）
+LLM_CANCEL_POLL_INTERVAL = 0.2
+
+# 店铺匹配方式的优先级（数值小的更直接），多个店铺对应同一列时该列归优先级最高的店铺
+_MATCH_RANK = {MATCH_EXACT: 0, MATCH_ALIAS: 0, MATCH_SUBSTRING: 1, MATCH_FUZZY: 2, MATCH_KEYWORD: 3}
+
+
 class ProductStandardizer:
-    def __init__(self, api_key: str, base_url: str = "https://api.deepseek.com",
-                 progress_callback: Optional[Callable[[int, str], None]] = None):
+    def __init__(self, api_key: Optional[str], base_url: str = "https://api.deepseek.com",
+                 progress_callback: Optional[Callable[[int, str], None]] = None,
+                 mapping_mode: str = MAPPING_MODE_LLM,
+                 llm_client: Optional[Any] = None,
+                 detail_logs: bool = True,
+                 parse_memo: Optional[ParseMemo] = None,
+                 shop_match: Optional[ShopMatchConfig] = None):
         """
         初始化商品标准化器
 
         Args:
-            api_key: Deepseek API密钥
+            api_key: Deepseek API密钥（本地映射模式或提供 llm_client 时可为空）
             base_url: API基础URL
             progress_callback: 进度回调函数，接收 (percent: int, message: str) 参数
+            mapping_mode: 商品映射模式，"llm" 调用 Deepseek，"local" 使用本地相似度匹配
+            llm_client: 自定义 AI 客户端（如录制/回放客户端），需提供 chat.completions.create 接口
+            detail_logs: 是否通过进度回调发送详细日志（每个店铺、每个单元格），批量处理时可关闭
+            parse_memo: 商品行解析缓存（默认使用进程内共享的 PARSE_MEMO）
+            shop_match: 店铺匹配配置（别名、关键词、错别字阈值），默认不使用别名
         """
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
+        if mapping_mode not in MAPPING_MODES:
+            raise ValueError(f"不支持的映射模式: {mapping_mode}")
+        if mapping_mode == MAPPING_MODE_LLM and not api_key and llm_client is None:
+            raise ValueError("AI 映射模式需要提供 API Key")
+
+        self.mapping_mode = mapping_mode
+        # 离线模式不调用 AI，也不使用 AI fallback 解析
+        self.use_ai_fallback = mapping_mode == MAPPING_MODE_LLM
+
+        if llm_client is not None:
+            self.client = llm_client
+        else:
+            self.client = OpenAI(
+                api_key=api_key,
+                base_url=base_url
+            ) if api_key else None
 
         self.progress_callback = progress_callback
+        # 详细日志合并后再回调，百分比进度立即回调
+        self._progress = ProgressEmitter(self._call_progress_callback, detail_logs=detail_logs)
+        self._local_matcher: Optional[NgramMatcher] = None
+        # 解析结果跨任务共享，重复的订单行不再重新解析
+        self.parse_memo = parse_memo or PARSE_MEMO
+        self.shop_match = shop_match
+
+        # 各阶段耗时（每次 process_order 开始时清空）
+        self.timer = StageTimer()
+        # 最近一次开启内存分析时的结果
+        self.memory_profile: Optional[Dict[str, Any]] = None
+        # 最近一次处理的店铺 × 商品数量矩阵（可导出 CSV / Parquet 或计算合计）
+        self.quantity_matrix: Optional[QuantityMatrix] = None
+        self._memory_profiler: Optional[MemoryProfiler] = None
+        # 当前处理的取消令牌（process_order 期间有效）
+        self._cancel_token: Optional[CancelToken] = None
 
         # 标准商品名称列表
         self.standard_products = [
@@ -47,26 +117,144 @@ class ProductStandardizer:
             "四海150g鲜装牛肉丸"
         ]
 
+    @property
+    def timings(self) -> Dict[str, float]:
+        """最近一次处理的各阶段耗时（秒）"""
+        return self.timer.as_dict()
+
+    @contextmanager
+    def _stage(self, name: str):
+        """流程阶段：进入前检查是否取消，记录耗时，开启内存分析时同时记录内存分配"""
+        self._checkpoint()
+        with self.timer.span(name):
+            if self._memory_profiler is None:
+                yield
+            else:
+                with self._memory_profiler.stage(name):
+                    yield
+
+    def _checkpoint(self):
+        """取消检查点：任务被取消或超时时抛出 TaskCancelled / TaskTimedOut"""
+        if self._cancel_token is not None:
+            self._cancel_token.check()
+
+    def _load_checkpoint(self, checkpoint: Optional[CheckpointStore], stage: str) -> Optional[Any]:
+        """读取阶段检查点（未启用检查点或不存在时返回 None）"""
+        if checkpoint is None:
+            return None
+        with self.timer.span("checkpoint"):
+            return checkpoint.load(stage)
+
+    def _save_checkpoint(self, checkpoint: Optional[CheckpointStore], stage: str, data: Any):
+        """保存阶段检查点，保存失败只记录警告，不影响处理"""
+        if checkpoint is None:
+            return
+        with self.timer.span("checkpoint"):
+            try:
+                checkpoint.save(stage, data)
+            except Exception as e:
+                logger.warning(f"保存检查点失败 ({stage}): {e}")
+
     def _update_progress(self, percent: int, message: str, is_detail: bool = False):
         """
         更新处理进度
-        
+
+        详细日志会被合并后批量回调（见 ProgressEmitter），百分比进度立即回调。
+
         Args:
             percent: 进度百分比，-2 表示详细日志
             message: 消息内容
             is_detail: 是否为详细日志
         """
-        if not is_detail:
-            logger.info(f"[{percent}%] {message}")
-        else:
-            logger.info(message)
-        
+        if is_detail or percent == PROGRESS_DETAIL:
+            logger.debug(message)
+            self._progress.detail(message)
+            return
+
+        logger.info(f"[{percent}%] {message}")
+        self._progress.progress(percent, message)
+
+    def _call_progress_callback(self, percent: int, message: str):
         if self.progress_callback:
             try:
                 self.progress_callback(percent, message)
             except Exception as e:
                 logger.error(f"进度回调执行失败: {e}")
 
+    def _chat_completion(self, prompt: str, call_site: str) -> str:
+        """
+        调用 Deepseek 对话接口（所有 AI 调用的统一入口）
+
+        Args:
+            prompt: 用户提示词
+            call_site: 调用位置（mapping / single_line_fallback / batch_fallback），用于指标分组
+
+        Returns:
+            模型返回的文本内容
+        """
+        if self.client is None:
+            raise RuntimeError("未配置 AI 客户端，无法调用 Deepseek")
+
+        self._checkpoint()
+        request = {
+            "model": "deepseek-chat",
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.1
+        }
+        # 把任务剩余时间作为本次请求的超时，避免卡住的请求超过任务截止时间
+        remaining = self._cancel_token.remaining() if self._cancel_token is not None else None
+        if remaining is not None:
+            request["timeout"] = remaining
+
+        started = time.perf_counter()
+        try:
+            response = self._call_cancellable(self.client.chat.completions.create, request)
+        except TaskCancelled:
+            LLM_REQUESTS.inc(call_site=call_site, outcome="cancelled")
+            raise
+        except Exception:
+            LLM_REQUESTS.inc(call_site=call_site, outcome="error")
+            raise
+        finally:
+            LLM_REQUEST_DURATION.observe(time.perf_counter() - started, call_site=call_site)
+
+        LLM_REQUESTS.inc(call_site=call_site, outcome="ok")
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            LLM_PROMPT_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, call_site=call_site)
+            LLM_COMPLETION_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, call_site=call_site)
+        return response.choices[0].message.content
+
+    def _call_cancellable(self, call: Callable[..., Any], request: Dict[str, Any]) -> Any:
+        """
+        在后台线程中发起请求，等待期间响应取消和超时
+
+        任务被取消时立即返回（抛出 TaskCancelled），不等请求结束；被放弃的请求在后台线程中
+        自行结束（最长为 AI 请求超时），结果丢弃。
+
+        Raises:
+            TaskCancelled: 任务被取消
+            TaskTimedOut: 任务超时
+        """
+        token = self._cancel_token
+        if token is None:
+            return call(**request)
+
+        future: Future = Future()
+
+        def run():
+            try:
+                future.set_result(call(**request))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="llm-request", daemon=True).start()
+        while True:
+            try:
+                return future.result(timeout=LLM_CANCEL_POLL_INTERVAL)
+            except FutureTimeoutError:
+                token.check()
+
     def read_order_data_from_file(self, file_path: str) -> List[str]:
         """
         从order.txt文件中读取订单数据
@@ -78,32 +266,43 @@ class ProductStandardizer:
             订单数据列表
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
+            orders = list(self.iter_order_data_from_file(file_path))
+            logger.info(f"从 {file_path} 读取了 {len(orders)} 个店铺的订单数据")
+            return orders
+
+        except Exception as e:
+            logger.error(f"读取订单文件失败: {e}")
+            raise
 
+    def iter_order_data_from_file(self, file_path: str, buffer_size: int = ORDER_READ_BUFFER) -> Iterator[str]:
+        """
+        流式读取订单文件：逐行读取，每读完一个店铺就产出该店铺的数据
+
+        内存中只保留当前店铺的行，适合月底汇总的数千个店铺的大文件。
+
+        Args:
+            file_path: order.txt文件路径
+            buffer_size: 读取缓冲区大小（字节）
+
+        Returns:
+            店铺数据的迭代器（与 read_order_data_from_file 的列表元素相同）
+        """
+        with open(file_path, 'r', encoding='utf-8', buffering=buffer_size) as f:
             # 按空行分割不同店铺的数据
-            orders = []
             current_order = []
 
-            for line in content.split('\n'):
+            for line in f:
                 line = line.strip()
                 if not line:  # 空行表示一个店铺数据结束
                     if current_order:
-                        orders.append('\n'.join(current_order))
+                        yield '\n'.join(current_order)
                         current_order = []
                 else:
                     current_order.append(line)
 
-            # 添加最后一个订单
+            # 最后一个订单
             if current_order:
-                orders.append('\n'.join(current_order))
-
-            logger.info(f"从 {file_path} 读取了 {len(orders)} 个店铺的订单数据")
-            return orders
-
-        except Exception as e:
-            logger.error(f"读取订单文件失败: {e}")
-            raise
+                yield '\n'.join(current_order)
 
     def parse_raw_data(self, raw_data: List[str]) -> List[Dict[str, Any]]:
         """
@@ -115,8 +314,18 @@ class ProductStandardizer:
         Returns:
             解析后的数据结构
         """
-        parsed_data = []
+        return list(self.iter_parse_raw_data(raw_data))
+
+    def iter_parse_raw_data(self, raw_data: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        逐个店铺解析原始数据（生成器，可直接接在 iter_order_data_from_file 之后）
+
+        Args:
+            raw_data: 店铺数据的可迭代对象
 
+        Returns:
+            {'shopName', 'data'} 的迭代器
+        """
         for data in raw_data:
             lines = data.strip().split('\n')
 
@@ -147,16 +356,14 @@ class ProductStandardizer:
             # 合并产品信息
             products_text = '\n'.join(product_lines)
 
-            parsed_data.append({
+            yield {
                 'shopName': shop_name,
                 'data': products_text
-            })
-
-        return parsed_data
+            }
 
     def normalize_product_name(self, product_name: str) -> str:
         """
-        标准化商品名称，统一格式
+        标准化商品名称，统一格式（克、G → g，去除空白）
 
         Args:
             product_name: 原始商品名称
@@ -164,27 +371,18 @@ class ProductStandardizer:
         Returns:
             标准化后的商品名称
         """
-        # 去除首尾空格
-        name = product_name.strip()
-
-        # 统一重量单位：克 -> g
-        name = re.sub(r'(\d+)克', r'\1g', name)
-        name = re.sub(r'(\d+)G', r'\1g', name)
-
-        # 去除多余的空格
-        name = re.sub(r'\s+', '', name)
-
-        return name
+        return self.parse_memo.normalize_product_name(product_name)
 
     def parse_product_line(self, line: str) -> tuple:
         """
-        解析单行商品数据，支持多种格式
+        解析单行商品数据，支持多种格式（单次扫描，见 shared/line_parser.py；结果缓存在 parse_memo 中）
 
         支持的格式：
         1. 商品名:数量件 (标准格式)
         2. 商品名：数量件 (中文冒号)
         3. 商品名  数量 (多空格分隔)
         4. 商品名    1 (制表符或多个空格分隔，数字代表数量)
+        5. 商品名数量件 (数字直接跟在商品名后)
 
         Args:
             line: 单行数据
@@ -192,39 +390,7 @@ class ProductStandardizer:
         Returns:
             (商品名, 数量) 元组，无法解析时返回 (None, None)
         """
-        line = line.strip()
-        if not line:
-            return None, None
-
-        product_name = None
-        quantity = None
-
-        # 方式1: 冒号分隔（:或：）
-        if ':' in line or '：' in line:
-            parts = re.split(r'[：:]', line)
-            if len(parts) >= 2:
-                product_name = parts[0].strip()
-                quantity_str = parts[1].strip()
-                # 提取数量（可能是 "2件" 或 "2"）
-                match = re.search(r'(\d+)', quantity_str)
-                if match:
-                    quantity = int(match.group(1))
-
-        # 方式2: 多空格或制表符分隔（支持 "商品名  1 件" 或 "商品名  1" 格式）
-        if product_name is None:
-            # 匹配：文本 + 多个空格或制表符 + 数字 + 可选的空格和"件"
-            match = re.match(r'^(.+?)\s{2,}(\d+)\s*件?$', line)
-            if match:
-                product_name = match.group(1).strip()
-                quantity = int(match.group(2))
-            else:
-                # 方式3: 直接跟数字的格式（如 "150g鲜装牛肉丸2件" 或 "150g鲜装牛肉丸2" 或 "150g鲜装牛肉丸2 件"）
-                match = re.match(r'(.+?)(\d+)\s*件?$', line)
-                if match:
-                    product_name = match.group(1).strip()
-                    quantity = int(match.group(2))
-
-        return product_name, quantity
+        return self.parse_memo.parse_product_line(line)
 
     def parse_product_line_with_ai(self, line: str) -> tuple:
         """
@@ -252,13 +418,7 @@ class ProductStandardizer:
 
 只返回 JSON，不要其他说明。"""
 
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
-            )
-
-            response_text = response.choices[0].message.content
+            response_text = self._chat_completion(prompt, "single_line_fallback")
             json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
             if json_match:
                 result = json.loads(json_match.group())
@@ -268,6 +428,8 @@ class ProductStandardizer:
                     logger.info(f"AI 解析成功: '{line}' => {product_name}, {quantity}")
                     return product_name, int(quantity)
 
+        except TaskCancelled:
+            raise
         except Exception as e:
             logger.warning(f"AI 解析失败: {e}")
 
@@ -288,7 +450,7 @@ class ProductStandardizer:
         product_name, quantity = self.parse_product_line(line)
 
         # 如果本地解析失败且启用了 AI fallback，则调用 AI
-        if product_name is None and use_ai_fallback and line.strip():
+        if product_name is None and use_ai_fallback and self.use_ai_fallback and line.strip():
             logger.info(f"本地解析失败，尝试 AI 解析: '{line}'")
             product_name, quantity = self.parse_product_line_with_ai(line)
 
@@ -328,13 +490,7 @@ class ProductStandardizer:
 
 只返回 JSON 数组，不要其他说明。"""
 
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
-            )
-
-            response_text = response.choices[0].message.content
+            response_text = self._chat_completion(prompt, "batch_fallback")
             # 提取 JSON 数组
             json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
             if json_match:
@@ -347,27 +503,99 @@ class ProductStandardizer:
                         logger.info(f"AI 批量解析成功: '{product_name}'")
                 return product_names
 
+        except TaskCancelled:
+            raise
         except Exception as e:
             logger.warning(f"AI 批量解析失败: {e}")
 
         return []
 
-    def extract_all_product_variants(self, parsed_data: List[Dict[str, Any]], use_ai_fallback: bool = True) -> set:
+    def derive_product_variants(self, canonical_name: str) -> List[str]:
         """
-        提取所有商品变体名称（支持 AI fallback）
+        按确定性规则从规范名称推导变体名称
+
+        推导规则：
+        1. 去除重量信息的版本
+        2. 去除"鲜装"等修饰词的版本
+        3. 去除重量和修饰词的版本
 
         Args:
-            parsed_data: 解析后的数据
+            canonical_name: 规范化后的商品名称
+
+        Returns:
+            推导出的变体名称列表（不包含规范名称本身）
+        """
+        variants = []
+
+        # 1. 去除重量信息的版本
+        name_without_weight = re.sub(r'^\d+g', '', canonical_name)
+        if name_without_weight != canonical_name:
+            variants.append(name_without_weight)
+
+        # 2. 去除"鲜装"等修饰词
+        name_without_fresh = re.sub(r'鲜装', '', canonical_name)
+        if name_without_fresh != canonical_name:
+            variants.append(name_without_fresh)
+
+        # 3. 去除重量和修饰词的版本
+        name_clean = re.sub(r'^\d+g', '', name_without_fresh)
+        if name_clean != canonical_name and name_clean not in variants:
+            variants.append(name_clean)
+
+        return [variant for variant in variants if variant]
+
+    def expand_product_mapping(self, mapping: Dict[str, str]) -> Dict[str, str]:
+        """
+        在本地把规范名称的映射结果扩展到推导出的变体名称
+
+        规范名称的映射结果优先；同一个变体由多个规范名称推导且映射结果不一致时，
+        该变体有歧义，不加入映射。
+
+        Args:
+            mapping: 规范名称 -> 标准全称 的映射
+
+        Returns:
+            扩展后的映射字典
+        """
+        derived: Dict[str, Optional[str]] = {}
+        for canonical_name in sorted(mapping):
+            standard_name = mapping[canonical_name]
+            for variant in self.derive_product_variants(canonical_name):
+                if variant in mapping:
+                    continue
+                if variant not in derived:
+                    derived[variant] = standard_name
+                elif derived[variant] != standard_name:
+                    derived[variant] = None
+
+        expanded = dict(mapping)
+        for variant, standard_name in derived.items():
+            if standard_name:
+                expanded[variant] = standard_name
+
+        return expanded
+
+    def extract_all_product_variants(self, parsed_data: Iterable[Dict[str, Any]], use_ai_fallback: bool = True) -> set:
+        """
+        提取所有商品的规范名称（支持 AI fallback）
+
+        每一行只对应一个规范名称，去除重量、"鲜装"等变体在映射返回后
+        由 expand_product_mapping 在本地推导，不再发送给 AI。
+        逐个店铺处理，只保留去重后的规范名称和解析失败的行，可以直接接 iter_parse_raw_data 的生成器。
+
+        Args:
+            parsed_data: 解析后的店铺数据的可迭代对象
             use_ai_fallback: 是否启用 AI fallback 解析
 
         Returns:
-            所有商品变体的集合
+            所有商品规范名称的集合
         """
         all_products = set()
-        failed_lines = []  # 收集本地解析失败的行
+        failed_lines: Dict[str, None] = {}  # 收集本地解析失败的行（去重，保持顺序）
 
         # 第一轮：使用本地解析
         for entry in parsed_data:
+            self._checkpoint()
             lines = entry['data'].strip().split('\n')
             for line in lines:
                 line = line.strip()
@@ -378,33 +606,17 @@ class ProductStandardizer:
                 product_name, _ = self.parse_product_line(line)
 
                 if not product_name:
-                    failed_lines.append(line)
+                    failed_lines[line] = None
                     continue
 
-                # 标准化商品名称
+                # 标准化商品名称，作为规范名称
                 normalized_name = self.normalize_product_name(product_name)
                 all_products.add(normalized_name)
 
-                # 生成更多变体以便AI更好地理解映射关系
-                # 1. 去除重量信息的版本
-                name_without_weight = re.sub(r'^\d+g', '', normalized_name)
-                if name_without_weight != normalized_name:
-                    all_products.add(name_without_weight)
-
-                # 2. 去除"鲜装"等修饰词
-                name_without_fresh = re.sub(r'鲜装', '', normalized_name)
-                if name_without_fresh != normalized_name:
-                    all_products.add(name_without_fresh)
-
-                # 3. 去除重量和修饰词的版本
-                name_clean = re.sub(r'^\d+g', '', name_without_fresh)
-                if name_clean != normalized_name and name_clean != name_without_weight:
-                    all_products.add(name_clean)
-
         # 第二轮：对失败的行使用 AI fallback（批量处理以减少 API 调用）
-        if use_ai_fallback and failed_lines:
+        if use_ai_fallback and self.use_ai_fallback and failed_lines:
             logger.info(f"本地解析失败 {len(failed_lines)} 行，尝试 AI 批量解析...")
-            ai_results = self._batch_parse_with_ai(failed_lines)
+            ai_results = self._batch_parse_with_ai(list(failed_lines))
             for product_name in ai_results:
                 if product_name:
                     normalized_name = self.normalize_product_name(product_name)
@@ -412,18 +624,50 @@ class ProductStandardizer:
 
         return all_products
 
-    def create_product_mapping(self, parsed_data: List[Dict[str, Any]]) -> Dict[str, str]:
+    def create_local_product_mapping(self, parsed_data: List[Dict[str, Any]],
+                                     variants: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """
+        使用本地相似度匹配创建商品名称映射（离线模式）
+
+        Args:
+            parsed_data: 解析后的数据
+            variants: 已提取的商品规范名称（为空时从 parsed_data 提取）
+
+        Returns:
+            商品名称映射字典
         """
-        使用Deepseek创建商品名称映射
+        if self._local_matcher is None:
+            self._local_matcher = NgramMatcher(self.standard_products)
+
+        if variants is None:
+            variants = self.extract_all_product_variants(parsed_data, use_ai_fallback=False)
+        all_products = sorted(variants)
+        with self.timer.span("mapping.local_match"):
+            mapping = self._local_matcher.match(all_products)
+        logger.info(f"成功创建本地商品映射: {len(mapping)}/{len(all_products)} 个规范名称")
+        return self.expand_product_mapping(mapping)
+
+    def create_product_mapping(self, parsed_data: List[Dict[str, Any]],
+                               variants: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """
+        使用Deepseek创建商品名称映射（本地映射模式下使用相似度匹配）
 
         Args:
             parsed_data: 解析后的数据
+            variants: 已提取的商品规范名称（见 extract_all_product_variants，为空时从 parsed_data 提取）
 
         Returns:
             商品名称映射字典
         """
-        # 提取所有商品变体
-        all_products = self.extract_all_product_variants(parsed_data)
+        if self.mapping_mode == MAPPING_MODE_LOCAL:
+            return self.create_local_product_mapping(parsed_data, variants)
+
+        build_started = time.perf_counter()
+
+        # 提取所有商品规范名称（排序保证提示词稳定）
+        if variants is None:
+            variants = self.extract_all_product_variants(parsed_data)
+        all_products = sorted(variants)
 
         # 构建更详细的提示词
         prompt = f"""
@@ -433,7 +677,7 @@ class ProductStandardizer:
 {json.dumps(self.standard_products, ensure_ascii=False, indent=2)}
 
 需要映射的商品名称（包括简写和变体）：
-{json.dumps(list(all_products), ensure_ascii=False, indent=2)}
+{json.dumps(all_products, ensure_ascii=False, indent=2)}
 
 映射规则和示例：
 1. 优先根据重量信息精确匹配：
@@ -464,24 +708,23 @@ class ProductStandardizer:
 
 只返回JSON格式，不要其他说明文字。
 """
+        self.timer.add("mapping.prompt_build", time.perf_counter() - build_started)
 
         try:
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
-            )
-
-            # 解析响应
-            response_text = response.choices[0].message.content
+            with self.timer.span("mapping.network"):
+                response_text = self._chat_completion(prompt, "mapping")
             logger.debug(f"Deepseek原始响应: {response_text}")
 
-            # 提取JSON部分
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+            # 解析响应，提取JSON部分
+            with self.timer.span("mapping.json_parse"):
+                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+                if json_match:
+                    mapping = json.loads(json_match.group())
+                    # 在本地推导变体的映射
+                    expanded = self.expand_product_mapping(mapping)
             if json_match:
-                mapping = json.loads(json_match.group())
-                logger.info(f"成功创建商品映射: {len(mapping)} 个商品变体")
-                return mapping
+                logger.info(f"成功创建商品映射: {len(mapping)} 个规范名称（提交 {len(all_products)} 个）")
+                return expanded
             else:
                 logger.error("无法从响应中提取JSON")
                 return {}
@@ -501,9 +744,22 @@ class ProductStandardizer:
         Returns:
             标准化后的数据
         """
-        standardized_data = []
+        return list(self.iter_standardize_data(parsed_data, product_mapping))
 
+    def iter_standardize_data(self, parsed_data: Iterable[Dict[str, Any]],
+                              product_mapping: Dict[str, str]) -> Iterator[Dict[str, Any]]:
+        """
+        逐个店铺标准化数据（生成器，可直接接在 iter_parse_raw_data 之后）
+
+        Args:
+            parsed_data: 解析后的店铺数据的可迭代对象
+            product_mapping: 商品名称映射
+
+        Returns:
+            {'shopName', 'products'} 的迭代器
+        """
         for entry in parsed_data:
+            self._checkpoint()
             shop_name = entry['shopName']
             lines = entry['data'].strip().split('\n')
 
@@ -528,159 +784,599 @@ class ProductStandardizer:
                         standard_name = normalized_name
                         logger.warning(f"未找到 '{normalized_name}' 的映射，使用原名称")
 
-                    shop_products[standard_name] = quantity
-
-            standardized_data.append({
-                'shopName': shop_name,
-                'products': shop_products
-            })
+                    # 同一店铺多行映射到同一商品时数量累加
+                    shop_products[standard_name] = shop_products.get(standard_name, 0) + quantity
 
             # 输出该店铺的结构化数据到日志
             if shop_products:
                 products_str = ", ".join([f"{name}:{qty}件" for name, qty in shop_products.items()])
                 self._update_progress(-2, f"📦 {shop_name}: {products_str}", is_detail=True)
 
-        return standardized_data
+            yield {
+                'shopName': shop_name,
+                'products': shop_products
+            }
+
+        self._progress.flush()
 
-    def update_excel_file(self, file_path: str, standardized_data: List[Dict[str, Any]]) -> str:
+    def load_template(self, file_path: str, shop_names: Iterable[str] = ()) -> LoadedTemplate:
+        """
+        加载 Excel 模板、编译店铺列和商品行索引（商品行表按标准商品名预先编译，同一模板内容跨任务缓存），并预先解析已知店铺的列
+
+        Args:
+            file_path: Excel文件路径
+            shop_names: 订单中的店铺名称
+
+        Returns:
+            已加载的模板
+        """
+        with self.timer.span("excel.load"):
+            template = load_template(file_path, shop_names, self.shop_match, self.standard_products)
+        logger.info(f"找到店铺列: {list(template.index.shop_columns.keys())}")
+        return template
+
+    def _prefetch_templates(self, excel_file_paths: List[str], shop_names: Iterable[str] = ()
+                            ) -> Tuple[Optional[ThreadPoolExecutor], Dict[str, "Future[LoadedTemplate]"]]:
+        """
+        加载各模板，供 update_excel_files 写入
+
+        AI 映射时在后台线程加载，与等待 AI 响应并行（耗时记在 excel.load 中，映射阶段的耗时基本是等待网络）。
+        本地映射是 CPU 密集的，并行加载没有收益，只会让映射阶段的耗时包含加载模板的开销；
+        开启内存分析时后台加载的分配会被计入同时进行的映射阶段（tracemalloc 不区分线程）。
+        这两种情况下在这里依次加载，内存分析中记为单独的 excel.load 阶段。
+
+        Args:
+            excel_file_paths: Excel模板文件路径
+            shop_names: 订单中的店铺名称（预先解析店铺列）
+
+        Returns:
+            (后台加载用的线程池，依次加载时为 None, {Excel模板文件路径: Future})；
+            加载失败时异常保存在 Future 中，写入该模板时抛出
+        """
+        shop_names = list(shop_names)
+        if self._memory_profiler is None and self.mapping_mode != MAPPING_MODE_LOCAL:
+            template_loader = ThreadPoolExecutor(max_workers=min(len(excel_file_paths), 4),
+                                                 thread_name_prefix="template-loader")
+            templates = {path: template_loader.submit(self.load_template, path, shop_names)
+                         for path in excel_file_paths}
+            return template_loader, templates
+
+        templates = {}
+        for path in excel_file_paths:
+            self._checkpoint()
+            future: "Future[LoadedTemplate]" = Future()
+            profiler_stage = (self._memory_profiler.stage("excel.load") if self._memory_profiler is not None
+                              else nullcontext())
+            with profiler_stage:
+                try:
+                    future.set_result(self.load_template(path, shop_names))
+                except Exception as e:
+                    future.set_exception(e)
+            templates[path] = future
+        return None, templates
+
+    def update_excel_file(self, file_path: str,
+                          standardized_data: Union[List[Dict[str, Any]], QuantityMatrix],
+                          template: Optional[LoadedTemplate] = None) -> str:
         """
         直接更新Excel文件，保持原有格式和样式
 
+        店铺和商品先解析为模板的列号、行号，再按行列顺序一次写入所有非零单元格。
+        多个不同店铺对应同一列时只写入其中一个店铺（其余记录警告），不同店铺的数量不会合并到同一单元格。
+
         Args:
             file_path: Excel文件路径
-            standardized_data: 标准化后的数据
+            standardized_data: 标准化后的数据或由其构建的数量矩阵
+            template: 预先加载的模板（见 load_template），为空时在这里加载
 
         Returns:
             更新后的Excel文件路径
         """
+        matrix = standardized_data
+        if not isinstance(matrix, QuantityMatrix):
+            with self.timer.span("matrix"):
+                matrix = QuantityMatrix.from_standardized(standardized_data)
+
         try:
-            from openpyxl import load_workbook
-
-            # 使用openpyxl加载工作簿以保持格式
-            workbook = load_workbook(file_path)
-            worksheet = workbook.active
-
-            # 获取表头信息（第二行包含店铺名称）
-            header_row = []
-            for col in range(1, worksheet.max_column + 1):
-                cell_value = worksheet.cell(row=2, column=col).value
-                header_row.append(cell_value)
-
-            # 创建店铺名称到列索引的映射
-            shop_column_mapping = {}
-            for i, col_name in enumerate(header_row):
-                if col_name and col_name not in ['序号', '商品编码', '商品名称', '规格', '入库价', '售价', '前台毛利', '供应商编码', '供应商名称']:
-                    shop_column_mapping[col_name] = i + 1  # openpyxl使用1基索引
-
-            logger.info(f"找到店铺列: {list(shop_column_mapping.keys())}")
-
-            # 更新数据
-            for entry in standardized_data:
-                shop_name = entry['shopName']
-                products = entry['products']
-
-                # 清理店铺名称（去除冒号等符号）
-                clean_shop_name = shop_name.rstrip('：:').strip()
-
-                # 查找对应的列索引
-                target_column_index = None
-                for col_name, col_index in shop_column_mapping.items():
-                    if clean_shop_name == col_name or clean_shop_name in col_name or col_name in clean_shop_name:
-                        target_column_index = col_index
-                        break
-
-                # 如果没有找到精确匹配，尝试部分匹配
-                if target_column_index is None:
-                    for col_name, col_index in shop_column_mapping.items():
-                        # 处理特殊情况
-                        if ('五江' in clean_shop_name and '五江' in col_name) or \
-                           ('金海' in clean_shop_name and '金海' in col_name) or \
-                           ('洋湖' in clean_shop_name and '洋湖' in col_name) or \
-                           ('砂之船' in clean_shop_name and '砂之船' in col_name) or \
-                           ('邵阳' in clean_shop_name and '邵阳' in col_name) or \
-                           ('岳阳' in clean_shop_name and '岳阳' in col_name):
-                            target_column_index = col_index
-                            break
-
-                if target_column_index is None:
-                    warning_msg = f"未找到店铺 '{shop_name}' (清理后: '{clean_shop_name}') 对应的列"
+            if template is None:
+                template = self.load_template(file_path, matrix.shops)
+            workbook, worksheet, template_index = template.workbook, template.worksheet, template.index
+
+            updates_started = time.perf_counter()
+
+            # 店铺 → 列号：不同店铺对应同一列时（如 岳阳新天地 与 岳阳南湖 都按关键词对应 岳阳梅溪湖店），
+            # 该列只归匹配方式最直接的店铺（同等时取先出现的），其余店铺不写入，不合并不同店铺的数量
+            matches = [template_index.match_shop(shop_name) for shop_name in matrix.shops]
+            owners: Dict[int, int] = {}
+            for j, match in enumerate(matches):
+                if match.column is None:
+                    continue
+                owner = owners.get(match.column)
+                if owner is None or _MATCH_RANK[match.method] < _MATCH_RANK[matches[owner].method]:
+                    owners[match.column] = j
+            shop_columns = []
+            for shop_name, match in zip(matrix.shops, matches):
+                self._checkpoint()
+                owner = owners.get(match.column)
+                if owner is not None and clean_shop_name(matrix.shops[owner]) != clean_shop_name(shop_name):
+                    warning_msg = (f"店铺 '{clean_shop_name(shop_name)}' 与 '{clean_shop_name(matrix.shops[owner])}' "
+                                   f"对应同一列 '{match.header}'，不写入该店铺")
+                    logger.warning(warning_msg)
+                    self._update_progress(-2, f"⚠️ {warning_msg}", is_detail=True)
+                    shop_columns.append(None)
+                    continue
+                if match.column is None:
+                    warning_msg = f"未找到店铺 '{shop_name}' (清理后: '{clean_shop_name(shop_name)}') 对应的列"
                     logger.warning(warning_msg)
                     self._update_progress(-2, f"⚠️ {warning_msg}", is_detail=True)
+                elif match.method in (MATCH_ALIAS, MATCH_FUZZY):
+                    how = "别名" if match.method == MATCH_ALIAS else "近似匹配"
+                    self._update_progress(-2, f"🔗 店铺 '{clean_shop_name(shop_name)}' 按{how}对应列 '{match.header}'",
+                                          is_detail=True)
+                shop_columns.append(match.column)
+
+            # 商品 → 行号（只解析在已找到的店铺中有数量的商品）
+            located = matrix.values[:, [j for j, column in enumerate(shop_columns) if column is not None]].any(axis=1)
+            located_products = [product_name for i, product_name in enumerate(matrix.products) if located[i]]
+            located_rows = dict(zip(located_products, template_index.find_product_rows(located_products)))
+            product_rows: List[Optional[int]] = []
+            for product_name in matrix.products:
+                row = located_rows.get(product_name)
+                if product_name in located_rows and row is None:
+                    warning_msg = f"未找到商品: {product_name}"
+                    logger.warning(warning_msg)
+                    self._update_progress(-2, f"⚠️ {warning_msg}", is_detail=True)
+                product_rows.append(row)
+
+            # 汇总到单元格（同一店铺的多个商品落在同一行时累加），再按行列顺序一次写入
+            cells: Dict[Tuple[int, int], int] = {}
+            for i, j, quantity in matrix.nonzero():
+                row, column = product_rows[i], shop_columns[j]
+                if row is None or column is None:
                     continue
+                cells[(row, column)] = cells.get((row, column), 0) + quantity
+                self._update_progress(
+                    -2, f"更新 {clean_shop_name(matrix.shops[j])} - {matrix.products[i]}: {quantity}件", is_detail=True)
+
+            self._checkpoint()
+            for (row, column), quantity in sorted(cells.items()):
+                # 只更新数值，不改变格式
+                worksheet.cell(row=row, column=column).value = quantity
 
-                # 更新商品数量
-                for product_name, quantity in products.items():
-                    # 查找商品行（从第3行开始）
-                    product_found = False
-                    for row in range(3, worksheet.max_row + 1):
-                        cell_value = worksheet.cell(row=row, column=3).value  # 商品名称在第3列
-                        if cell_value and product_name in str(cell_value):
-                            # 只更新数值，不改变格式
-                            worksheet.cell(row=row, column=target_column_index).value = quantity
-                            update_msg = f"更新 {clean_shop_name} - {product_name}: {quantity}件"
-                            logger.info(update_msg)
-                            self._update_progress(-2, update_msg, is_detail=True)
-                            product_found = True
-                            break
-
-                    if not product_found:
-                        warning_msg = f"未找到商品: {product_name}"
-                        logger.warning(warning_msg)
-                        self._update_progress(-2, f"⚠️ {warning_msg}", is_detail=True)
+            self.timer.add("excel.cell_updates", time.perf_counter() - updates_started)
+
+            # 保存前最后检查一次，已取消的任务不再写出结果文件
+            self._checkpoint()
 
             # 保存工作簿，保持原有格式
-            workbook.save(file_path)
+            with self.timer.span("excel.save"):
+                workbook.save(file_path)
             logger.info(f"Excel文件已更新: {file_path}")
+            self._progress.flush()
             return file_path
 
+        except TaskCancelled:
+            raise
         except Exception as e:
             logger.error(f"更新Excel文件失败: {e}")
             raise
 
-    def process_order(self, order_file_path: str, excel_file_path: str) -> str:
+    def update_excel_files(self, file_paths: List[str],
+                           standardized_data: Union[List[Dict[str, Any]], QuantityMatrix],
+                           max_workers: Optional[int] = None,
+                           templates: Optional[Dict[str, "Future[LoadedTemplate]"]] = None) -> Dict[str, str]:
         """
-        处理订单的主流程（支持进度回调）
+        把同一份标准化数据并发写入多个 Excel 模板（每个模板编译各自的索引）
 
         Args:
-            order_file_path: 订单文件路径
-            excel_file_path: Excel模板文件路径
+            file_paths: Excel文件路径（各模板布局可以不同）
+            standardized_data: 标准化后的数据或由其构建的数量矩阵
+            max_workers: 并发写入数（默认每个模板一个线程，最多 4 个）
+            templates: 正在预加载的模板（{Excel文件路径: Future}），写入前等待加载完成
 
         Returns:
-            处理后的Excel文件路径
+            {Excel文件路径: 更新后的文件路径}，顺序与 file_paths 一致
+
+        Raises:
+            Exception: 任一模板写入失败（其他模板仍会写完）
         """
+        if not isinstance(standardized_data, QuantityMatrix):
+            with self.timer.span("matrix"):
+                standardized_data = QuantityMatrix.from_standardized(standardized_data)
+
+        def write(path: str) -> str:
+            template = None
+            if templates and path in templates:
+                with self.timer.span("excel.prefetch_wait"):
+                    template = templates[path].result()
+            return self.update_excel_file(path, standardized_data, template=template)
+
+        if len(file_paths) == 1:
+            return {file_paths[0]: write(file_paths[0])}
+
+        workers = max_workers or min(len(file_paths), 4)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="excel-writer") as executor:
+            futures = {path: executor.submit(write, path) for path in file_paths}
+
+        outputs = {}
+        errors = []
+        for path, future in futures.items():
+            try:
+                outputs[path] = future.result()
+            except TaskCancelled:
+                raise
+            except Exception as e:
+                errors.append(f"{Path(path).name}: {e}")
+        if errors:
+            raise Exception(f"{len(errors)} 个模板写入失败: {'; '.join(errors)}")
+        return outputs
+
+    def prepare_batch(self, order_file_paths: List[str],
+                      checkpoints: List[Optional[CheckpointStore]],
+                      cancel_token: Optional[CancelToken] = None) -> Tuple[Dict[str, str], Dict[int, str]]:
+        """
+        批量处理的共享商品映射：解析全部订单，合并所有商品名称后只做一次映射
+
+        每个订单的解析结果和共享映射保存到各自的检查点，之后各订单的 process_order
+        从标准化阶段继续，不再单独调用 AI 映射。
+
+        Args:
+            order_file_paths: 订单文件路径
+            checkpoints: 与订单一一对应的检查点
+            cancel_token: 取消令牌
+
+        Returns:
+            (商品映射, {订单序号: 错误信息})，读取或解析失败的订单不参与映射
+
+        Raises:
+            TaskCancelled: 任务被取消
+            TaskTimedOut: 任务超时
+        """
+        self.timer.reset()
+        self._cancel_token = cancel_token
+        total_started = time.perf_counter()
+        count = len(order_file_paths)
+        errors: Dict[int, str] = {}
+        parsed_orders: Dict[int, List[Dict[str, Any]]] = {}
+
         try:
-            # 步骤1: 读取订单数据
-            self._update_progress(0, "开始读取订单数据...")
-            raw_data = self.read_order_data_from_file(order_file_path)
+            self._update_progress(0, f"开始解析 {count} 个订单...")
+            for index, (order_file_path, checkpoint) in enumerate(zip(order_file_paths, checkpoints)):
+                parsed_data = self._load_checkpoint(checkpoint, STAGE_PARSED)
+                if parsed_data is None:
+                    try:
+                        with self._stage("read"):
+                            raw_data = self.read_order_data_from_file(order_file_path)
+                        if not raw_data:
+                            raise Exception("没有读取到订单数据")
+                        with self._stage("parse"):
+                            parsed_data = self.parse_raw_data(raw_data)
+                    except TaskCancelled:
+                        raise
+                    except Exception as e:
+                        errors[index] = str(e)
+                        self._update_progress(-2, f"❌ 订单 {index + 1} 解析失败: {e}", is_detail=True)
+                        continue
+                    self._save_checkpoint(checkpoint, STAGE_PARSED, parsed_data)
+                parsed_orders[index] = parsed_data
+                self._update_progress(-2, f"✅ 订单 {index + 1}: {len(parsed_data)} 个店铺", is_detail=True)
+
+            if not parsed_orders:
+                raise Exception("没有可处理的订单")
+            self._update_progress(
+                40, f"✅ 解析订单: {len(parsed_orders)}/{count} 个，"
+                    f"共 {sum(len(parsed) for parsed in parsed_orders.values())} 个店铺")
+
+            # 合并所有订单后只做一次映射
+            combined = [entry for parsed_data in parsed_orders.values() for entry in parsed_data]
+            if self.mapping_mode == MAPPING_MODE_LOCAL:
+                self._update_progress(50, "🔄 正在进行批量本地商品映射...")
+            else:
+                self._update_progress(50, "🔄 正在调用 AI 进行批量商品映射...")
+            with self._stage("mapping"):
+                product_mapping = self.create_product_mapping(combined)
 
-            if not raw_data:
-                raise Exception("没有读取到订单数据")
+            for index in parsed_orders:
+                self._save_checkpoint(checkpoints[index], STAGE_MAPPING, product_mapping)
 
-            self._update_progress(10, f"✅ 读取订单数据: {len(raw_data)} 个店铺")
+            self.timer.add("total", time.perf_counter() - total_started)
+            self._update_progress(
+                100, f"✅ 批量商品映射完成: {len(product_mapping)} 个商品变体，{len(parsed_orders)} 个订单")
+            return product_mapping, errors
 
-            # 步骤2: 解析原始数据
-            self._update_progress(20, "正在解析数据...")
-            parsed_data = self.parse_raw_data(raw_data)
-            self._update_progress(30, f"✅ 解析数据: {len(parsed_data)} 个店铺")
+        except TaskCancelled as e:
+            self.timer.add("total", time.perf_counter() - total_started)
+            logger.warning(f"批量映射已中止: {e}")
+            raise
+
+        except Exception as e:
+            self.timer.add("total", time.perf_counter() - total_started)
+            if self._cancel_token is not None and self._cancel_token.expired:
+                logger.warning(f"批量映射超时: {e}")
+                raise TaskTimedOut("任务处理超时") from e
+            error_msg = f"批量映射失败: {str(e)}"
+            self._update_progress(-1, f"❌ {error_msg}")
+            raise Exception(error_msg)
+
+        finally:
+            self._cancel_token = None
+            self._progress.flush()
+            self.parse_memo.report_metrics()
+
+    def process_order(self, order_file_path: str, excel_file_path: str,
+                      profile_memory: bool = False,
+                      cancel_token: Optional[CancelToken] = None,
+                      checkpoint: Optional[CheckpointStore] = None,
+                      streaming: bool = False) -> str:
+        """
+        处理订单的主流程（支持进度回调），参数说明见 process_order_multi
+
+        Returns:
+            处理后的Excel文件路径
+        """
+        outputs = self.process_order_multi(order_file_path, [excel_file_path], profile_memory=profile_memory,
+                                           cancel_token=cancel_token, checkpoint=checkpoint, streaming=streaming)
+        return outputs[excel_file_path]
+
+    def process_order_multi(self, order_file_path: str, excel_file_paths: List[str],
+                            profile_memory: bool = False,
+                            cancel_token: Optional[CancelToken] = None,
+                            checkpoint: Optional[CheckpointStore] = None,
+                            streaming: bool = False) -> Dict[str, str]:
+        """
+        处理订单并写入一个或多个 Excel 模板（解析和商品映射只执行一次，各模板并发写入）
+
+        各阶段耗时记录在 timings 属性中（读取、解析、映射、标准化、Excel 写入及其子阶段）。
+        开启 profile_memory 时用 tracemalloc 分析各阶段的内存分配，结果记录在 memory_profile 属性中。
+
+        Args:
+            order_file_path: 订单文件路径
+            excel_file_paths: Excel模板文件路径（可以是不同供应商、不同布局的模板）
+            profile_memory: 是否开启内存分析（处理会明显变慢，仅用于排查）
+            cancel_token: 取消令牌，在阶段之间、循环中和 AI 请求前检查；其截止时间同时作为 AI 请求的超时
+            checkpoint: 阶段检查点；每个阶段完成后保存解析结果、商品映射和标准化数据，
+                重试时从最后完成的阶段继续（已有解析结果时不再读取订单文件）
+            streaming: 是否使用流式处理（见 process_order_stream），用于很大的订单文件
+
+        Returns:
+            {Excel模板文件路径: 处理后的文件路径}
+
+        Raises:
+            TaskCancelled: 任务被取消
+            TaskTimedOut: 任务超时
+        """
+        if streaming:
+            return self.process_order_stream(order_file_path, excel_file_paths, profile_memory=profile_memory,
+                                             cancel_token=cancel_token, checkpoint=checkpoint)
+
+        self.timer.reset()
+        self.memory_profile = None
+        self.quantity_matrix = None
+        self._cancel_token = cancel_token
+        if profile_memory:
+            self._memory_profiler = MemoryProfiler()
+            self._memory_profiler.start()
+        total_started = time.perf_counter()
+        template_loader = None
+
+        try:
+            parsed_data = self._load_checkpoint(checkpoint, STAGE_PARSED)
+            if parsed_data is None:
+                # 步骤1: 读取订单数据
+                self._update_progress(0, "开始读取订单数据...")
+                with self._stage("read"):
+                    raw_data = self.read_order_data_from_file(order_file_path)
+
+                if not raw_data:
+                    raise Exception("没有读取到订单数据")
+
+                self._update_progress(10, f"✅ 读取订单数据: {len(raw_data)} 个店铺")
+
+                # 步骤2: 解析原始数据
+                self._update_progress(20, "正在解析数据...")
+                with self._stage("parse"):
+                    parsed_data = self.parse_raw_data(raw_data)
+                self._save_checkpoint(checkpoint, STAGE_PARSED, parsed_data)
+                self._update_progress(30, f"✅ 解析数据: {len(parsed_data)} 个店铺")
+            else:
+                self._update_progress(30, f"♻️ 使用检查点中的解析数据: {len(parsed_data)} 个店铺")
+
+            # 加载模板：打开工作簿、编译索引并解析店铺列（AI 映射时与等待 AI 响应并行，见 _prefetch_templates）
+            shop_names = [entry['shopName'] for entry in parsed_data]
+            template_loader, templates = self._prefetch_templates(excel_file_paths, shop_names)
 
             # 步骤3: 创建商品映射
-            self._update_progress(40, "🔄 正在调用 AI 进行商品映射...")
-            product_mapping = self.create_product_mapping(parsed_data)
-            self._update_progress(55, f"✅ 创建商品映射: {len(product_mapping)} 个商品变体")
+            product_mapping = self._load_checkpoint(checkpoint, STAGE_MAPPING)
+            if product_mapping is None:
+                if self.mapping_mode == MAPPING_MODE_LOCAL:
+                    self._update_progress(40, "🔄 正在进行本地商品映射...")
+                else:
+                    self._update_progress(40, "🔄 正在调用 AI 进行商品映射...")
+                with self._stage("mapping"):
+                    product_mapping = self.create_product_mapping(parsed_data)
+                self._save_checkpoint(checkpoint, STAGE_MAPPING, product_mapping)
+                self._update_progress(55, f"✅ 创建商品映射: {len(product_mapping)} 个商品变体")
+            else:
+                self._update_progress(55, f"♻️ 使用检查点中的商品映射: {len(product_mapping)} 个商品变体")
 
             # 步骤4: 标准化数据
-            self._update_progress(60, "🔄 正在标准化数据...")
-            standardized_data = self.standardize_data(parsed_data, product_mapping)
-            self._update_progress(75, "✅ 数据标准化完成")
+            standardized_data = self._load_checkpoint(checkpoint, STAGE_STANDARDIZED)
+            if standardized_data is None:
+                self._update_progress(60, "🔄 正在标准化数据...")
+                with self._stage("standardize"):
+                    standardized_data = self.standardize_data(parsed_data, product_mapping)
+                self._save_checkpoint(checkpoint, STAGE_STANDARDIZED, standardized_data)
+                self._update_progress(75, "✅ 数据标准化完成")
+            else:
+                self._update_progress(75, "♻️ 使用检查点中的标准化数据")
+
+            # 汇总为店铺 × 商品矩阵，写入各模板和导出共用
+            with self.timer.span("matrix"):
+                self.quantity_matrix = QuantityMatrix.from_standardized(standardized_data)
 
             # 步骤5: 更新Excel文件
-            self._update_progress(80, "🔄 正在写入 Excel...")
-            output_path = self.update_excel_file(excel_file_path, standardized_data)
+            if len(excel_file_paths) > 1:
+                self._update_progress(80, f"🔄 正在写入 {len(excel_file_paths)} 个 Excel 模板...")
+            else:
+                self._update_progress(80, "🔄 正在写入 Excel...")
+            with self._stage("excel"):
+                outputs = self.update_excel_files(excel_file_paths, self.quantity_matrix, templates=templates)
 
+            self.timer.add("total", time.perf_counter() - total_started)
             self._update_progress(100, "✅ 处理完成！")
-            return output_path
+            return outputs
+
+        except TaskCancelled as e:
+            self.timer.add("total", time.perf_counter() - total_started)
+            logger.warning(f"处理已中止: {e}")
+            raise
 
         except Exception as e:
+            self.timer.add("total", time.perf_counter() - total_started)
+            # 截止时间到达导致的 AI 请求超时等错误按超时处理
+            if self._cancel_token is not None and self._cancel_token.expired:
+                logger.warning(f"处理超时: {e}")
+                raise TaskTimedOut("任务处理超时") from e
             error_msg = f"处理失败: {str(e)}"
             self._update_progress(-1, f"❌ {error_msg}")
             raise Exception(error_msg)
+
+        finally:
+            if template_loader is not None:
+                # 失败或取消时不等待仍在加载的模板
+                template_loader.shutdown(wait=False, cancel_futures=True)
+            self._cancel_token = None
+            self._progress.flush()
+            self.parse_memo.report_metrics()
+            if self._memory_profiler is not None:
+                self.memory_profile = self._memory_profiler.report()
+                self._memory_profiler.stop()
+                self._memory_profiler = None
+
+    def process_order_stream(self, order_file_path: str, excel_file_paths: List[str],
+                             profile_memory: bool = False,
+                             cancel_token: Optional[CancelToken] = None,
+                             checkpoint: Optional[CheckpointStore] = None) -> Dict[str, str]:
+        """
+        流式处理订单：读取、解析和标准化都是逐个店铺的生成器，同一时间只持有当前店铺的订单行
+
+        商品映射需要全部商品名称，因此订单文件读取两遍：
+        第一遍边读边解析，只保留去重后的商品规范名称（和本地解析失败的行）用于映射；
+        第二遍边读边解析、标准化，每个店铺的结果直接累加到店铺 × 商品矩阵后丢弃。
+
+        内存上限：读取缓冲区（ORDER_READ_BUFFER）+ 当前店铺的订单行 + 不同商品名称的写法数
+        + 非零的 (店铺, 商品) 单元格数（矩阵本身为 商品数 × 店铺数）。
+        与订单行数、数量的写法无关，但仍随店铺数和商品名称的写法数增长。
+        不保存解析结果和标准化数据的检查点（只保存商品映射），重试时重新读取订单文件。
+
+        Args:
+            order_file_path: 订单文件路径
+            excel_file_paths: Excel模板文件路径
+            profile_memory: 是否开启内存分析
+            cancel_token: 取消令牌
+            checkpoint: 阶段检查点（只使用商品映射）
+
+        Returns:
+            {Excel模板文件路径: 处理后的文件路径}
+
+        Raises:
+            TaskCancelled: 任务被取消
+            TaskTimedOut: 任务超时
+        """
+        self.timer.reset()
+        self.memory_profile = None
+        self.quantity_matrix = None
+        self._cancel_token = cancel_token
+        if profile_memory:
+            self._memory_profiler = MemoryProfiler()
+            self._memory_profiler.start()
+        total_started = time.perf_counter()
+        template_loader = None
+
+        def parsed_shops() -> Iterator[Dict[str, Any]]:
+            for entry in self.iter_parse_raw_data(self.iter_order_data_from_file(order_file_path)):
+                self._checkpoint()
+                yield entry
+
+        try:
+            # 加载模板（AI 映射时与订单扫描、商品映射并行，见 _prefetch_templates；店铺列在写入时解析）
+            template_loader, templates = self._prefetch_templates(excel_file_paths)
+
+            product_mapping = self._load_checkpoint(checkpoint, STAGE_MAPPING)
+            if product_mapping is None:
+                # 步骤1: 流式扫描订单，逐个店铺提取商品规范名称（不保留订单行）
+                self._update_progress(0, "开始流式读取订单数据...")
+                shop_count = 0
+
+                def counted_shops() -> Iterator[Dict[str, Any]]:
+                    nonlocal shop_count
+                    for entry in parsed_shops():
+                        shop_count += 1
+                        yield entry
+
+                with self._stage("scan"):
+                    variants = self.extract_all_product_variants(
+                        counted_shops(), use_ai_fallback=self.mapping_mode != MAPPING_MODE_LOCAL)
+
+                if not shop_count:
+                    raise Exception("没有读取到订单数据")
+                self._update_progress(30, f"✅ 扫描订单数据: {shop_count} 个店铺，{len(variants)} 种商品名称")
+
+                # 步骤2: 创建商品映射（只需要商品名称，不需要店铺）
+                if self.mapping_mode == MAPPING_MODE_LOCAL:
+                    self._update_progress(40, "🔄 正在进行本地商品映射...")
+                else:
+                    self._update_progress(40, "🔄 正在调用 AI 进行商品映射...")
+                with self._stage("mapping"):
+                    product_mapping = self.create_product_mapping([], variants)
+                del variants
+                self._save_checkpoint(checkpoint, STAGE_MAPPING, product_mapping)
+                self._update_progress(55, f"✅ 创建商品映射: {len(product_mapping)} 个商品变体")
+            else:
+                self._update_progress(55, f"♻️ 使用检查点中的商品映射: {len(product_mapping)} 个商品变体")
+
+            # 步骤3: 再次流式读取，标准化后直接累加到店铺 × 商品矩阵
+            self._update_progress(60, "🔄 正在流式标准化数据...")
+            with self._stage("standardize"):
+                self.quantity_matrix = QuantityMatrix.from_standardized(
+                    self.iter_standardize_data(parsed_shops(), product_mapping))
+            if not self.quantity_matrix.shops:
+                raise Exception("没有读取到订单数据")
+            self._update_progress(75, f"✅ 数据标准化完成: {len(self.quantity_matrix.shops)} 个店铺")
+
+            # 步骤4: 更新Excel文件
+            if len(excel_file_paths) > 1:
+                self._update_progress(80, f"🔄 正在写入 {len(excel_file_paths)} 个 Excel 模板...")
+            else:
+                self._update_progress(80, "🔄 正在写入 Excel...")
+            with self._stage("excel"):
+                outputs = self.update_excel_files(excel_file_paths, self.quantity_matrix, templates=templates)
+
+            self.timer.add("total", time.perf_counter() - total_started)
+            self._update_progress(100, "✅ 处理完成！")
+            return outputs
+
+        except TaskCancelled as e:
+            self.timer.add("total", time.perf_counter() - total_started)
+            logger.warning(f"处理已中止: {e}")
+            raise
+
+        except Exception as e:
+            self.timer.add("total", time.perf_counter() - total_started)
+            if self._cancel_token is not None and self._cancel_token.expired:
+                logger.warning(f"处理超时: {e}")
+                raise TaskTimedOut("任务处理超时") from e
+            error_msg = f"处理失败: {str(e)}"
+            self._update_progress(-1, f"❌ {error_msg}")
+            raise Exception(error_msg)
+
+        finally:
+            if template_loader is not None:
+                template_loader.shutdown(wait=False, cancel_futures=True)
+            self._cancel_token = None
+            self._progress.flush()
+            self.parse_memo.report_metrics()
+            if self._memory_profiler is not None:
+                self.memory_profile = self._memory_profiler.report()
+                self._memory_profiler.stop()
+                self._memory_profiler = None
@@ -0,0 +1,84 @@
+import time
+import threading
+from typing import Callable, List, Optional
+
+# 详细日志的进度值（与进度回调约定一致）
+PROGRESS_DETAIL = -2
+
+# 默认合并策略：最多缓存 100ms 或 50 条详细日志
+DEFAULT_FLUSH_INTERVAL = 0.1
+DEFAULT_MAX_BATCH = 50
+
+
+class ProgressEmitter:
+    """
+    进度事件发送器：合并详细日志，百分比进度立即发送
+
+    详细日志（percent=-2）先缓存，超过 flush_interval 秒或累计 max_batch 条时合并成一次回调，
+    多条消息用换行连接。百分比进度（包括 100 和 -1）从不丢弃，发送前会先把缓存的详细日志发出，
+    保证顺序不变。关闭 detail_logs 后详细日志直接丢弃。
+    """
+
+    def __init__(self, callback: Optional[Callable[[int, str], None]],
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_batch: int = DEFAULT_MAX_BATCH,
+                 detail_logs: bool = True):
+        """
+        Args:
+            callback: 接收 (percent, message) 的回调
+            flush_interval: 详细日志最长缓存时间（秒）
+            max_batch: 详细日志最多缓存条数
+            detail_logs: 是否发送详细日志
+        """
+        self.callback = callback
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.detail_logs = detail_logs
+        self._buffer: List[str] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def detail(self, message: str):
+        """
+        发送一条详细日志（可能被缓存）
+
+        Args:
+            message: 日志内容
+        """
+        if not self.detail_logs or self.callback is None:
+            return
+        with self._lock:
+            self._buffer.append(message)
+            if len(self._buffer) < self.max_batch and time.monotonic() - self._last_flush < self.flush_interval:
+                return
+            batch = self._take()
+        self._send(PROGRESS_DETAIL, batch)
+
+    def progress(self, percent: int, message: str):
+        """
+        发送百分比进度（先发出缓存的详细日志）
+
+        Args:
+            percent: 进度百分比，-1 表示失败
+            message: 消息内容
+        """
+        self.flush()
+        self._send(percent, message)
+
+    def flush(self):
+        """立即发出缓存的详细日志"""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._send(PROGRESS_DETAIL, batch)
+
+    def _take(self) -> str:
+        batch = "\n".join(self._buffer)
+        self._buffer.clear()
+        self._last_flush = time.monotonic()
+        return batch
+
+    def _send(self, percent: int, message: str):
+        if self.callback is None:
+            return
+        self.callback(percent, message)
@@ -0,0 +1,156 @@
+"""
+店铺 × 标准商品数量矩阵
+
+标准化后的订单汇总为一个整数矩阵（行为标准商品，列为店铺，与模板布局一致）：
+同一店铺同一商品的多行数量累加，而不是后一行覆盖前一行。
+同一个矩阵可以写入 Excel 模板、导出 CSV / Parquet，也可以直接得到跨店铺的合计。
+"""
+
+from array import array
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+class QuantityMatrix:
+    """店铺 × 标准商品的数量矩阵"""
+
+    def __init__(self, shops: List[str], products: List[str], values: Optional[np.ndarray] = None):
+        """
+        Args:
+            shops: 店铺名称（列，按订单中首次出现的顺序）
+            products: 标准商品名称（行，按订单中首次出现的顺序）
+            values: 数量矩阵，形状为 (商品数, 店铺数)；为空时创建全零矩阵
+        """
+        self.shops = list(shops)
+        self.products = list(products)
+        self._shop_index = {name: i for i, name in enumerate(self.shops)}
+        self._product_index = {name: i for i, name in enumerate(self.products)}
+        if values is None:
+            values = np.zeros((len(self.products), len(self.shops)), dtype=np.int64)
+        if values.shape != (len(self.products), len(self.shops)):
+            raise ValueError(f"矩阵形状 {values.shape} 与商品数、店铺数不一致")
+        self.values = values
+
+    @classmethod
+    def from_standardized(cls, standardized_data: Iterable[Dict[str, Any]]) -> "QuantityMatrix":
+        """
+        由 standardize_data 的结果构建矩阵（同一店铺出现多次时数量累加）
+
+        可以直接接 iter_standardize_data 的生成器：每个店铺只追加 (商品下标, 店铺下标, 数量)
+        到三个紧凑的整数数组，占用与非零单元格数成正比，不保留店铺数据本身。
+
+        Args:
+            standardized_data: {'shopName': 店铺名称, 'products': {标准商品名称: 数量}} 的可迭代对象
+
+        Returns:
+            数量矩阵
+        """
+        shops: Dict[str, int] = {}
+        products: Dict[str, int] = {}
+        rows, cols, quantities = array('q'), array('q'), array('q')
+        for entry in standardized_data:
+            shop_idx = shops.setdefault(entry['shopName'], len(shops))
+            shop_products = entry['products']
+            rows.extend([products.setdefault(name, len(products)) for name in shop_products])
+            cols.extend(repeat(shop_idx, len(shop_products)))
+            quantities.extend(shop_products.values())
+
+        matrix = cls(list(shops), list(products))
+        if quantities:
+            # np.add.at 对重复下标累加
+            np.add.at(matrix.values, (np.frombuffer(rows, dtype=np.int64), np.frombuffer(cols, dtype=np.int64)),
+                      np.frombuffer(quantities, dtype=np.int64))
+        return matrix
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(商品数, 店铺数)"""
+        return self.values.shape
+
+    def get(self, shop_name: str, product_name: str) -> int:
+        """某店铺某商品的数量（不存在时为 0）"""
+        shop_idx = self._shop_index.get(shop_name)
+        product_idx = self._product_index.get(product_name)
+        if shop_idx is None or product_idx is None:
+            return 0
+        return int(self.values[product_idx, shop_idx])
+
+    def nonzero(self) -> Iterator[Tuple[int, int, int]]:
+        """
+        非零单元格（按商品、店铺顺序）
+
+        Returns:
+            (商品下标, 店铺下标, 数量) 的迭代器
+        """
+        product_idx, shop_idx = np.nonzero(self.values)
+        for i, j in zip(product_idx.tolist(), shop_idx.tolist()):
+            yield i, j, int(self.values[i, j])
+
+    def shop_totals(self) -> Dict[str, int]:
+        """各店铺的商品总数"""
+        return dict(zip(self.shops, self.values.sum(axis=0).tolist()))
+
+    def product_totals(self) -> Dict[str, int]:
+        """各商品在所有店铺的合计（如采购总量）"""
+        return dict(zip(self.products, self.values.sum(axis=1).tolist()))
+
+    def total(self) -> int:
+        """全部数量合计"""
+        return int(self.values.sum())
+
+    def to_dataframe(self):
+        """
+        转为 pandas DataFrame（行为商品，列为店铺）
+
+        Returns:
+            pandas.DataFrame
+        """
+        import pandas as pd
+        return pd.DataFrame(self.values, index=pd.Index(self.products, name="商品名称"), columns=self.shops)
+
+    def to_csv(self, path: Union[str, Path], with_totals: bool = True) -> Path:
+        """
+        导出 CSV（UTF-8 BOM，Excel 可直接打开）
+
+        Args:
+            path: 输出路径
+            with_totals: 是否追加合计行和合计列
+
+        Returns:
+            输出路径
+        """
+        frame = self.to_dataframe()
+        if with_totals:
+            frame["合计"] = frame.sum(axis=1)
+            frame.loc["合计"] = frame.sum(axis=0)
+        frame.to_csv(path, encoding="utf-8-sig")
+        return Path(path)
+
+    def to_parquet(self, path: Union[str, Path]) -> Path:
+        """
+        导出 Parquet（长表：店铺、商品名称、数量，只包含非零单元格）
+
+        需要安装 pyarrow 或 fastparquet。
+
+        Args:
+            path: 输出路径
+
+        Returns:
+            输出路径
+        """
+        import pandas as pd
+        rows = [(self.shops[j], self.products[i], quantity) for i, j, quantity in self.nonzero()]
+        pd.DataFrame(rows, columns=["shop", "product", "quantity"]).to_parquet(path, index=False)
+        return Path(path)
+
+    def export(self, path: Union[str, Path]) -> Path:
+        """按扩展名导出（.csv / .parquet）"""
+        suffix = Path(path).suffix.lower()
+        if suffix == ".csv":
+            return self.to_csv(path)
+        if suffix == ".parquet":
+            return self.to_parquet(path)
+        raise ValueError(f"不支持的导出格式: {suffix}（可选: .csv, .parquet）")
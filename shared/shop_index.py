@@ -0,0 +1,274 @@
+"""
+店铺 → 模板列的解析索引
+
+每个模板编译一次，依次尝试：
+
+1. 精确匹配：清理后的店铺名与表头相同，或在别名表中（别名 → 表头店铺名，按部署配置）
+2. 子串匹配：店铺名包含表头，或表头包含店铺名（按列顺序取第一个，与原逐列比较一致）；
+   表头编译为 Aho-Corasick 自动机，店铺名只扫描一遍
+3. 错别字（max_distance > 0 时启用，默认 1）：城市前缀（前两个字）完全相同，去掉末尾的 "店" 后
+   与表头的编辑距离（替换、多字、少字各算一处）不超过阈值（同时不超过店铺名长度的 1/3），
+   用于店名部分的错别字（如 "岳阳金颚" → 岳阳金鹗店、"长沙五一广店" → 长沙五一广场店）。
+   不同城市的同名门店（如 永州舜德 与 郴州舜德店）、同城的其他门店（如 郴州广场店 与 郴州购广）
+   都不匹配；最近的表头不唯一时视为找不到，避免写错列
+4. 关键词：店铺名和表头包含同一关键词（如 "五江"）。只用于同城没有相近表头的店铺：
+   存在相近表头（编辑距离 1 以内）而错别字匹配未启用或不唯一时视为找不到，
+   不按城市关键词写到同城的其他门店（如 岳阳金颚 不写到 岳阳梅溪湖店）
+
+结果按店铺名缓存，同一店铺只解析一次。
+"""
+
+import json
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from shared.aho_corasick import AhoCorasick
+
+logger = logging.getLogger(__name__)
+
+# 店铺名与表头无法直接匹配时使用的关键词（两边都包含同一关键词即视为同一店铺）
+SHOP_KEYWORDS = ('五江', '金海', '洋湖', '砂之船', '邵阳', '岳阳')
+
+# 近似匹配允许的最大编辑距离（同时不超过店铺名长度的 1/3）；0 表示不做近似匹配
+DEFAULT_MAX_DISTANCE = 1
+
+# 存在编辑距离不超过该值的同城表头时，不再按关键词匹配
+NEAR_HEADER_DISTANCE = 1
+
+# 近似匹配时必须完全相同的城市前缀长度（店铺名以城市开头，如 "郴州"、"永州"）
+CITY_PREFIX_LENGTH = 2
+
+# 拼接表头时的分隔符（不会出现在店铺名中）
+_SEPARATOR = '\x00'
+
+MATCH_EXACT = "exact"
+MATCH_ALIAS = "alias"
+MATCH_SUBSTRING = "substring"
+MATCH_KEYWORD = "keyword"
+MATCH_FUZZY = "fuzzy"
+
+
+def clean_shop_name(shop_name: str) -> str:
+    """去除店铺名末尾的冒号等符号"""
+    return shop_name.rstrip('：:').strip()
+
+
+def _fuzzy_key(shop_name: str) -> str:
+    """近似匹配时比较的部分：去掉末尾的 "店"（"郴州舜德" 与 "郴州舜德店" 视为等长）"""
+    return shop_name[:-1] if shop_name.endswith('店') else shop_name
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    a 与 b 的编辑距离（替换、插入、删除各算 1），超过 limit 时提前返回 limit + 1
+
+    Args:
+        a: 字符串
+        b: 字符串
+        limit: 关心的最大距离
+
+    Returns:
+        编辑距离，超过 limit 时为 limit + 1
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+def load_shop_aliases(path: Union[str, Path]) -> Dict[str, str]:
+    """
+    读取店铺别名文件
+
+    文件为 JSON：{"表头店铺名": ["别名1", "别名2"]}
+
+    Args:
+        path: 别名文件路径
+
+    Returns:
+        {别名: 表头店铺名}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    aliases = {}
+    for header, names in data.items():
+        for name in ([names] if isinstance(names, str) else names):
+            aliases[name] = header
+    return aliases
+
+
+@dataclass
+class ShopMatchConfig:
+    """店铺匹配配置（按部署配置，所有模板共用）"""
+    aliases: Dict[str, str] = field(default_factory=dict)
+    keywords: Tuple[str, ...] = SHOP_KEYWORDS
+    max_distance: int = DEFAULT_MAX_DISTANCE
+
+
+class ShopMatch(NamedTuple):
+    """店铺的解析结果"""
+    column: Optional[int]
+    header: Optional[str]
+    method: Optional[str]
+
+
+class ShopIndex:
+    """一个模板的店铺列解析索引"""
+
+    def __init__(self, shop_columns: Dict[str, int], aliases: Optional[Dict[str, str]] = None,
+                 keywords: Iterable[str] = SHOP_KEYWORDS, max_distance: int = DEFAULT_MAX_DISTANCE):
+        """
+        Args:
+            shop_columns: {表头店铺名: 列号}（按列顺序）
+            aliases: {店铺别名: 表头店铺名}，指向模板中不存在的表头的别名被忽略
+            keywords: 关键词列表
+            max_distance: 近似匹配允许的最大编辑距离（0 表示不做近似匹配）
+        """
+        self.shop_columns = shop_columns
+        self.max_distance = max_distance
+        self._headers: List[str] = [str(header) for header in shop_columns]
+        self._columns: List[int] = list(shop_columns.values())
+
+        # 精确匹配：表头本身和别名
+        self._exact: Dict[str, int] = {}
+        for order, header in enumerate(self._headers):
+            self._exact.setdefault(header, order)
+        self._aliases: Dict[str, int] = {}
+        for alias, header in (aliases or {}).items():
+            order = self._exact.get(str(header))
+            if order is not None:
+                self._aliases[clean_shop_name(alias)] = order
+
+        # 子串匹配：店铺名包含表头用自动机，表头包含店铺名在拼接的表头中查找
+        self._header_automaton = AhoCorasick(self._headers)
+        self._pattern_order = [self._exact[pattern] for pattern in self._header_automaton.patterns]
+        self._joined = _SEPARATOR.join(self._headers)
+        self._offsets: List[int] = []
+        offset = 0
+        for header in self._headers:
+            self._offsets.append(offset)
+            offset += len(header) + 1
+
+        # 关键词 → 第一个包含该关键词的表头
+        self._keyword_automaton = AhoCorasick(keywords)
+        self._keyword_order: List[Optional[int]] = [
+            next((order for order, header in enumerate(self._headers) if keyword in header), None)
+            for keyword in self._keyword_automaton.patterns
+        ]
+
+        # 近似匹配：城市前缀 → [(表头序号, 比较部分)]
+        self._fuzzy_candidates: Dict[str, List[Tuple[int, str]]] = {}
+        for order, header in enumerate(self._headers):
+            key = _fuzzy_key(header)
+            if len(key) > CITY_PREFIX_LENGTH:
+                self._fuzzy_candidates.setdefault(key[:CITY_PREFIX_LENGTH], []).append((order, key))
+
+        self._cache: Dict[str, ShopMatch] = {}
+
+    @classmethod
+    def from_config(cls, shop_columns: Dict[str, int], config: Optional[ShopMatchConfig] = None) -> "ShopIndex":
+        """按匹配配置创建索引（配置为空时使用默认关键词、不使用别名）"""
+        config = config or ShopMatchConfig()
+        return cls(shop_columns, aliases=config.aliases, keywords=config.keywords,
+                   max_distance=config.max_distance)
+
+    def _result(self, order: Optional[int], method: Optional[str]) -> ShopMatch:
+        if order is None:
+            return ShopMatch(None, None, None)
+        return ShopMatch(self._columns[order], self._headers[order], method)
+
+    def _header_containing(self, clean_name: str) -> Optional[int]:
+        """第一个包含店铺名的表头"""
+        position = self._joined.find(clean_name)
+        while position >= 0:
+            order = bisect_right(self._offsets, position) - 1
+            # 跨越分隔符的位置不算（店铺名不含分隔符时不会发生）
+            if position + len(clean_name) <= self._offsets[order] + len(self._headers[order]):
+                return order
+            position = self._joined.find(clean_name, position + 1)
+        return None
+
+    def _nearest(self, clean_name: str, limit: int) -> List[int]:
+        """城市前缀相同、编辑距离最小且不超过 limit 的表头（可能有多个）"""
+        key = _fuzzy_key(clean_name)
+        limit = min(limit, len(key) // 3)
+        if limit < 1 or len(key) <= CITY_PREFIX_LENGTH:
+            return []
+
+        best_distance, best_orders = limit + 1, []
+        for order, header_key in self._fuzzy_candidates.get(key[:CITY_PREFIX_LENGTH], ()):
+            distance = _edit_distance(key[CITY_PREFIX_LENGTH:], header_key[CITY_PREFIX_LENGTH:], limit)
+            if distance < best_distance:
+                best_distance, best_orders = distance, [order]
+            elif distance == best_distance and distance <= limit:
+                best_orders.append(order)
+        return best_orders
+
+    def _fuzzy(self, clean_name: str) -> Optional[int]:
+        """城市前缀相同、编辑距离最小的唯一表头"""
+        best_orders = self._nearest(clean_name, self.max_distance)
+        if len(best_orders) > 1:
+            logger.info(f"店铺 '{clean_name}' 近似匹配到多个表头，不做匹配: {[self._headers[o] for o in best_orders]}")
+            return None
+        return best_orders[0] if best_orders else None
+
+    def _has_near_header(self, clean_name: str) -> bool:
+        """是否存在相近的同城表头（此时不按关键词匹配）"""
+        near = self._nearest(clean_name, NEAR_HEADER_DISTANCE)
+        if near:
+            logger.info(f"店铺 '{clean_name}' 与表头 {[self._headers[o] for o in near]} 相近，不按关键词匹配")
+        return bool(near)
+
+    def match(self, shop_name: str) -> ShopMatch:
+        """
+        解析店铺对应的列
+
+        Args:
+            shop_name: 订单中的店铺名称
+
+        Returns:
+            解析结果（找不到时 column 为 None）
+        """
+        clean_name = clean_shop_name(shop_name)
+        cached = self._cache.get(clean_name)
+        if cached is not None:
+            return cached
+
+        order = self._exact.get(clean_name)
+        method = MATCH_EXACT
+        if order is None:
+            order = self._aliases.get(clean_name)
+            method = MATCH_ALIAS
+        if order is None:
+            candidates = [self._pattern_order[index] for index in self._header_automaton.find_all(clean_name)]
+            containing = self._header_containing(clean_name)
+            if containing is not None:
+                candidates.append(containing)
+            order = min(candidates) if candidates else None
+            method = MATCH_SUBSTRING
+        if order is None and self.max_distance > 0:
+            order = self._fuzzy(clean_name)
+            method = MATCH_FUZZY
+        if order is None and not self._has_near_header(clean_name):
+            candidates = [self._keyword_order[index] for index in self._keyword_automaton.find_all(clean_name)]
+            candidates = [candidate for candidate in candidates if candidate is not None]
+            order = min(candidates) if candidates else None
+            method = MATCH_KEYWORD
+
+        result = self._result(order, method)
+        self._cache[clean_name] = result
+        return result
+
+    def find_column(self, shop_name: str) -> Optional[int]:
+        """店铺对应的列号，找不到时返回 None"""
+        return self.match(shop_name).column
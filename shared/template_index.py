@@ -0,0 +1,202 @@
+"""
+Excel 模板索引
+
+模板加载后一次扫描表头行和商品名称列，编译出 店铺 → 列、商品 → 行 的索引，
+写入时不再对每个商品重新扫描整列：
+
+- 店铺列：见 shared/shop_index.py（精确 / 别名、子串、关键词、错别字）
+- 商品行：所有标准商品名编译为一个 Aho-Corasick 自动机，商品名称列每个单元格只扫描一遍，
+  得到 商品 → 行 的表。单元格中同时出现多个商品名时（如 "手打牛肉丸" 中的
+  "牛肉丸"），该行归最长的商品名（等长时取先出现的）；某个商品名不是任何一行的最长匹配时，
+  退回第一个名称中包含它的行（与原逐行查找一致）。
+  每次加载模板仍会扫描商品名称列，编译出的表按 (商品名称列的内容, 商品名列表) 在进程内跨任务缓存：
+  每个任务加载的是模板的副本（路径各不相同），按内容作键，同一模板的后续任务不再重新编译自动机，
+  模板被修改后也不会用到旧的表
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from shared.aho_corasick import AhoCorasick
+from shared.shop_index import ShopIndex, ShopMatch, ShopMatchConfig
+
+# 模板布局：第 2 行为表头（店铺名称），第 3 列为商品名称，数据从第 3 行开始
+HEADER_ROW = 2
+PRODUCT_NAME_COLUMN = 3
+DATA_START_ROW = 3
+
+# 表头中不是店铺的列
+NON_SHOP_HEADERS = ('序号', '商品编码', '商品名称', '规格', '入库价', '售价', '前台毛利', '供应商编码', '供应商名称')
+
+# 跨任务缓存的 商品 → 行 表的个数（每个 (模板内容, 商品名列表) 一个）
+PRODUCT_TABLE_CACHE_SIZE = 32
+
+
+@lru_cache(maxsize=PRODUCT_TABLE_CACHE_SIZE)
+def _build_product_table(product_rows: Tuple[Tuple[int, str], ...],
+                         product_names: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Dict[str, Optional[int]]]:
+    """
+    把商品名编译为自动机，扫描一遍商品名称列得到 商品 → 行 的表（结果共享，调用方不能修改）
+
+    Args:
+        product_rows: ((行号, 商品名称), ...)
+        product_names: 商品名称（非空）
+
+    Returns:
+        (去重后的商品名, {商品名: 行号})
+    """
+    automaton = AhoCorasick(product_names)
+    patterns = automaton.patterns
+
+    longest_rows: Dict[int, int] = {}
+    first_rows: Dict[int, int] = {}
+    for row, cell_name in product_rows:
+        longest = None
+        for _, pattern_index in automaton.iter_matches(cell_name):
+            first_rows.setdefault(pattern_index, row)
+            if longest is None or len(patterns[pattern_index]) > len(patterns[longest]):
+                longest = pattern_index
+        if longest is not None:
+            longest_rows.setdefault(longest, row)
+
+    table = {
+        pattern: longest_rows.get(pattern_index, first_rows.get(pattern_index))
+        for pattern_index, pattern in enumerate(patterns)
+    }
+    return tuple(patterns), table
+
+
+class TemplateIndex:
+    """一个 Excel 模板的店铺列索引和商品行索引"""
+
+    def __init__(self, shop_columns: Dict[str, int], product_rows: List[Tuple[int, str]],
+                 shop_match: Optional[ShopMatchConfig] = None, product_names: Iterable[str] = ()):
+        """
+        Args:
+            shop_columns: {表头店铺名: 列号}（按列顺序，1 基）
+            product_rows: [(行号, 商品名称)]（按行顺序，1 基）
+            shop_match: 店铺匹配配置（别名、关键词、错别字）
+            product_names: 标准商品名称（预先编译商品行表，其他商品名在首次查找时补充）
+        """
+        self.shop_columns = shop_columns
+        self.product_rows = product_rows
+        self.shop_index = ShopIndex.from_config(shop_columns, shop_match)
+        self._product_names: List[str] = []
+        self._product_table: Dict[str, Optional[int]] = {}
+        self._compile_products(product_names)
+
+    @classmethod
+    def from_worksheet(cls, worksheet, shop_match: Optional[ShopMatchConfig] = None,
+                       product_names: Iterable[str] = ()) -> "TemplateIndex":
+        """
+        扫描工作表编译索引
+
+        Args:
+            worksheet: openpyxl 工作表
+            shop_match: 店铺匹配配置
+            product_names: 标准商品名称
+
+        Returns:
+            模板索引
+        """
+        shop_columns = {}
+        header = next(worksheet.iter_rows(min_row=HEADER_ROW, max_row=HEADER_ROW, values_only=True), ())
+        for col, col_name in enumerate(header, start=1):
+            if col_name and col_name not in NON_SHOP_HEADERS:
+                shop_columns[col_name] = col
+
+        product_rows = []
+        for row, (cell_value,) in enumerate(
+                worksheet.iter_rows(min_row=DATA_START_ROW, min_col=PRODUCT_NAME_COLUMN,
+                                    max_col=PRODUCT_NAME_COLUMN, values_only=True),
+                start=DATA_START_ROW):
+            if cell_value:
+                product_rows.append((row, str(cell_value)))
+
+        return cls(shop_columns, product_rows, shop_match, product_names)
+
+    def find_shop_column(self, shop_name: str) -> Optional[int]:
+        """
+        查找店铺对应的列
+
+        Args:
+            shop_name: 订单中的店铺名称
+
+        Returns:
+            列号，找不到时返回 None
+        """
+        return self.shop_index.find_column(shop_name)
+
+    def match_shop(self, shop_name: str) -> ShopMatch:
+        """查找店铺对应的列，并返回匹配到的表头和匹配方式"""
+        return self.shop_index.match(shop_name)
+
+    def _compile_products(self, product_names: Iterable[str]):
+        """把商品名并入自动机，重新扫描一遍商品名称列得到 商品 → 行 的表（相同内容的模板共用缓存）"""
+        names = tuple(self._product_names) + tuple(name for name in product_names if name)
+        patterns, table = _build_product_table(tuple(self.product_rows), names)
+        self._product_names = list(patterns)
+        self._product_table = dict(table)
+
+    def find_product_rows(self, product_names: Iterable[str]) -> List[Optional[int]]:
+        """
+        批量查找商品所在的行（商品名不在已编译的表中时一起补充，只重新扫描一遍）
+
+        Args:
+            product_names: 商品名称
+
+        Returns:
+            与 product_names 一一对应的行号，找不到时为 None
+        """
+        product_names = list(product_names)
+        missing = [name for name in dict.fromkeys(product_names) if name and name not in self._product_table]
+        if missing:
+            self._compile_products(missing)
+        return [self._product_table.get(name) for name in product_names]
+
+    def find_product_row(self, product_name: str) -> Optional[int]:
+        """
+        查找商品所在的行
+
+        Args:
+            product_name: 商品名称
+
+        Returns:
+            行号，找不到时返回 None
+        """
+        return self.find_product_rows([product_name])[0]
+
+
+@dataclass
+class LoadedTemplate:
+    """已加载的模板：工作簿、活动工作表及其索引"""
+    workbook: Any
+    worksheet: Any
+    index: TemplateIndex
+
+
+def load_template(file_path: str, shop_names: Iterable[str] = (),
+                  shop_match: Optional[ShopMatchConfig] = None,
+                  product_names: Iterable[str] = ()) -> LoadedTemplate:
+    """
+    加载模板并编译索引，预先解析已知店铺的列
+
+    Args:
+        file_path: Excel文件路径
+        shop_names: 订单中的店铺名称（解析结果缓存在索引中）
+        shop_match: 店铺匹配配置
+        product_names: 标准商品名称（预先编译商品行表）
+
+    Returns:
+        已加载的模板
+    """
+    from openpyxl import load_workbook
+
+    # 使用openpyxl加载工作簿以保持格式
+    workbook = load_workbook(file_path)
+    worksheet = workbook.active
+    index = TemplateIndex.from_worksheet(worksheet, shop_match, product_names)
+    for shop_name in shop_names:
+        index.find_shop_column(shop_name)
+    return LoadedTemplate(workbook=workbook, worksheet=worksheet, index=index)
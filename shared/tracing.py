@@ -0,0 +1,199 @@
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+
+class StageTimer:
+    """
+    轻量的阶段计时器
+
+    用 span(name) 包住一段代码即可记录耗时；同名 span 多次出现时累加。
+    名称用 "." 表示层级，如 "mapping.network" 是 "mapping" 的子阶段。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+
+    def reset(self):
+        """清空已记录的耗时"""
+        with self._lock:
+            self._durations.clear()
+            self._counts.clear()
+
+    def add(self, name: str, seconds: float):
+        """
+        记录一段耗时
+
+        Args:
+            name: 阶段名称
+            seconds: 耗时（秒）
+        """
+        with self._lock:
+            self._durations[name] = self._durations.get(name, 0.0) + seconds
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """
+        计时上下文，退出时（包括异常退出）记录耗时
+
+        Args:
+            name: 阶段名称
+        """
+        # 进入时先占位，保证父阶段排在子阶段之前
+        with self._lock:
+            self._durations.setdefault(name, 0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def as_dict(self) -> Dict[str, float]:
+        """
+        导出各阶段耗时（秒，保留 4 位小数），按首次记录的顺序排列
+
+        Returns:
+            {阶段名称: 耗时}
+        """
+        with self._lock:
+            return {name: round(seconds, 4) for name, seconds in self._durations.items()}
+
+    def counts(self) -> Dict[str, int]:
+        """各阶段记录的次数"""
+        with self._lock:
+            return dict(self._counts)
+
+
+class MemoryProfiler:
+    """
+    基于 tracemalloc 的分阶段内存分析（按需开启，有明显的性能开销）
+
+    每个阶段开始和结束时各取一次快照，记录阶段内的净分配、峰值以及分配最多的代码位置。
+    tracemalloc 是进程级的：同一进程中并发运行的其他任务的分配也会计入，
+    分析时最好只运行一个任务。阶段不能嵌套（峰值在每个阶段开始时重置）。
+    """
+
+    def __init__(self, top_n: int = 10):
+        """
+        Args:
+            top_n: 每个阶段保留的分配位置数量
+        """
+        self.top_n = top_n
+        self._stages: List[Dict[str, Any]] = []
+        self._started_tracing = False
+        self._overall_peak = 0
+
+    def start(self):
+        """开始追踪内存分配（如果外部已经在追踪，则沿用）"""
+        self._stages = []
+        self._overall_peak = 0
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        """停止追踪（只停止由本对象开启的追踪）"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        分析一个阶段，退出时（包括异常退出）记录结果
+
+        Args:
+            name: 阶段名称
+        """
+        if not tracemalloc.is_tracing():
+            yield
+            return
+
+        before = self._snapshot()
+        current_before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            current_after, peak = tracemalloc.get_traced_memory()
+            after = self._snapshot()
+            top = [
+                {
+                    "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_diff": stat.size_diff,
+                    "count_diff": stat.count_diff
+                }
+                for stat in after.compare_to(before, "lineno")[:self.top_n]
+                if stat.size_diff > 0
+            ]
+            self._overall_peak = max(self._overall_peak, peak)
+            self._stages.append({
+                "stage": name,
+                "net_bytes": current_after - current_before,
+                "peak_bytes": peak - current_before,
+                "current_bytes": current_after,
+                "top": top
+            })
+
+    def report(self) -> Dict[str, Any]:
+        """
+        导出分析结果
+
+        Returns:
+            {"stages": [...], "peak_bytes": 整个过程中的最高占用}
+        """
+        return {"stages": list(self._stages), "peak_bytes": self._overall_peak}
+
+
+def format_memory_profile(report: Dict[str, Any], top_n: int = 3) -> str:
+    """
+    把内存分析结果格式化为便于阅读的多行文本
+
+    Args:
+        report: MemoryProfiler.report() 的结果
+        top_n: 每个阶段显示的分配位置数量
+
+    Returns:
+        格式化后的文本
+    """
+    def mb(size: int) -> str:
+        return f"{size / 1024 / 1024:>9.2f} MB"
+
+    lines = [f"{'阶段':<14}{'净分配':>14}{'峰值':>14}"]
+    for stage in report.get("stages", []):
+        lines.append(f"{stage['stage']:<16}{mb(stage['net_bytes'])}{mb(stage['peak_bytes'])}")
+        for site in stage["top"][:top_n]:
+            lines.append(f"    {mb(site['size_diff'])}  {site['site']}")
+    lines.append(f"{'最高占用':<14}{mb(report.get('peak_bytes', 0))}")
+    return "\n".join(lines)
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """
+    把耗时字典格式化为便于阅读的多行文本（子阶段缩进显示）
+
+    Args:
+        timings: StageTimer.as_dict() 的结果
+
+    Returns:
+        格式化后的文本
+    """
+    lines = []
+    for name, seconds in timings.items():
+        depth = name.count('.')
+        label = ("  " * depth) + name.split('.')[-1]
+        lines.append(f"{label:<24}{seconds * 1000:>10.1f} ms")
+    return "\n".join(lines)